@@ -1,27 +1,160 @@
-from typing import List
-
-from fastapi import APIRouter, Depends, HTTPException, status
-
-from app.crud.notes import NoteDAO
-from app.crud.users import get_current_user_from_token
-from app.utils.handle_common_exceptions import handle_common_exceptions
+import asyncio
+from datetime import datetime
+from functools import partial
+from typing import Callable, List
+
+from fastapi import (APIRouter, Depends, Header, HTTPException, Query, Request,
+                     Response, status)
+from fastapi.responses import StreamingResponse
+from pymongo.asynchronous.cursor import AsyncCursor
+
+from app.crud.cached_notes import note_dao
+from app.crud.exceptions import NoteVersionConflictException
+from app.crud.note_events import Subscription, note_events
+from app.crud.note_stats import AUTHOR_SORT_FIELDS, NoteStatsDAO
+from app.crud.note_transfer import export_notes, import_notes, ndjson_lines
+from app.crud.notes import VERSION_PROJECTION, list_projection
+from app.crud.providers import shared_dao
+from app.crud.users import (get_current_user_from_stream_token,
+                            get_current_user_from_token)
+from app.utils.compression import create_decompressor
+from app.utils.etag import (etag_matches, if_match_version, not_modified,
+                            note_etag, notes_etag)
+from app.utils.fast_json import documents_response
+from app.utils.handle_common_exceptions import (handle_common_exceptions,
+                                                version_conflict)
+from app.utils.limit_payload_size import limited_stream, payload_too_large
 from app.utils.log_user_activity import log_user_activity
+from app.utils.pagination import NEXT_PAGE_TOKEN_HEADER, encode_page_token
 from app.utils.require_role import require_role
+from app.utils.search import highlight_snippet, search_terms
+from app.utils.streaming import (NDJSON_MEDIA_TYPE, SSE_MEDIA_TYPE,
+                                 ndjson_stream, sse_message)
+from conf.app_conf import note_stream_config, notes_config
 from database.mongo import get_db
-from database.schemas import (NoteCreate, NoteInDB, NoteInDBForUser,
+from database.schemas import (AuthorNoteStats, BatchResponse, DailyNoteStats,
+                              NoteBatchCreate, NoteBatchDelete,
+                              NoteBatchUpdate, NoteCreate, NoteImportReport,
+                              NoteInDB, NoteInDBForUser, NoteSearchResult,
+                              NoteSearchResultForStaff, NoteStatsSummary,
                               StatusResponse, UserInDB)
 
 note_routers = APIRouter()
 
+LIMIT_QUERY = Query(None, ge=1, le=notes_config.max_page_size)
+SEARCH_QUERY = Query(..., min_length=1, max_length=256)
+OFFSET_QUERY = Query(0, ge=0)
+FIELDS_QUERY = Query(None, description="Comma-separated note fields to return")
+BODY_PREVIEW_QUERY = Query(None, ge=0, le=65536, description="Return only the first N characters of the body")
+STATS_SORT_QUERY = Query("active", pattern=f"^({'|'.join(AUTHOR_SORT_FIELDS)})$")
+LIVE_QUERY = Query(False, description="Compute from the notes collection instead of the rollups")
+EXPECTED_VERSION_QUERY = Query(None, ge=0, description="Apply only if the note is still at this version")
+# Bodies of these routes are limited to NOTES_BATCH_MAX_BYTES by PayloadLimitMiddleware, see main.py.
+BATCH_PAYLOAD_ROUTES = ("POST /notes/batch/create", "PATCH /notes/batch/update", "POST /notes/batch/delete")
+
+
+def _next_page_token(notes: list[dict], limit: int) -> str | None:
+    return encode_page_token(notes[-1]) if len(notes) == limit else None
+
+
+def _fields(fields: str | None) -> list[str] | None:
+    return [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+
+
+async def _notes_page(find_notes: Callable[..., AsyncCursor], request: Request, response: Response,
+                      limit: int | None, page_token: str | None, stream: bool, trimmed: bool = False):
+    if stream:
+        notes_cursor = find_notes(limit=limit, page_token=page_token, batch_size=notes_config.stream_batch_size)
+        return StreamingResponse(ndjson_stream(notes_cursor), media_type=NDJSON_MEDIA_TYPE)
+
+    limit = limit or notes_config.page_size
+    if request.headers.get("if-none-match"):
+        # Polling clients usually hold the current page, so check versions before pulling bodies.
+        versions = await find_notes(limit=limit, page_token=page_token, projection=VERSION_PROJECTION).to_list()
+        etag = notes_etag(versions, _next_page_token(versions, limit))
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+    notes = await find_notes(limit=limit, page_token=page_token).to_list()
+    next_page_token = _next_page_token(notes, limit)
+    headers = {"ETag": notes_etag(notes, next_page_token)}
+    if next_page_token is not None:
+        headers[NEXT_PAGE_TOKEN_HEADER] = next_page_token
+
+    # Trimmed documents do not satisfy the response model, so they are encoded as projected.
+    if notes_config.fast_serialization or trimmed:
+        return documents_response(notes, headers)
+    response.headers.update(headers)
+    return notes
+
+
+def _expected_version(note_uuid: str, if_match: str | None, expected_version: int | None) -> int | None:
+    if if_match is None:
+        return expected_version
+    try:
+        return if_match_version(if_match, note_uuid)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Precondition failed")
+
+
+async def _conditional_write(write, if_match: str | None):
+    """Awaits a versioned write; a stale If-Match is 412 Precondition Failed, a stale expected_version 409."""
+    try:
+        return await write
+    except NoteVersionConflictException as e:
+        if if_match is not None:
+            raise version_conflict(e, status.HTTP_412_PRECONDITION_FAILED)
+        raise
+
+
+def _conditional_note(note: dict, request: Request, response: Response):
+    etag = note_etag(note)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return note
+
+
+def _with_snippets(notes: list[dict], query: str) -> list[dict]:
+    terms = search_terms(query)
+    for note in notes:
+        note["snippet"] = highlight_snippet(note["body"], terms)
+    return notes
+
+
+async def _note_event_stream(subscription: Subscription):
+    try:
+        yield f"retry: {note_stream_config.retry_seconds * 1000}\n\n"
+        if subscription.resume_after is not None:
+            async for event_id, payload in note_events.replay(subscription):
+                yield sse_message(payload["event"], payload["data"], event_id)
+        if subscription.reset:
+            yield sse_message("reset", {})
+        for event_id, payload in subscription.backlog:
+            yield sse_message(payload["event"], payload["data"], event_id)
+
+        while not subscription.closed:
+            try:
+                event_id, payload = await asyncio.wait_for(
+                    subscription.queue.get(), timeout=note_stream_config.heartbeat_seconds
+                )
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if event_id not in subscription.replayed:
+                yield sse_message(payload["event"], payload["data"], event_id)
+    finally:
+        note_events.unsubscribe(subscription)
+
 
 @note_routers.post("/create", response_model=StatusResponse)
 @handle_common_exceptions
 @log_user_activity()
-def create_note(
+async def create_note(
         body: NoteCreate,
         current_user: UserInDB = Depends(get_current_user_from_token),
         db=Depends(get_db)):
-    NoteDAO(mongo=db).create_new_note(
+    await note_dao(db).create_new_note(
         new_note=body,
         author=current_user.username
     )
@@ -29,36 +162,137 @@ def create_note(
     return StatusResponse(status_code=status.HTTP_201_CREATED, detail="Note created")
 
 
+@note_routers.post("/batch/create", response_model=BatchResponse)
+@handle_common_exceptions
+@log_user_activity()
+async def create_notes_batch(
+        body: NoteBatchCreate,
+        current_user: UserInDB = Depends(get_current_user_from_token),
+        db=Depends(get_db)):
+    results = await note_dao(db).create_new_notes(
+        new_notes=body.notes,
+        author=current_user.username
+    )
+
+    return BatchResponse(results=results)
+
+
+@note_routers.patch("/batch/update", response_model=BatchResponse)
+@handle_common_exceptions
+@log_user_activity()
+async def update_notes_batch(
+        body: NoteBatchUpdate,
+        current_user: UserInDB = Depends(get_current_user_from_token),
+        db=Depends(get_db)):
+    updates = [
+        {"uuid": note.uuid, "updated_data": note.model_dump(include={"title", "body"}, exclude_none=True)}
+        for note in body.notes
+    ]
+    results = await note_dao(db).update_notes_by_uuid(
+        updates=updates,
+        author=current_user.username
+    )
+
+    return BatchResponse(results=results)
+
+
+@note_routers.post("/batch/delete", response_model=BatchResponse)
+@handle_common_exceptions
+@log_user_activity()
+async def delete_notes_batch(
+        body: NoteBatchDelete,
+        current_user: UserInDB = Depends(get_current_user_from_token),
+        db=Depends(get_db)):
+    results = await note_dao(db).delete_notes_by_uuid(
+        uuids=body.uuids,
+        author=current_user.username
+    )
+
+    return BatchResponse(results=results)
+
+
 @note_routers.get("/my-notes", response_model=List[NoteInDBForUser])
 @handle_common_exceptions
 @log_user_activity()
-def get_user_notes(
+async def get_user_notes(
+        request: Request,
+        response: Response,
+        limit: int = LIMIT_QUERY,
+        page_token: str = None,
+        stream: bool = False,
+        created_from: datetime = None,
+        created_to: datetime = None,
+        fields: str = FIELDS_QUERY,
+        body_preview: int = BODY_PREVIEW_QUERY,
         current_user: UserInDB = Depends(get_current_user_from_token),
         db=Depends(get_db)):
-    notes = NoteDAO(mongo=db).get_notes_by_author(current_user.username)
+    projection = list_projection(_fields(fields), body_preview)
+    find_notes = partial(note_dao(db).find_notes_by_author, current_user.username,
+                         created_from=created_from, created_to=created_to, projection=projection)
 
-    return notes
+    return await _notes_page(find_notes, request, response, limit, page_token, stream, trimmed=projection is not None)
+
+
+@note_routers.get("/search", response_model=List[NoteSearchResult])
+@handle_common_exceptions
+@log_user_activity()
+async def search_notes(
+        q: str = SEARCH_QUERY,
+        limit: int = LIMIT_QUERY,
+        offset: int = OFFSET_QUERY,
+        current_user: UserInDB = Depends(get_current_user_from_token),
+        db=Depends(get_db)):
+    notes = await note_dao(db).search_notes(
+        q,
+        author=current_user.username,
+        limit=limit or notes_config.page_size,
+        offset=offset
+    )
+
+    return _with_snippets(notes, q)
+
+
+@note_routers.get("/stream")
+@handle_common_exceptions
+@log_user_activity()
+async def stream_note_events(
+        last_event_id: str = Header(None),
+        current_user: UserInDB = Depends(get_current_user_from_stream_token),
+        db=Depends(get_db)):
+    note_events.start(db.notes)
+    subscription = note_events.subscribe(current_user.username, last_event_id)
+
+    return StreamingResponse(
+        _note_event_stream(subscription),
+        media_type=SSE_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @note_routers.get("/{note_uuid}", response_model=NoteInDBForUser)
 @handle_common_exceptions
 @log_user_activity(log_note_uuid=True)
-def get_note(
+async def get_note(
         note_uuid: str,
+        request: Request,
+        response: Response,
         current_user: UserInDB = Depends(get_current_user_from_token),
         db=Depends(get_db)):
-    note = NoteDAO(mongo=db).get_note_by_uuid(note_uuid=note_uuid, author=current_user.username)
+    note = await note_dao(db).get_note_by_uuid(note_uuid=note_uuid, author=current_user.username)
 
-    return note
+    return _conditional_note(note, request, response)
 
 
 @note_routers.patch("/update_note", response_model=NoteInDBForUser)
 @handle_common_exceptions
 @log_user_activity(log_note_uuid=True)
-def update_note(
+async def update_note(
         note_uuid: str,
+        response: Response,
         title: str = None,
         body: str = None,
+        expected_version: int = EXPECTED_VERSION_QUERY,
+        if_match: str = Header(None),
         current_user: UserInDB = Depends(get_current_user_from_token),
         db=Depends(get_db)):
     updated_fields = {key: value for key, value in {"title": title, "body": body}.items() if value is not None}
@@ -66,11 +300,13 @@ def update_note(
     if not updated_fields:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No fields to update")
 
-    updated_note = NoteDAO(mongo=db).update_note_by_uuid(
+    updated_note = await _conditional_write(note_dao(db).update_note_by_uuid(
         uuid=note_uuid,
         updated_data=updated_fields,
-        author=current_user.username
-    )
+        author=current_user.username,
+        expected_version=_expected_version(note_uuid, if_match, expected_version)
+    ), if_match)
+    response.headers["ETag"] = note_etag(updated_note)
 
     return updated_note
 
@@ -78,11 +314,17 @@ def update_note(
 @note_routers.delete("/{note_uuid}", response_model=StatusResponse)
 @handle_common_exceptions
 @log_user_activity(log_note_uuid=True)
-def delete_note(
+async def delete_note(
         note_uuid: str,
+        expected_version: int = EXPECTED_VERSION_QUERY,
+        if_match: str = Header(None),
         current_user: UserInDB = Depends(get_current_user_from_token),
         db=Depends(get_db)):
-    NoteDAO(mongo=db).delete_note_by_uuid(uuid=note_uuid, author=current_user.username)
+    await _conditional_write(note_dao(db).delete_note_by_uuid(
+        uuid=note_uuid,
+        author=current_user.username,
+        expected_version=_expected_version(note_uuid, if_match, expected_version)
+    ), if_match)
 
     return StatusResponse(status_code=status.HTTP_200_OK, detail="Note deleted")
 
@@ -91,11 +333,11 @@ def delete_note(
 @handle_common_exceptions
 @log_user_activity(log_note_uuid=True)
 @require_role(["Admin", "Superuser"])
-def restore_note(
+async def restore_note(
         note_uuid: str,
         current_user: UserInDB = Depends(get_current_user_from_token),
         db=Depends(get_db)):
-    NoteDAO(mongo=db).restore_note_by_uuid(uuid=note_uuid)
+    await note_dao(db).restore_note_by_uuid(uuid=note_uuid)
 
     return StatusResponse(status_code=status.HTTP_200_OK, detail="Note restored")
 
@@ -104,35 +346,170 @@ def restore_note(
 @handle_common_exceptions
 @log_user_activity(log_note_uuid=True)
 @require_role(["Admin", "Superuser"])
-def get_note_for_staff(
+async def get_note_for_staff(
         note_uuid: str,
+        request: Request,
+        response: Response,
         current_user: UserInDB = Depends(get_current_user_from_token),
         db=Depends(get_db)):
-    note = NoteDAO(mongo=db).get_note_by_uuid_for_staff(note_uuid=note_uuid)
+    note = await note_dao(db).get_note_by_uuid_for_staff(note_uuid=note_uuid)
 
-    return note
+    return _conditional_note(note, request, response)
 
 
 @note_routers.get("/staff/get_notes", response_model=List[NoteInDB])
 @handle_common_exceptions
 @log_user_activity()
 @require_role(["Admin", "Superuser"])
-def get_notes_for_staff(
+async def get_notes_for_staff(
+        request: Request,
+        response: Response,
+        limit: int = LIMIT_QUERY,
+        page_token: str = None,
+        stream: bool = False,
+        created_from: datetime = None,
+        created_to: datetime = None,
+        fields: str = FIELDS_QUERY,
+        body_preview: int = BODY_PREVIEW_QUERY,
         current_user: UserInDB = Depends(get_current_user_from_token),
         db=Depends(get_db)):
-    note = NoteDAO(mongo=db).get_notes_list_for_staff()
+    projection = list_projection(_fields(fields), body_preview, for_staff=True)
+    find_notes = partial(note_dao(db).find_notes_for_staff,
+                         created_from=created_from, created_to=created_to, projection=projection)
 
-    return note
+    return await _notes_page(find_notes, request, response, limit, page_token, stream, trimmed=projection is not None)
 
 
 @note_routers.get("/staff/get_notes_users/{username}", response_model=List[NoteInDB])
 @handle_common_exceptions
 @log_user_activity(log_username=True)
 @require_role(["Admin", "Superuser"])
-def get_notes_user_for_staff(
+async def get_notes_user_for_staff(
         username: str,
+        request: Request,
+        response: Response,
+        limit: int = LIMIT_QUERY,
+        page_token: str = None,
+        stream: bool = False,
+        created_from: datetime = None,
+        created_to: datetime = None,
+        fields: str = FIELDS_QUERY,
+        body_preview: int = BODY_PREVIEW_QUERY,
         current_user: UserInDB = Depends(get_current_user_from_token),
         db=Depends(get_db)):
-    note = NoteDAO(mongo=db).get_notes_list_for_staff(author=username)
+    projection = list_projection(_fields(fields), body_preview, for_staff=True)
+    find_notes = partial(note_dao(db).find_notes_for_staff, username,
+                         created_from=created_from, created_to=created_to, projection=projection)
 
-    return note
+    return await _notes_page(find_notes, request, response, limit, page_token, stream, trimmed=projection is not None)
+
+
+@note_routers.get("/staff/search", response_model=List[NoteSearchResultForStaff])
+@handle_common_exceptions
+@log_user_activity()
+@require_role(["Admin", "Superuser"])
+async def search_notes_for_staff(
+        q: str = SEARCH_QUERY,
+        author: str = None,
+        limit: int = LIMIT_QUERY,
+        offset: int = OFFSET_QUERY,
+        current_user: UserInDB = Depends(get_current_user_from_token),
+        db=Depends(get_db)):
+    notes = await note_dao(db).search_notes(
+        q,
+        author=author,
+        limit=limit or notes_config.page_size,
+        offset=offset,
+        for_staff=True
+    )
+
+    return _with_snippets(notes, q)
+
+
+@note_routers.get("/staff/stats", response_model=NoteStatsSummary)
+@handle_common_exceptions
+@log_user_activity()
+@require_role(["Admin", "Superuser"])
+async def get_note_stats(
+        live: bool = LIVE_QUERY,
+        current_user: UserInDB = Depends(get_current_user_from_token),
+        db=Depends(get_db)):
+    stats = shared_dao(NoteStatsDAO, db)
+
+    return await (stats.live_summary() if live else stats.summary())
+
+
+@note_routers.get("/staff/stats/authors", response_model=List[AuthorNoteStats])
+@handle_common_exceptions
+@log_user_activity()
+@require_role(["Admin", "Superuser"])
+async def get_note_stats_by_author(
+        limit: int = LIMIT_QUERY,
+        sort: str = STATS_SORT_QUERY,
+        live: bool = LIVE_QUERY,
+        current_user: UserInDB = Depends(get_current_user_from_token),
+        db=Depends(get_db)):
+    stats = shared_dao(NoteStatsDAO, db)
+    get_authors = stats.live_authors if live else stats.authors
+
+    return await get_authors(limit or notes_config.page_size, sort=sort)
+
+
+@note_routers.get("/staff/stats/daily", response_model=List[DailyNoteStats])
+@handle_common_exceptions
+@log_user_activity()
+@require_role(["Admin", "Superuser"])
+async def get_note_stats_daily(
+        created_from: datetime = None,
+        created_to: datetime = None,
+        live: bool = LIVE_QUERY,
+        current_user: UserInDB = Depends(get_current_user_from_token),
+        db=Depends(get_db)):
+    stats = shared_dao(NoteStatsDAO, db)
+    get_daily = stats.live_daily if live else stats.daily
+
+    return await get_daily(created_from=created_from, created_to=created_to)
+
+
+@note_routers.get("/staff/export")
+@handle_common_exceptions
+@log_user_activity()
+@require_role(["Admin", "Superuser"])
+async def export_notes_for_staff(
+        author: str = None,
+        current_user: UserInDB = Depends(get_current_user_from_token),
+        db=Depends(get_db)):
+    # Compressed on the fly by CompressionMiddleware when the client sends Accept-Encoding.
+    return StreamingResponse(
+        export_notes(db, author=author, batch_size=notes_config.stream_batch_size),
+        media_type=NDJSON_MEDIA_TYPE,
+    )
+
+
+@note_routers.post("/staff/import", response_model=NoteImportReport)
+@handle_common_exceptions
+@log_user_activity()
+@require_role(["Admin", "Superuser"])
+async def import_notes_for_staff(
+        request: Request,
+        content_encoding: str = Header(""),
+        current_user: UserInDB = Depends(get_current_user_from_token),
+        db=Depends(get_db)):
+    try:
+        decompress = create_decompressor(content_encoding)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e))
+
+    async def chunks():
+        decompressed = 0
+        async for chunk in limited_stream(request, notes_config.import_max_bytes):
+            for piece in decompress(chunk):
+                decompressed += len(piece)
+                if decompressed > notes_config.import_max_bytes:
+                    raise payload_too_large(notes_config.import_max_bytes)
+                yield piece
+
+    try:
+        return await import_notes(db, ndjson_lines(chunks()), batch_size=notes_config.import_batch_size)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
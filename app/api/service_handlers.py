@@ -0,0 +1,113 @@
+import pymongo
+from fastapi import APIRouter, Depends, Response, status
+from fastapi.responses import PlainTextResponse
+from pymongo.errors import PyMongoError
+
+from app.crud.cached_notes import note_cache
+from app.crud.note_events import note_events
+from app.crud.sessions import session_cache
+from app.crud.users import password_hasher, user_cache
+from app.utils.audit import audit_stats
+from app.utils.metrics import CounterFunction, GaugeFunction, render_metrics
+from conf.mongodb import mongodb_config
+from conf.server import server_config
+from database.mongo import get_db, pool_stats
+
+service_routers = APIRouter()
+metrics_routers = APIRouter()
+health_routers = APIRouter()
+
+CACHES = {"user": user_cache, "note": note_cache, "session": session_cache}
+
+
+def _in_memory_cache_stats():
+    for name, cache in CACHES.items():
+        stats = cache.stats()
+        if "evictions" in stats:
+            yield name, stats
+
+GaugeFunction(
+    "mongo_pool_connections", "MongoDB pool connections by state.", ("state",),
+    lambda: {("open",): pool_stats.snapshot()["open_connections"], ("in_use",): pool_stats.checked_out},
+)
+CounterFunction(
+    "mongo_pool_checkout_wait_seconds_total", "Time spent waiting for a pooled connection.", (),
+    lambda: {(): pool_stats.checkout_wait_seconds},
+)
+CounterFunction(
+    "mongo_pool_checkout_failures_total", "Failed connection checkouts.", (),
+    lambda: {(): pool_stats.checkout_failures},
+)
+CounterFunction(
+    "cache_requests_total", "Cache lookups by result.", ("cache", "result"),
+    lambda: {
+        (name, result): value
+        for name, cache in CACHES.items()
+        for result, value in (("hit", cache.hits), ("miss", cache.misses))
+    },
+)
+CounterFunction(
+    "cache_evictions_total", "In-process cache evictions.", ("cache",),
+    lambda: {(name,): stats["evictions"] for name, stats in _in_memory_cache_stats()},
+)
+GaugeFunction(
+    "cache_size_bytes", "Bytes held by in-process caches.", ("cache",),
+    lambda: {(name,): stats["bytes"] for name, stats in _in_memory_cache_stats()},
+)
+GaugeFunction(
+    "argon2_pending", "Argon2 calls waiting for or running in the process pool.", (),
+    lambda: {(): password_hasher.pending},
+)
+GaugeFunction(
+    "note_stream_subscribers", "Clients connected to /notes/stream.", (),
+    lambda: {(): note_events.subscribers},
+)
+CounterFunction(
+    "audit_records_dropped_total", "Audit records dropped because the queue was full.", (),
+    lambda: {(): audit_stats()["dropped"]},
+)
+
+
+@metrics_routers.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@service_routers.get("/pool-stats")
+async def get_pool_stats():
+    return {
+        "max_pool_size": mongodb_config.max_pool_size,
+        "min_pool_size": mongodb_config.min_pool_size,
+        **pool_stats.snapshot(),
+    }
+
+
+@service_routers.get("/cache-stats")
+async def get_cache_stats():
+    return {name: cache.stats() for name, cache in CACHES.items()}
+
+
+@service_routers.get("/password-hasher-stats")
+async def get_password_hasher_stats():
+    return password_hasher.stats()
+
+
+@service_routers.get("/audit-stats")
+async def get_audit_stats():
+    return audit_stats()
+
+
+@health_routers.get("/live")
+async def get_liveness():
+    return {"status": "ok"}
+
+
+@health_routers.get("/ready")
+async def get_readiness(response: Response, db=Depends(get_db)):
+    try:
+        with pymongo.timeout(server_config.readiness_timeout_ms / 1000):
+            await db.command("ping")
+    except PyMongoError:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"status": "unavailable"}
+    return {"status": "ok"}
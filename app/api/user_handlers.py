@@ -4,21 +4,24 @@ from fastapi.security import OAuth2PasswordRequestForm
 from app.crud.exceptions import (ExistRoleException,
                                  UserAlreadeCreatedException,
                                  UserNotFoundException, UserRoleDoesNotExist)
-from app.crud.users import (UserDAO, authenticate_user, create_access_token,
-                            get_current_user_from_token)
+from app.crud.providers import shared_dao
+from app.crud.sessions import SessionDAO
+from app.crud.users import (OAUTH2_SCHEME, UserDAO, authenticate_user,
+                            get_current_user_from_token, issue_token,
+                            refresh_session, session_mode)
 from app.utils.handle_common_exceptions import handle_common_exceptions
 from database.mongo import get_db
-from database.schemas import (RoleUpdateRequest, StatusResponse, Token, User,
-                              UserInDB)
+from database.schemas import (RefreshTokenRequest, RoleUpdateRequest,
+                              StatusResponse, Token, User, UserInDB)
 
 user_routers = APIRouter()
 
 
 @user_routers.post('/sign-up', response_model=StatusResponse)
 @handle_common_exceptions
-def create_user(body: User, db=Depends(get_db)):
+async def create_user(body: User, db=Depends(get_db)):
     try:
-        UserDAO(mongo=db).create_new_user(
+        await shared_dao(UserDAO, db).create_new_user(
             email=body.email,
             password=body.password)
 
@@ -27,15 +30,12 @@ def create_user(body: User, db=Depends(get_db)):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Username already registered")
 
 
-@user_routers.post('/token', response_model=Token)
+@user_routers.post('/token', response_model=Token, response_model_exclude_none=True)
 @handle_common_exceptions
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db=Depends(get_db)):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db=Depends(get_db)):
     try:
-        user = authenticate_user(db, form_data.username, form_data.password)
-        access_token = create_access_token(
-            data={'sub': user.username}
-        )
-        return Token(access_token=access_token, token_type='bearer')
+        user = await authenticate_user(db, form_data.username, form_data.password)
+        return await issue_token(db, user)
     except UserNotFoundException:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -44,16 +44,33 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db=
         )
 
 
+@user_routers.post('/token/refresh', response_model=Token, response_model_exclude_none=True)
+@handle_common_exceptions
+async def refresh_access_token(body: RefreshTokenRequest, db=Depends(get_db)):
+    if not session_mode():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Refresh tokens require session mode")
+    return await refresh_session(db, body.refresh_token)
+
+
+@user_routers.post('/logout', response_model=StatusResponse)
+@handle_common_exceptions
+async def logout(token: str = Depends(OAUTH2_SCHEME), db=Depends(get_db)):
+    if not session_mode():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Signed tokens cannot be revoked")
+    await shared_dao(SessionDAO, db).revoke_session(token)
+    return StatusResponse(status_code=status.HTTP_200_OK, detail="Logged out")
+
+
 @user_routers.patch("/update-role", response_model=StatusResponse)
 @handle_common_exceptions
-def update_user_role(role_update: RoleUpdateRequest, current_user: UserInDB = Depends(get_current_user_from_token), db=Depends(get_db)):
+async def update_user_role(role_update: RoleUpdateRequest, current_user: UserInDB = Depends(get_current_user_from_token), db=Depends(get_db)):
     if current_user.role != "Superuser":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You do not have permission to perform this action"
         )
     try:
-        UserDAO(mongo=db).update_user_role_in_db(
+        await shared_dao(UserDAO, db).update_user_role_in_db(
             email=role_update.user_email,
             new_role=role_update.new_role)
         return StatusResponse(status_code=status.HTTP_200_OK, detail="Successfully")
@@ -0,0 +1,134 @@
+import time
+
+from bson import json_util
+
+from app.crud.notes import NoteDAO
+from app.crud.providers import shared_dao
+from app.utils.cache import Cache, create_cache_backend
+from app.utils.metrics import instrument_dao
+from conf.app_conf import note_cache_config
+from database.schemas import NoteCreate
+
+note_cache = Cache(
+    create_cache_backend(note_cache_config.backend_url, note_cache_config.max_entries, note_cache_config.max_bytes),
+    namespace="note",
+    ttl=note_cache_config.ttl_seconds,
+)
+
+# Fields the owner projection of NoteDAO leaves out.
+_OWNER_HIDDEN_FIELDS = ("_id", "author", "is_active")
+# How long an invalidation keeps read-through fills that started before it from caching what they read;
+# longer than any single-note read takes.
+INVALIDATION_TTL_SECONDS = 10
+
+
+def _owner_key(note_uuid: str, author: str) -> str:
+    return f"owner:{author}:{note_uuid}"
+
+
+def _staff_key(note_uuid: str) -> str:
+    return f"staff:{note_uuid}"
+
+
+def _invalidated_key(key: str) -> str:
+    return f"{key}:invalidated"
+
+
+def _dumps(note: dict) -> bytes:
+    return json_util.dumps(note).encode()
+
+
+def _loads(value: bytes) -> dict:
+    return json_util.loads(value)
+
+
+@instrument_dao
+class CachedNoteDAO(NoteDAO):
+    """NoteDAO with a read-through cache of single notes; owner and staff projections are cached separately."""
+
+    async def _invalidate(self, note_uuid: str, author: str):
+        for key in (_owner_key(note_uuid, author), _staff_key(note_uuid)):
+            await note_cache.invalidate(key)
+            await note_cache.set(_invalidated_key(key), str(time.time()).encode(), ttl=INVALIDATION_TTL_SECONDS)
+
+    async def _fill(self, key: str, note: dict, read_at: float = None):
+        """Caches a note unless the cache already holds a newer version or was invalidated after read_at.
+
+        Keeps a read that raced with a write from putting the note as it was before the write back into the cache.
+        """
+        if read_at is not None:
+            invalidated_at = await note_cache.peek(_invalidated_key(key))
+            if invalidated_at is not None and float(invalidated_at) >= read_at:
+                return
+        cached = await note_cache.peek(key)
+        if cached is not None and _loads(cached).get("version", 0) > note.get("version", 0):
+            return
+        await note_cache.set(key, _dumps(note))
+
+    async def create_new_note(self, new_note: NoteCreate, author: str) -> dict:
+        note = await super().create_new_note(new_note, author)
+        owner_note = {key: value for key, value in note.items() if key not in _OWNER_HIDDEN_FIELDS}
+        await note_cache.set(_owner_key(note["uuid"], author), _dumps(owner_note))
+        return note
+
+    async def get_note_by_uuid(self, note_uuid: str, author: str):
+        cached = await note_cache.get(_owner_key(note_uuid, author))
+        if cached is not None:
+            return _loads(cached)
+
+        read_at = time.time()
+        note = await super().get_note_by_uuid(note_uuid=note_uuid, author=author)
+        await self._fill(_owner_key(note_uuid, author), note, read_at)
+        return note
+
+    async def get_note_by_uuid_for_staff(self, note_uuid: str):
+        cached = await note_cache.get(_staff_key(note_uuid))
+        if cached is not None:
+            return _loads(cached)
+
+        read_at = time.time()
+        note = await super().get_note_by_uuid_for_staff(note_uuid=note_uuid)
+        await self._fill(_staff_key(note_uuid), note, read_at)
+        return note
+
+    async def update_note_by_uuid(self, uuid: str, updated_data: dict, author: str,
+                                  expected_version: int = None) -> dict:
+        try:
+            note = await super().update_note_by_uuid(
+                uuid=uuid, updated_data=updated_data, author=author, expected_version=expected_version
+            )
+        except Exception:
+            await self._invalidate(uuid, author)
+            raise
+        await self._invalidate(uuid, author)
+        await self._fill(_owner_key(uuid, author), note)
+        return note
+
+    async def delete_note_by_uuid(self, uuid: str, author: str, expected_version: int = None):
+        try:
+            return await super().delete_note_by_uuid(uuid=uuid, author=author, expected_version=expected_version)
+        finally:
+            await self._invalidate(uuid, author)
+
+    async def restore_note_by_uuid(self, uuid: str):
+        note = await super().restore_note_by_uuid(uuid=uuid)
+        await self._invalidate(uuid, note["author"])
+        return note
+
+    async def update_notes_by_uuid(self, updates: list[dict], author: str) -> list[dict]:
+        try:
+            return await super().update_notes_by_uuid(updates=updates, author=author)
+        finally:
+            for update in updates:
+                await self._invalidate(update["uuid"], author)
+
+    async def delete_notes_by_uuid(self, uuids: list[str], author: str) -> list[dict]:
+        try:
+            return await super().delete_notes_by_uuid(uuids=uuids, author=author)
+        finally:
+            for note_uuid in uuids:
+                await self._invalidate(note_uuid, author)
+
+
+def note_dao(mongo) -> NoteDAO:
+    return shared_dao(CachedNoteDAO if note_cache_config.enabled else NoteDAO, mongo)
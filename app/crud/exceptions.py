@@ -21,6 +21,29 @@ class NoteNotFoundException(Exception):
     pass
 
 
+class InvalidPageTokenException(Exception):
+    pass
+
+
+class PasswordHasherOverloadedException(Exception):
+    pass
+
+
+class InvalidFieldsException(Exception):
+    pass
+
+
+class NoteEventsUnavailableException(Exception):
+    pass
+
+
+class NoteVersionConflictException(Exception):
+    def __init__(self, note_uuid: str, current_version: int):
+        super().__init__(f"Note {note_uuid} is at version {current_version}")
+        self.note_uuid = note_uuid
+        self.current_version = current_version
+
+
 class CreredentialsException(HTTPException):
     def __init__(self):
         super().__init__(
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from pymongo import DeleteOne, ReplaceOne
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.errors import PyMongoError
+
+from app.utils.metrics import Counter
+from conf.app_conf import note_archive_config
+
+logger = logging.getLogger(__name__)
+
+NOTES_ARCHIVED = Counter("notes_archived_total", "Soft-deleted notes moved to the notes_archive collection.")
+
+
+def archive_filter(retention_days: int) -> dict:
+    """Soft-deleted notes past the retention period.
+
+    Deleted notes can no longer be updated, so updated_at is the time they were deleted;
+    notes deleted before updated_at existed have none and are always due.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    return {"is_active": False, "$or": [{"updated_at": {"$lt": cutoff}}, {"updated_at": None}]}
+
+
+async def archive_deleted_notes(db: AsyncDatabase, retention_days: int, batch_size: int = 500,
+                                pause: float = 0.0) -> int:
+    """Moves soft-deleted notes past the retention period to notes_archive in batches; returns the number moved.
+
+    A batch is first upserted into the archive and then removed from notes matching the archived version,
+    so a note restored in the meantime stays in notes and its archive copy is dropped again. The note_stats
+    rollups are not touched: archived notes are still counted as deleted.
+    """
+    archived = 0
+    while True:
+        batch = await db.notes.find(archive_filter(retention_days)).limit(batch_size).to_list()
+        if not batch:
+            break
+
+        archived_at = datetime.now(timezone.utc)
+        await db.notes_archive.bulk_write(
+            [ReplaceOne({"uuid": note["uuid"]}, {**note, "archived_at": archived_at}, upsert=True) for note in batch],
+            ordered=False
+        )
+        result = await db.notes.bulk_write(
+            [DeleteOne({"_id": note["_id"], "is_active": False, "version": note.get("version")}) for note in batch],
+            ordered=False
+        )
+
+        if result.deleted_count < len(batch):
+            uuids = [note["uuid"] for note in batch]
+            kept = [note["uuid"] async for note in db.notes.find({"uuid": {"$in": uuids}}, {"uuid": 1})]
+            await db.notes_archive.delete_many({"uuid": {"$in": kept}})
+
+        archived += result.deleted_count
+        NOTES_ARCHIVED.inc(result.deleted_count)
+        if not result.deleted_count:
+            # Every candidate changed under us; the next query would return the same notes.
+            break
+        if pause:
+            await asyncio.sleep(pause)
+
+    return archived
+
+
+class NoteArchiver():
+    """Runs archive_deleted_notes periodically inside the application process."""
+
+    def __init__(self, retention_days: int, batch_size: int, pause: float, interval_seconds: int):
+        self._retention_days = retention_days
+        self._batch_size = batch_size
+        self._pause = pause
+        self._interval_seconds = interval_seconds
+        self._task: asyncio.Task | None = None
+
+    def start(self, db: AsyncDatabase):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, db: AsyncDatabase):
+        while True:
+            try:
+                archived = await archive_deleted_notes(db, self._retention_days, self._batch_size, self._pause)
+                if archived:
+                    logger.info(f"Archived {archived} deleted notes")
+            except PyMongoError:
+                logger.exception("Archiving deleted notes failed")
+            await asyncio.sleep(self._interval_seconds)
+
+
+note_archiver = NoteArchiver(
+    retention_days=note_archive_config.retention_days,
+    batch_size=note_archive_config.batch_size,
+    pause=note_archive_config.pause,
+    interval_seconds=note_archive_config.interval_seconds,
+)
@@ -0,0 +1,203 @@
+import asyncio
+import logging
+from collections import defaultdict, deque
+from typing import AsyncIterator
+
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.crud.exceptions import NoteEventsUnavailableException
+from conf.app_conf import note_stream_config
+
+logger = logging.getLogger(__name__)
+
+CHANGE_PIPELINE = [{"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}}]
+# The resume token points past the oldest entry of the oplog.
+CHANGE_STREAM_HISTORY_LOST = 286
+# The deployment cannot serve change streams at all, so reopening the stream can never succeed.
+CHANGE_STREAM_FATAL_CODES = {
+    13,  # Unauthorized
+    40573,  # $changeStream is only supported on replica sets, e.g. on a standalone mongod
+}
+# Fields of the owner projection of a note, see NoteDAO.get_note_by_uuid.
+_OWNER_HIDDEN_FIELDS = ("_id", "author", "is_active")
+
+
+def note_event(change: dict) -> tuple[str, dict] | None:
+    """Turns a change stream document into (author, event) or None when it is not a note event."""
+    note = change.get("fullDocument")
+    if note is None:
+        return None
+
+    updated_fields = change.get("updateDescription", {}).get("updatedFields", {})
+    if change["operationType"] == "insert":
+        event = "create"
+    elif updated_fields.get("is_active") is False:
+        event = "delete"
+    elif updated_fields.get("is_active") is True:
+        event = "restore"
+    elif note.get("is_active"):
+        event = "update"
+    else:
+        return None
+
+    if event == "delete":
+        data = {"uuid": note["uuid"], "version": note.get("version", 0)}
+    else:
+        data = {key: value for key, value in note.items() if key not in _OWNER_HIDDEN_FIELDS}
+    return note["author"], {"event": event, "data": data}
+
+
+class Subscription():
+    def __init__(self, author: str, queue_size: int):
+        self.author = author
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.backlog: list[tuple[str, dict]] = []
+        # Last-Event-ID that is no longer buffered; the missed events are replayed from the oplog.
+        self.resume_after: str | None = None
+        # Last event the hub had published when the subscription started; the replay stops there.
+        self.replay_until: str | None = None
+        self.replayed: set[str] = set()
+        # Set when the missed events cannot be replayed; the client has to reload its notes.
+        self.reset = False
+        # Set when the client fell behind; it reconnects and resumes from the buffer.
+        self.closed = False
+
+
+class NoteEventHub():
+    """Fans out one change stream on the notes collection to the subscribers of each author."""
+
+    def __init__(self, buffer_size: int, queue_size: int):
+        self._subscriptions: dict[str, set[Subscription]] = defaultdict(set)
+        self._buffer: deque[tuple[str, str, dict]] = deque(maxlen=buffer_size)
+        self._queue_size = queue_size
+        self._task: asyncio.Task | None = None
+        self._collection: AsyncCollection | None = None
+        self._resume_token = None
+        # Set when the change stream cannot be opened on this deployment; the hub stays stopped.
+        self.failed = False
+
+    @property
+    def subscribers(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def start(self, collection: AsyncCollection):
+        self._collection = collection
+        if self.failed:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._watch(collection))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch(self, collection: AsyncCollection):
+        while True:
+            try:
+                async with await collection.watch(
+                        CHANGE_PIPELINE, full_document="updateLookup", resume_after=self._resume_token) as stream:
+                    async for change in stream:
+                        self._resume_token = change["_id"]
+                        self.publish(change)
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAM_FATAL_CODES:
+                    logger.error(f"Note change stream cannot be opened, note events are disabled: {e}")
+                    self._fail()
+                    return
+                if e.code != CHANGE_STREAM_HISTORY_LOST:
+                    logger.exception("Note change stream failed, reopening")
+                else:
+                    # Resuming can never succeed again; start from now and let clients behind the gap reset.
+                    logger.error("Note change stream history lost, restarting from the current time")
+                    self._resume_token = None
+                    self._buffer.clear()
+                await asyncio.sleep(note_stream_config.retry_seconds)
+            except PyMongoError:
+                logger.exception("Note change stream failed, reopening")
+                await asyncio.sleep(note_stream_config.retry_seconds)
+
+    def _fail(self):
+        self.failed = True
+        for subscriptions in list(self._subscriptions.values()):
+            for subscription in list(subscriptions):
+                subscription.closed = True
+                self.unsubscribe(subscription)
+
+    def publish(self, change: dict):
+        event = note_event(change)
+        if event is None:
+            return
+
+        author, payload = event
+        event_id = change["_id"]["_data"]
+        self._buffer.append((event_id, author, payload))
+        for subscription in list(self._subscriptions.get(author, ())):
+            try:
+                subscription.queue.put_nowait((event_id, payload))
+            except asyncio.QueueFull:
+                subscription.closed = True
+                self.unsubscribe(subscription)
+
+    def subscribe(self, author: str, last_event_id: str | None = None) -> Subscription:
+        if self.failed:
+            raise NoteEventsUnavailableException
+        subscription = Subscription(author, self._queue_size)
+        self._subscriptions[author].add(subscription)
+
+        if last_event_id is not None:
+            buffered_ids = [event_id for event_id, _, _ in self._buffer]
+            if last_event_id in buffered_ids:
+                after = buffered_ids.index(last_event_id) + 1
+                subscription.backlog = [
+                    (event_id, payload)
+                    for event_id, event_author, payload in list(self._buffer)[after:]
+                    if event_author == author
+                ]
+            else:
+                subscription.resume_after = last_event_id
+                subscription.replay_until = buffered_ids[-1] if buffered_ids else None
+        return subscription
+
+    async def replay(self, subscription: Subscription) -> AsyncIterator[tuple[str, dict]]:
+        """Yields the events missed since subscription.resume_after from a change stream of the client's own.
+
+        The stream stops at the last event the hub had published when the client subscribed, or once it has caught
+        up; later events already reach the subscription's queue. Sets subscription.reset when the oplog no longer
+        holds the position.
+        """
+        if self._collection is None:
+            subscription.reset = True
+            return
+
+        pipeline = CHANGE_PIPELINE + [{"$match": {"fullDocument.author": subscription.author}}]
+        try:
+            async with await self._collection.watch(
+                    pipeline, full_document="updateLookup", resume_after={"_data": subscription.resume_after}
+            ) as stream:
+                while (change := await stream.try_next()) is not None:
+                    event = note_event(change)
+                    event_id = change["_id"]["_data"]
+                    if event is not None and event[0] == subscription.author:
+                        subscription.replayed.add(event_id)
+                        yield event_id, event[1]
+                    if event_id == subscription.replay_until:
+                        break
+        except PyMongoError:
+            logger.warning(f"Replaying note events after {subscription.resume_after} failed", exc_info=True)
+            subscription.reset = True
+
+    def unsubscribe(self, subscription: Subscription):
+        subscriptions = self._subscriptions.get(subscription.author)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.author]
+
+
+note_events = NoteEventHub(buffer_size=note_stream_config.buffer_size, queue_size=note_stream_config.queue_size)
@@ -0,0 +1,174 @@
+from datetime import datetime
+
+from pymongo import ASCENDING, DESCENDING, ReplaceOne, UpdateOne
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.database import AsyncDatabase
+
+from app.utils.metrics import instrument_dao
+
+TOTAL_ID = "total"
+AUTHOR_SORT_FIELDS = ("active", "deleted")
+ARCHIVE_COLLECTION = "notes_archive"
+
+
+def _deleted_ratio(active: int, deleted: int) -> float:
+    total = active + deleted
+    return round(deleted / total, 4) if total else 0.0
+
+
+def _summary(active: int, deleted: int, authors: int) -> dict:
+    return {"active": active, "deleted": deleted, "deleted_ratio": _deleted_ratio(active, deleted), "authors": authors}
+
+
+def _with_archive(stages: list[dict], match: dict = None) -> list[dict]:
+    """Runs the stages over notes and notes_archive, so archived notes stay counted as deleted."""
+    head = [{"$match": match}] if match is not None else []
+    return head + [{"$unionWith": {"coll": ARCHIVE_COLLECTION, "pipeline": head}}] + stages
+
+
+@instrument_dao
+class NoteStatsDAO():
+    """Rollups in the note_stats collection, kept up to date by NoteDAO writes.
+
+    Documents: "total" with active/deleted/authors counters, "author:<username>" with active/deleted
+    counters and "day:<YYYY-MM-DD>" with the number of notes created that day (UTC). The live_* methods
+    compute the same figures with aggregation pipelines over the notes collection. Archived notes are still
+    deleted notes: archiving leaves the rollups untouched and the pipelines include notes_archive.
+    """
+
+    def __init__(self, mongo: AsyncDatabase):
+        self._mongo = mongo
+
+    @property
+    def _collection(self) -> AsyncCollection:
+        return self._mongo.note_stats
+
+    @property
+    def _notes(self) -> AsyncCollection:
+        return self._mongo.notes
+
+    async def _apply(self, author: str, active: int = 0, deleted: int = 0,
+                     created_at: datetime = None, created: int = 0):
+        requests = [
+            UpdateOne({"_id": TOTAL_ID}, {"$inc": {"active": active, "deleted": deleted}}, upsert=True),
+            UpdateOne(
+                {"_id": f"author:{author}"},
+                {"$inc": {"active": active, "deleted": deleted}, "$setOnInsert": {"kind": "author", "author": author}},
+                upsert=True
+            ),
+        ]
+        if created:
+            day = created_at.strftime("%Y-%m-%d")
+            requests.append(UpdateOne(
+                {"_id": f"day:{day}"},
+                {"$inc": {"created": created}, "$setOnInsert": {"kind": "day", "day": day}},
+                upsert=True
+            ))
+
+        result = await self._collection.bulk_write(requests, ordered=False)
+        if 1 in result.upserted_ids:
+            await self._collection.update_one({"_id": TOTAL_ID}, {"$inc": {"authors": 1}})
+
+    async def record_created(self, author: str, created_at: datetime, count: int = 1):
+        await self._apply(author, active=count, created_at=created_at, created=count)
+
+    async def record_deleted(self, author: str, count: int = 1):
+        await self._apply(author, active=-count, deleted=count)
+
+    async def record_restored(self, author: str, count: int = 1):
+        await self._apply(author, active=count, deleted=-count)
+
+    async def summary(self) -> dict:
+        total = await self._collection.find_one({"_id": TOTAL_ID}) or {}
+        return _summary(total.get("active", 0), total.get("deleted", 0), total.get("authors", 0))
+
+    async def authors(self, limit: int, sort: str = "active") -> list[dict]:
+        stats_cursor = self._collection.find(
+            {"kind": "author"}, {"_id": 0, "author": 1, "active": 1, "deleted": 1}
+        ).sort([(sort, DESCENDING), ("author", ASCENDING)]).limit(limit)
+        return [
+            {**stats, "deleted_ratio": _deleted_ratio(stats["active"], stats["deleted"])}
+            async for stats in stats_cursor
+        ]
+
+    async def daily(self, created_from: datetime = None, created_to: datetime = None) -> list[dict]:
+        filter = {"kind": "day"}
+        bounds = {}
+        if created_from is not None:
+            bounds["$gte"] = created_from.strftime("%Y-%m-%d")
+        if created_to is not None:
+            bounds["$lt"] = created_to.strftime("%Y-%m-%d")
+        if bounds:
+            filter["day"] = bounds
+        return await self._collection.find(filter, {"_id": 0, "day": 1, "created": 1}).sort("day", ASCENDING).to_list()
+
+    async def live_summary(self) -> dict:
+        counts = {True: 0, False: 0}
+        groups_cursor = await self._notes.aggregate(
+            _with_archive([{"$group": {"_id": "$is_active", "count": {"$sum": 1}}}])
+        )
+        async for group in groups_cursor:
+            counts[bool(group["_id"])] += group["count"]
+        authors_cursor = await self._notes.aggregate(
+            _with_archive([{"$group": {"_id": "$author"}}, {"$count": "authors"}])
+        )
+        authors = await authors_cursor.to_list()
+        return _summary(counts[True], counts[False], authors[0]["authors"] if authors else 0)
+
+    def _authors_pipeline(self, sort: str = "active", limit: int = None) -> list[dict]:
+        pipeline = _with_archive([
+            {"$group": {
+                "_id": "$author",
+                "active": {"$sum": {"$cond": ["$is_active", 1, 0]}},
+                "deleted": {"$sum": {"$cond": ["$is_active", 0, 1]}},
+            }},
+            {"$sort": {sort: DESCENDING, "_id": ASCENDING}},
+        ])
+        if limit is not None:
+            pipeline.append({"$limit": limit})
+        pipeline.append({"$project": {"_id": 0, "author": "$_id", "active": 1, "deleted": 1}})
+        return pipeline
+
+    def _daily_pipeline(self, created_from: datetime = None, created_to: datetime = None) -> list[dict]:
+        # Legacy string dates are skipped; migrate_created_at.py converts them.
+        created_at = {"$type": "date"}
+        if created_from is not None:
+            created_at["$gte"] = created_from
+        if created_to is not None:
+            created_at["$lt"] = created_to
+        return _with_archive([
+            {"$group": {
+                "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                "created": {"$sum": 1},
+            }},
+            {"$sort": {"_id": ASCENDING}},
+            {"$project": {"_id": 0, "day": "$_id", "created": 1}},
+        ], match={"created_at": created_at})
+
+    async def live_authors(self, limit: int, sort: str = "active") -> list[dict]:
+        stats_cursor = await self._notes.aggregate(self._authors_pipeline(sort, limit))
+        return [
+            {**stats, "deleted_ratio": _deleted_ratio(stats["active"], stats["deleted"])}
+            async for stats in stats_cursor
+        ]
+
+    async def live_daily(self, created_from: datetime = None, created_to: datetime = None) -> list[dict]:
+        return await (await self._notes.aggregate(self._daily_pipeline(created_from, created_to))).to_list()
+
+    async def rebuild(self) -> dict:
+        """Recomputes every rollup from notes and notes_archive, e.g. after rollups drifted or on first deploy."""
+        authors = await (await self._notes.aggregate(self._authors_pipeline())).to_list()
+        days = await (await self._notes.aggregate(self._daily_pipeline())).to_list()
+        active = sum(stats["active"] for stats in authors)
+        deleted = sum(stats["deleted"] for stats in authors)
+
+        documents = [{"_id": TOTAL_ID, "active": active, "deleted": deleted, "authors": len(authors)}]
+        documents += [{"_id": f"author:{stats['author']}", "kind": "author", **stats} for stats in authors]
+        documents += [{"_id": f"day:{stats['day']}", "kind": "day", **stats} for stats in days]
+
+        # Replaced in place, then stale ids removed: readers never see the collection empty or half filled.
+        await self._collection.bulk_write(
+            [ReplaceOne({"_id": document["_id"]}, document, upsert=True) for document in documents], ordered=False
+        )
+        await self._collection.delete_many({"_id": {"$nin": [document["_id"] for document in documents]}})
+        return _summary(active, deleted, len(authors))
@@ -0,0 +1,127 @@
+import time
+from typing import AsyncIterator
+
+from bson import json_util
+from pydantic import ValidationError
+from pymongo import ASCENDING, ReplaceOne
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.errors import BulkWriteError
+
+from app.crud.note_stats import NoteStatsDAO
+from database.schemas import NoteInDB
+
+# Relaxed extended JSON keeps datetimes typed ({"$date": ...}), so an export imports back unchanged.
+EXPORT_JSON_OPTIONS = json_util.RELAXED_JSON_OPTIONS
+# Longest accepted line; a note is at most 256 + 65536 characters of text plus metadata.
+MAX_LINE_BYTES = 1024 * 1024
+MAX_REPORTED_ERRORS = 20
+DUPLICATE_KEY_ERROR = 11000
+
+
+async def export_notes(db: AsyncDatabase, author: str = None, batch_size: int = 500) -> AsyncIterator[str]:
+    """Yields every note, deleted ones included, as NDJSON lines; the cursor holds at most one batch in memory."""
+    filter = {"author": author} if author is not None else {}
+    notes_cursor = db.notes.find(filter, {"_id": 0}).sort("_id", ASCENDING).batch_size(batch_size)
+    async for note in notes_cursor:
+        yield json_util.dumps(note, json_options=EXPORT_JSON_OPTIONS) + "\n"
+
+
+async def ndjson_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Splits a stream of byte chunks into lines without holding more than one line and one chunk."""
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+        if len(pending) > MAX_LINE_BYTES:
+            raise ValueError(f"Line exceeds {MAX_LINE_BYTES} bytes")
+    if pending:
+        yield pending
+
+
+def _parse_note(line: bytes) -> dict:
+    note = NoteInDB.model_validate(json_util.loads(line, json_options=EXPORT_JSON_OPTIONS))
+    return note.model_dump(exclude_none=True)
+
+
+class NoteImporter():
+    """Loads notes with unordered insert_many batches; notes whose uuid already exists are replaced."""
+
+    def __init__(self, db: AsyncDatabase, batch_size: int = 1000):
+        self._db = db
+        self._batch_size = batch_size
+        self.imported = self.replaced = self.failed = 0
+        self.errors: list[str] = []
+
+    def _error(self, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(message)
+
+    async def _load(self, batch: list[tuple[int, dict]]):
+        documents = [note for _, note in batch]
+        try:
+            await self._db.notes.insert_many(documents, ordered=False)
+            self.imported += len(documents)
+            return
+        except BulkWriteError as e:
+            write_errors = e.details["writeErrors"]
+        self.imported += len(documents) - len(write_errors)
+
+        # insert_many adds _id to the documents; replacements must keep the stored _id instead.
+        duplicates = []
+        for error in write_errors:
+            line_number, note = batch[error["index"]]
+            if error["code"] == DUPLICATE_KEY_ERROR:
+                note.pop("_id", None)
+                duplicates.append(ReplaceOne({"uuid": note["uuid"]}, note, upsert=True))
+            else:
+                self._error(f"line {line_number}: {error['errmsg']}")
+        if duplicates:
+            result = await self._db.notes.bulk_write(duplicates, ordered=False)
+            self.replaced += result.matched_count + result.upserted_count
+
+    async def run(self, lines: AsyncIterator[bytes]) -> dict:
+        started = time.perf_counter()
+        batch = []
+        line_number = 0
+        async for line in lines:
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                batch.append((line_number, _parse_note(line)))
+            except (ValueError, ValidationError) as e:
+                self._error(f"line {line_number}: {e}")
+                continue
+            if len(batch) >= self._batch_size:
+                await self._load(batch)
+                batch = []
+        if batch:
+            await self._load(batch)
+
+        seconds = time.perf_counter() - started
+        loaded = self.imported + self.replaced
+        return {
+            "imported": self.imported,
+            "replaced": self.replaced,
+            "failed": self.failed,
+            "errors": self.errors,
+            "seconds": round(seconds, 3),
+            "notes_per_second": round(loaded / seconds, 1) if seconds else 0.0,
+        }
+
+
+async def import_notes(db: AsyncDatabase, lines: AsyncIterator[bytes], batch_size: int = 1000) -> dict:
+    """Imports NDJSON notes and rebuilds the note statistics rollups the import bypassed.
+
+    The rollups are rebuilt even when the input is rejected halfway, e.g. for exceeding the size limit,
+    since the batches loaded until then stay in the collection.
+    """
+    importer = NoteImporter(db, batch_size)
+    try:
+        return await importer.run(lines)
+    finally:
+        if importer.imported or importer.replaced:
+            await NoteStatsDAO(db).rebuild()
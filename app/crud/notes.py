@@ -1,92 +1,321 @@
+import asyncio
+import logging
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 
 from pymongo import DESCENDING, ReturnDocument
-from pymongo.database import Collection, Database
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.cursor import AsyncCursor
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
 
+from app.crud.exceptions import (InvalidFieldsException,
+                                 NoteVersionConflictException)
+from app.crud.note_stats import NoteStatsDAO
+from app.utils.metrics import Counter, instrument_dao
+from app.utils.pagination import keyset_filter
 from app.utils.raise_if_not_found import raise_if_not_found
 from database.schemas import NoteCreate
 
+logger = logging.getLogger(__name__)
 
+NOTE_STATS_FAILURES = Counter(
+    "note_stats_update_failures_total", "Note writes whose note_stats rollup update failed.", ("operation",)
+)
+
+NOTES_ORDER = [("created_at", DESCENDING), ("uuid", DESCENDING)]
+# Enough of a note to build page tokens and ETags.
+VERSION_PROJECTION = {"uuid": 1, "created_at": 1, "version": 1, "_id": 0}
+
+
+def versioned_update(set_fields: dict) -> dict:
+    """Builds an update that also bumps the note version and its updated_at timestamp."""
+    return {
+        "$set": {**set_fields, "updated_at": datetime.now(timezone.utc)},
+        "$inc": {"version": 1},
+    }
+
+
+NOTE_FIELDS = ("title", "body", "uuid", "created_at", "version", "updated_at")
+STAFF_NOTE_FIELDS = NOTE_FIELDS + ("author", "is_active")
+# Always returned, since page tokens and ETags are built from them.
+REQUIRED_FIELDS = ("uuid", "created_at", "version")
+
+
+def list_projection(fields: list[str] | None = None, body_preview: int | None = None,
+                    for_staff: bool = False) -> dict | None:
+    """Projection for trimmed list views: selected fields, optionally with only the first body_preview characters."""
+    if fields is None and body_preview is None:
+        return None
+
+    allowed = STAFF_NOTE_FIELDS if for_staff else NOTE_FIELDS
+    selected = fields or allowed
+    unknown = [field for field in selected if field not in allowed]
+    if unknown:
+        raise InvalidFieldsException(", ".join(unknown))
+
+    projection = {"_id": 0, **dict.fromkeys(REQUIRED_FIELDS, 1), **dict.fromkeys(selected, 1)}
+    if body_preview is not None and "body" in projection:
+        projection["body"] = {"$substrCP": ["$body", 0, body_preview]}
+    return projection
+
+
+def created_at_range(created_from: datetime = None, created_to: datetime = None) -> dict:
+    """Filter on created_at within [created_from, created_to); bounds the created_at index scan."""
+    bounds = {}
+    if created_from is not None:
+        bounds["$gte"] = created_from
+    if created_to is not None:
+        bounds["$lt"] = created_to
+    return {"created_at": bounds} if bounds else {}
+
+
+def version_filter(expected_version: int | None) -> dict:
+    """Matches only the expected version; notes created before versioning have none and count as version 0."""
+    if expected_version is None:
+        return {}
+    if expected_version == 0:
+        return {"version": {"$in": [0, None]}}
+    return {"version": expected_version}
+
+
+@instrument_dao
 class NoteDAO():
-    def __init__(self, mongo: Database):
+    def __init__(self, mongo: AsyncDatabase):
         self._mongo = mongo
+        self._stats = NoteStatsDAO(mongo)
 
     @property
-    def _collection(self) -> Collection:
+    def _collection(self) -> AsyncCollection:
         return self._mongo.notes
 
-    def create_new_note(self, new_note: NoteCreate, author: str):
+    async def _record_stats(self, operation: str, *args, **kwargs):
+        # The note write has already succeeded: failing the request now would make the client retry it and
+        # duplicate the note. The drift is repaired by rebuild_note_stats.py.
+        try:
+            await getattr(self._stats, operation)(*args, **kwargs)
+        except PyMongoError:
+            NOTE_STATS_FAILURES.labels(operation).inc()
+            logger.exception(f"Updating note_stats ({operation}) failed, run rebuild_note_stats.py to repair")
+
+    def _new_note_document(self, new_note: NoteCreate, author: str, now: datetime = None) -> dict:
         note_dict = new_note.model_dump()
+        if now is None:
+            now = datetime.now(timezone.utc).replace(microsecond=0)
 
         note_dict["author"] = author
         note_dict["uuid"] = str(uuid.uuid4())
-        note_dict["created_at"] = datetime.now().replace(second=0, microsecond=0, tzinfo=None).strftime("%Y-%m-%d %H:%M")
+        note_dict["created_at"] = now
         note_dict["is_active"] = True
+        note_dict["version"] = 1
+        note_dict["updated_at"] = now
+
+        return note_dict
+
+    async def create_new_note(self, new_note: NoteCreate, author: str) -> dict:
+        note_dict = self._new_note_document(new_note, author)
+        await self._collection.insert_one(note_dict)
+        await self._record_stats("record_created", author, note_dict["created_at"])
+        return note_dict
+
+    async def create_new_notes(self, new_notes: list[NoteCreate], author: str) -> list[dict]:
+        # One created_at for the whole batch, so it is counted under a single day in the rollup.
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        documents = [self._new_note_document(new_note, author, now) for new_note in new_notes]
+
+        failed = set()
+        try:
+            await self._collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            failed = {error["index"] for error in e.details["writeErrors"]}
+
+        if len(failed) < len(documents):
+            await self._record_stats("record_created", author, now, count=len(documents) - len(failed))
+
+        return [
+            {"uuid": document["uuid"], "status": "failed" if index in failed else "created"}
+            for index, document in enumerate(documents)
+        ]
+
+    async def _batch_write(self, uuid: str, author: str, update: dict, success: str) -> str:
+        # The status comes from the write itself, so notes changed by other requests meanwhile are reported truthfully.
+        try:
+            note = await self._collection.find_one_and_update(
+                {"uuid": uuid, "author": author, "is_active": True},
+                update,
+                projection={"_id": 1}
+            )
+        except PyMongoError:
+            return "failed"
+        return success if note is not None else "not_found"
+
+    async def update_notes_by_uuid(self, updates: list[dict], author: str) -> list[dict]:
+        # A uuid repeated in one request is written once, with the later fields taking precedence.
+        updated_data = {}
+        for update in updates:
+            updated_data.setdefault(update["uuid"], {}).update(update["updated_data"])
 
-        self._collection.insert_one(note_dict)
+        statuses = await asyncio.gather(*(
+            self._batch_write(uuid, author, versioned_update(data), "updated") for uuid, data in updated_data.items()
+        ))
+        return [{"uuid": uuid, "status": status} for uuid, status in zip(updated_data, statuses)]
 
-    def get_notes_by_author(self, author: str):
+    async def delete_notes_by_uuid(self, uuids: list[str], author: str) -> list[dict]:
+        uuids = list(dict.fromkeys(uuids))
+
+        statuses = await asyncio.gather(*(
+            self._batch_write(uuid, author, versioned_update({"is_active": False}), "deleted") for uuid in uuids
+        ))
+        deleted = statuses.count("deleted")
+        if deleted:
+            await self._record_stats("record_deleted", author, count=deleted)
+
+        return [{"uuid": uuid, "status": status} for uuid, status in zip(uuids, statuses)]
+
+    def _find_page(self, filter: dict, projection: dict, limit: int = None,
+                   page_token: str = None, batch_size: int = None) -> AsyncCursor:
         notes_cursor = self._collection.find(
-            {"author": author, "is_active": True},
-            {"is_active": 0, "author": 0, "_id": 0}
-        ).sort("created_at", DESCENDING)
+            keyset_filter(filter, page_token),
+            projection
+        ).sort(NOTES_ORDER)
+
+        if limit is not None:
+            notes_cursor = notes_cursor.limit(limit)
+        if batch_size is not None:
+            notes_cursor = notes_cursor.batch_size(batch_size)
+
+        return notes_cursor
+
+    def find_notes_by_author(self, author: str, limit: int = None, page_token: str = None,
+                             batch_size: int = None, projection: dict = None,
+                             created_from: datetime = None, created_to: datetime = None) -> AsyncCursor:
+        return self._find_page(
+            {"author": author, "is_active": True, **created_at_range(created_from, created_to)},
+            projection or {"is_active": 0, "author": 0, "_id": 0},
+            limit=limit, page_token=page_token, batch_size=batch_size
+        )
+
+    async def get_notes_by_author(self, author: str, limit: int = None, page_token: str = None):
+        return await self.find_notes_by_author(author, limit=limit, page_token=page_token).to_list()
+
+    async def search_notes(self, query: str, author: str = None, limit: int = None, offset: int = 0,
+                           for_staff: bool = False) -> list[dict]:
+        filter = {"$text": {"$search": query}}
+        if not for_staff:
+            filter["is_active"] = True
+        if author is not None:
+            filter["author"] = author
+
+        projection = {"_id": 0, "score": {"$meta": "textScore"}}
+        if not for_staff:
+            projection.update({"is_active": 0, "author": 0})
+
+        notes_cursor = self._collection.find(filter, projection).sort(
+            [("score", {"$meta": "textScore"}), ("created_at", DESCENDING)]
+        ).skip(offset)
+        if limit is not None:
+            notes_cursor = notes_cursor.limit(limit)
 
-        return list(notes_cursor)
+        return await notes_cursor.to_list()
 
     @raise_if_not_found
-    def get_note_by_uuid(self, note_uuid: str, author: str):
-        note = self._collection.find_one(
+    async def get_note_by_uuid(self, note_uuid: str, author: str):
+        note = await self._collection.find_one(
             {"uuid": note_uuid, "is_active": True, "author": author},
             {"is_active": 0, "author": 0, "_id": 0}
         )
         return note
       
-    @raise_if_not_found
-    def update_note_by_uuid(self, uuid: str, updated_data: dict, author: str) -> dict:
-        note = self._collection.find_one_and_update(
+    async def _raise_if_version_conflict(self, uuid: str, author: str):
+        # Only reached when a conditional write matched nothing: tell a stale version from a missing note.
+        current = await self._collection.find_one(
             {"uuid": uuid, "author": author, "is_active": True},
-            {"$set": updated_data},
+            {"version": 1, "_id": 0}
+        )
+        if current is not None:
+            raise NoteVersionConflictException(uuid, current.get("version", 0))
+
+    @raise_if_not_found
+    async def update_note_by_uuid(self, uuid: str, updated_data: dict, author: str,
+                                  expected_version: int = None) -> dict:
+        note = await self._collection.find_one_and_update(
+            {"uuid": uuid, "author": author, "is_active": True, **version_filter(expected_version)},
+            versioned_update(updated_data),
             projection={"is_active": 0, "author": 0, "_id": 0},
             return_document=ReturnDocument.AFTER
         )
+        if note is None and expected_version is not None:
+            await self._raise_if_version_conflict(uuid, author)
 
         return note
 
     @raise_if_not_found
-    def delete_note_by_uuid(self, uuid: str, author: str):
-        note = self._collection.find_one_and_update(
-            {"uuid": uuid, "author": author, "is_active": True},
-            {"$set": {"is_active": False}}
+    async def delete_note_by_uuid(self, uuid: str, author: str, expected_version: int = None):
+        note = await self._collection.find_one_and_update(
+            {"uuid": uuid, "author": author, "is_active": True, **version_filter(expected_version)},
+            versioned_update({"is_active": False})
         )
+        if note is None and expected_version is not None:
+            await self._raise_if_version_conflict(uuid, author)
+        if note is not None:
+            await self._record_stats("record_deleted", author)
+        return note
+
+    async def _restore_archived_note(self, uuid: str) -> dict | None:
+        archived = await self._mongo.notes_archive.find_one({"uuid": uuid})
+        if archived is None:
+            return None
+
+        archived.pop("archived_at", None)
+        note = {
+            **archived,
+            "is_active": True,
+            "version": archived.get("version", 0) + 1,
+            "updated_at": datetime.now(timezone.utc),
+        }
+        try:
+            await self._collection.insert_one(note)
+        except DuplicateKeyError:
+            # Restored by a concurrent request, or the archiver has not removed it from notes yet.
+            return None
+        await self._mongo.notes_archive.delete_one({"_id": archived["_id"]})
         return note
 
     @raise_if_not_found
-    def restore_note_by_uuid(self, uuid: str):
-        note = self._collection.find_one_and_update(
+    async def restore_note_by_uuid(self, uuid: str):
+        note = await self._collection.find_one_and_update(
             {"uuid": uuid, "is_active": False},
-            {"$set": {"is_active": True}},
+            versioned_update({"is_active": True}),
             return_document=ReturnDocument.AFTER
         )
+        if note is None:
+            note = await self._restore_archived_note(uuid)
+        if note is not None:
+            await self._record_stats("record_restored", note["author"])
 
         return note
 
     @raise_if_not_found
-    def get_note_by_uuid_for_staff(self, note_uuid: str):
-        note = self._collection.find_one(
+    async def get_note_by_uuid_for_staff(self, note_uuid: str):
+        note = await self._collection.find_one(
             {"uuid": note_uuid},
             {"_id": 0}
         )
 
         return note
 
-    def get_notes_list_for_staff(self, author: str = None):
+    def find_notes_for_staff(self, author: str = None, limit: int = None, page_token: str = None,
+                             batch_size: int = None, projection: dict = None,
+                             created_from: datetime = None, created_to: datetime = None) -> AsyncCursor:
 
         filter = {"author": author} if author is not None else {}
+        filter.update(created_at_range(created_from, created_to))
 
-        notes_cursor = self._collection.find(
+        return self._find_page(
             filter,
-            {"_id": 0}
-        ).sort("created_at", DESCENDING)
+            projection or {"_id": 0},
+            limit=limit, page_token=page_token, batch_size=batch_size
+        )
 
-        return list(notes_cursor)
+    async def get_notes_list_for_staff(self, author: str = None, limit: int = None, page_token: str = None):
+        return await self.find_notes_for_staff(author, limit=limit, page_token=page_token).to_list()
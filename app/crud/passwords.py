@@ -0,0 +1,109 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from passlib.context import CryptContext
+
+from app.crud.exceptions import PasswordHasherOverloadedException
+from app.utils.metrics import Counter
+
+PWD_CONTEXT = CryptContext(schemes=['argon2'], deprecated='auto')
+
+ARGON2_SECONDS = Counter("argon2_seconds_total", "Time spent in argon2 by operation.", ("operation",))
+ARGON2_QUEUED_SECONDS = Counter(
+    "argon2_queued_seconds_total", "Time argon2 calls waited for a worker by operation.", ("operation",)
+)
+ARGON2_REJECTED = Counter("argon2_rejected_total", "Argon2 calls rejected because the queue was full.")
+ARGON2_POOL_RESTARTS = Counter("argon2_pool_restarts_total", "Argon2 process pools replaced after a worker died.")
+
+
+def _timed_hash(password: str) -> tuple[str, float]:
+    started = time.perf_counter()
+    hashed_password = PWD_CONTEXT.hash(password)
+    return hashed_password, time.perf_counter() - started
+
+
+def _timed_verify_and_update(password: str, hashed_password: str) -> tuple[tuple[bool, str | None], float]:
+    started = time.perf_counter()
+    result = PWD_CONTEXT.verify_and_update(password, hashed_password)
+    return result, time.perf_counter() - started
+
+
+class PasswordHasher():
+    """Runs argon2 in a dedicated process pool and sheds load once too many calls are pending."""
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self._max_workers = max_workers
+        self._max_pending = max_pending
+        self._executor: ProcessPoolExecutor | None = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.queued_seconds = 0.0
+        self.hashing_seconds = 0.0
+
+    def start(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self._max_workers)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, operation: str, func, *args):
+        if self.pending >= self._max_pending:
+            self.rejected += 1
+            ARGON2_REJECTED.inc()
+            raise PasswordHasherOverloadedException
+
+        self.pending += 1
+        submitted = time.perf_counter()
+        try:
+            try:
+                result, hashing_seconds = await self._submit(func, *args)
+            except BrokenProcessPool:
+                # A worker died, e.g. killed for memory; the pool refuses all further work, so replace it once.
+                result, hashing_seconds = await self._submit(func, *args)
+        finally:
+            self.pending -= 1
+
+        queued_seconds = max(time.perf_counter() - submitted - hashing_seconds, 0.0)
+        self.completed += 1
+        self.hashing_seconds += hashing_seconds
+        self.queued_seconds += queued_seconds
+        ARGON2_SECONDS.labels(operation).inc(hashing_seconds)
+        ARGON2_QUEUED_SECONDS.labels(operation).inc(queued_seconds)
+        return result
+
+    async def _submit(self, func, *args):
+        self.start()
+        executor = self._executor
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            # Concurrent calls fail together; only the first one replaces the pool.
+            if self._executor is executor:
+                self._executor = None
+                executor.shutdown(wait=False, cancel_futures=True)
+                ARGON2_POOL_RESTARTS.inc()
+            raise
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", _timed_hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> tuple[bool, str | None]:
+        """Returns whether the password matches and a new hash if the stored one uses stale parameters."""
+        return await self._run("verify", _timed_verify_and_update, password, hashed_password)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self._max_workers,
+            "max_pending": self._max_pending,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queued_seconds": round(self.queued_seconds, 6),
+            "hashing_seconds": round(self.hashing_seconds, 6),
+        }
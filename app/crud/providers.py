@@ -0,0 +1,19 @@
+from typing import Callable, TypeVar
+
+from pymongo.asynchronous.database import AsyncDatabase
+
+DAO = TypeVar("DAO")
+
+_shared: dict[Callable, object] = {}
+
+
+def shared_dao(dao_class: Callable[..., DAO], mongo: AsyncDatabase) -> DAO:
+    """Returns the shared instance of a DAO class bound to the given database.
+
+    DAOs hold nothing but the database handle, so one instance per class serves every request;
+    a new one is built only when the database changes, e.g. after the client was reopened in a new process.
+    """
+    dao = _shared.get(dao_class)
+    if dao is None or dao._mongo is not mongo:
+        dao = _shared[dao_class] = dao_class(mongo=mongo)
+    return dao
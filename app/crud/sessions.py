@@ -0,0 +1,101 @@
+import hashlib
+import json
+import secrets
+from datetime import datetime, timedelta, timezone
+
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.database import AsyncDatabase
+
+from app.utils.cache import Cache, create_cache_backend
+from app.utils.metrics import instrument_dao
+from conf.app_conf import access_token_config, user_cache_config
+from database.schemas import UserInDB
+
+session_cache = Cache(
+    create_cache_backend(user_cache_config.backend_url, user_cache_config.max_entries),
+    namespace="session",
+    ttl=access_token_config.session_cache_ttl_seconds,
+)
+
+
+def _token_hash(token: str) -> str:
+    # Only hashes are stored, so a leaked sessions collection does not leak usable tokens.
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _principal(session: dict) -> UserInDB:
+    # Sessions never carry credentials; the principal is what handlers need to authorize a request.
+    return UserInDB(username=session["username"], role=session["role"], hashed_password="")
+
+
+@instrument_dao
+class SessionDAO():
+    def __init__(self, mongo: AsyncDatabase):
+        self._mongo = mongo
+
+    @property
+    def _collection(self) -> AsyncCollection:
+        return self._mongo.sessions
+
+    async def create_session(self, user: UserInDB) -> dict:
+        access_token, refresh_token = secrets.token_urlsafe(32), secrets.token_urlsafe(32)
+        now = datetime.now(timezone.utc)
+
+        await self._collection.insert_one({
+            "_id": _token_hash(access_token),
+            "refresh_hash": _token_hash(refresh_token),
+            "username": user.username,
+            "role": user.role,
+            "created_at": now,
+            "expires_at": now + timedelta(minutes=access_token_config.access_token_expire_minutes),
+            "refresh_expires_at": now + timedelta(minutes=access_token_config.refresh_token_expire_minutes),
+        })
+
+        return {"access_token": access_token, "refresh_token": refresh_token}
+
+    async def get_principal(self, access_token: str) -> UserInDB | None:
+        token_hash = _token_hash(access_token)
+        now = datetime.now(timezone.utc)
+
+        cached = await session_cache.get(token_hash)
+        if cached is not None:
+            session = json.loads(cached)
+            if session["expires_at"] > now.timestamp():
+                return _principal(session)
+            await session_cache.invalidate(token_hash)
+            return None
+
+        session = await self._collection.find_one(
+            {"_id": token_hash, "expires_at": {"$gt": now}},
+            {"username": 1, "role": 1, "expires_at": 1}
+        )
+        if session is None:
+            return None
+
+        expires_at = session["expires_at"].replace(tzinfo=timezone.utc).timestamp()
+        await session_cache.set(token_hash, json.dumps(
+            {"username": session["username"], "role": session["role"], "expires_at": expires_at}
+        ).encode())
+        return _principal(session)
+
+    async def consume_refresh_token(self, refresh_token: str) -> str | None:
+        """Ends the session the refresh token belongs to and returns its username; each refresh token works once."""
+        session = await self._collection.find_one_and_delete(
+            {"refresh_hash": _token_hash(refresh_token), "refresh_expires_at": {"$gt": datetime.now(timezone.utc)}},
+            projection={"username": 1}
+        )
+        if session is None:
+            return None
+
+        await session_cache.invalidate(session["_id"])
+        return session["username"]
+
+    async def revoke_session(self, access_token: str):
+        token_hash = _token_hash(access_token)
+        await self._collection.delete_one({"_id": token_hash})
+        await session_cache.invalidate(token_hash)
+
+    async def update_role(self, username: str, role: str):
+        await self._collection.update_many({"username": username}, {"$set": {"role": role}})
+        async for session in self._collection.find({"username": username}, {"_id": 1}):
+            await session_cache.invalidate(session["_id"])
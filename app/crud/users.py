@@ -1,72 +1,119 @@
+import json
+import time
 from datetime import datetime, timedelta
 
-from fastapi import Depends
+from fastapi import Depends, Request
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from pymongo.database import Collection, Database
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.errors import DuplicateKeyError
 
 from app.crud.exceptions import (CreredentialsException, ExistRoleException,
                                  UserAlreadeCreatedException,
                                  UserNotFoundException, UserRoleDoesNotExist)
-from conf.app_conf import access_token_config
+from app.crud.passwords import PasswordHasher
+from app.crud.providers import shared_dao
+from app.crud.sessions import SessionDAO
+from app.utils.cache import Cache, create_cache_backend
+from app.utils.metrics import Counter, instrument_dao
+from app.utils.rate_limit import PRINCIPAL_STATE
+from conf.app_conf import (access_token_config, password_hasher_config,
+                           user_cache_config)
 from database.mongo import get_db
-from database.schemas import UserInDB
+from database.schemas import Token, UserInDB
 
-PWD_CONTEXT = CryptContext(schemes=['argon2'], deprecated='auto')
+password_hasher = PasswordHasher(
+    max_workers=password_hasher_config.workers,
+    max_pending=password_hasher_config.max_pending,
+)
 
+JWT_DECODE_SECONDS = Counter("jwt_decode_seconds_total", "Time spent decoding access tokens.")
+JWT_DECODES = Counter("jwt_decodes_total", "Access tokens decoded.")
 
+user_cache = Cache(
+    create_cache_backend(user_cache_config.backend_url, user_cache_config.max_entries),
+    namespace="user",
+    ttl=user_cache_config.ttl_seconds,
+)
+# How long an invalidation keeps reads that started before it from filling the cache.
+INVALIDATION_TTL_SECONDS = 10
+
+
+def _invalidated_key(email: str) -> str:
+    return f"{email}:invalidated"
+
+
+async def _invalidate_principal(email: str):
+    await user_cache.invalidate(email)
+    await user_cache.set(_invalidated_key(email), str(time.time()).encode(), ttl=INVALIDATION_TTL_SECONDS)
+
+
+@instrument_dao
 class UserDAO():
-    def __init__(self, mongo: Database):
+    def __init__(self, mongo: AsyncDatabase):
         self._mongo = mongo
         self.user_roles = ("User", "Admin")
 
     @property
-    def _collection(self) -> Collection:
+    def _collection(self) -> AsyncCollection:
         return self._mongo.users
 
-    def get_user(self, email: str) -> UserInDB | None:
-        user_data = self._collection.find_one({"username": email})
+    async def get_user(self, email: str) -> UserInDB | None:
+        user_data = await self._collection.find_one({"username": email})
         if user_data:
             return UserInDB(**user_data)
 
-    def _get_password_hash(self, password) -> str:
-        return PWD_CONTEXT.hash(password)
+    async def _get_password_hash(self, password) -> str:
+        return await password_hasher.hash(password)
 
-    def create_new_user(self, email: str, password: str, role: str = "User"):
-        if self.get_user(email):
-            raise UserAlreadeCreatedException
-        hashed_password = self._get_password_hash(password)
+    async def create_new_user(self, email: str, password: str, role: str = "User"):
+        hashed_password = await self._get_password_hash(password)
         user = UserInDB(username=email, hashed_password=hashed_password, role=role)
 
-        self._collection.insert_one(user.model_dump())
+        try:
+            await self._collection.insert_one(user.model_dump())
+        except DuplicateKeyError:
+            raise UserAlreadeCreatedException
 
-    def update_user_role_in_db(self, email: str, new_role: str):
+    async def update_user_role_in_db(self, email: str, new_role: str):
         if new_role not in self.user_roles:
             raise UserRoleDoesNotExist
 
-        user = self.get_user(email=email)
+        user = await self.get_user(email=email)
         if not user:
             raise UserNotFoundException
 
         if user.role == new_role:
             raise ExistRoleException
 
-        self._collection.update_one(
+        await self._collection.update_one(
             {"username": email},
             {"$set": {"role": new_role}})
+        await _invalidate_principal(email)
+        await shared_dao(SessionDAO, self._mongo).update_role(email, new_role)
 
+    async def update_password_hash(self, email: str, hashed_password: str):
+        await self._collection.update_one(
+            {"username": email},
+            {"$set": {"hashed_password": hashed_password}})
+        await _invalidate_principal(email)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return PWD_CONTEXT.verify(plain_password, hashed_password)
 
+async def authenticate_user(mongo: AsyncDatabase, email: str, password: str) -> UserInDB | None:
+    user = await shared_dao(UserDAO, mongo).get_user(email=email)
 
-def authenticate_user(mongo: Database, email: str, password: str) -> UserInDB | None:
-    user = UserDAO(mongo=mongo).get_user(email=email)
+    if user is None:
+        raise UserNotFoundException
 
-    if user is not None and verify_password(password, user.hashed_password):
-        return user
-    raise UserNotFoundException
+    is_valid, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    if not is_valid:
+        raise UserNotFoundException
+
+    if new_hash is not None:
+        await shared_dao(UserDAO, mongo).update_password_hash(email, new_hash)
+        user.hashed_password = new_hash
+    return user
 
 
 def create_access_token(data: dict) -> str:
@@ -82,10 +129,37 @@ def create_access_token(data: dict) -> str:
     return encoded_jwt
 
 
+def session_mode() -> bool:
+    return access_token_config.mode == "session"
+
+
+async def issue_token(mongo: AsyncDatabase, user: UserInDB) -> Token:
+    if session_mode():
+        tokens = await shared_dao(SessionDAO, mongo).create_session(user)
+        return Token(token_type="bearer", **tokens)
+    return Token(access_token=create_access_token(data={"sub": user.username}), token_type="bearer")
+
+
+async def refresh_session(mongo: AsyncDatabase, refresh_token: str) -> Token:
+    username = await shared_dao(SessionDAO, mongo).consume_refresh_token(refresh_token)
+    user = await shared_dao(UserDAO, mongo).get_user(email=username) if username is not None else None
+    if user is None:
+        raise CreredentialsException
+    return await issue_token(mongo, user)
+
+
 OAUTH2_SCHEME = OAuth2PasswordBearer(tokenUrl='/users/token')
+OPTIONAL_OAUTH2_SCHEME = OAuth2PasswordBearer(tokenUrl='/users/token', auto_error=False)
+
 
+async def resolve_principal(token: str, db: AsyncDatabase) -> UserInDB:
+    if session_mode():
+        user = await shared_dao(SessionDAO, db).get_principal(token)
+        if user is None:
+            raise CreredentialsException
+        return user
 
-def get_current_user_from_token(token: str = Depends(OAUTH2_SCHEME), db=Depends(get_db)) -> UserInDB:
+    started = time.perf_counter()
     try:
         payload = jwt.decode(
             token,
@@ -97,7 +171,59 @@ def get_current_user_from_token(token: str = Depends(OAUTH2_SCHEME), db=Depends(
             raise CreredentialsException
     except JWTError:
         raise CreredentialsException
-    user = UserDAO(mongo=db).get_user(email=email)
+    finally:
+        JWT_DECODE_SECONDS.inc(time.perf_counter() - started)
+        JWT_DECODES.inc()
+    user = await get_principal(db, email)
     if user is None:
         raise UserNotFoundException
     return user
+
+
+def _resolved_principal(request: Request, token: str) -> UserInDB | None:
+    # The rate limiter resolves principal-keyed requests before routing; reuse its result for the same token.
+    resolved = request.scope.get("state", {}).get(PRINCIPAL_STATE)
+    if resolved is not None and resolved[0] == token:
+        return resolved[1]
+    return None
+
+
+async def get_current_user_from_token(request: Request, token: str = Depends(OAUTH2_SCHEME),
+                                      db=Depends(get_db)) -> UserInDB:
+    return _resolved_principal(request, token) or await resolve_principal(token, db)
+
+
+async def get_current_user_from_stream_token(request: Request,
+                                             header_token: str | None = Depends(OPTIONAL_OAUTH2_SCHEME),
+                                             token: str | None = None, db=Depends(get_db)) -> UserInDB:
+    """Also accepts the token as ?token=, since browsers' EventSource cannot send an Authorization header."""
+    if header_token is None and token is None:
+        raise CreredentialsException
+    token = header_token or token
+    return _resolved_principal(request, token) or await resolve_principal(token, db)
+
+
+async def get_principal(mongo: AsyncDatabase, email: str) -> UserInDB | None:
+    if not user_cache_config.enabled:
+        return await shared_dao(UserDAO, mongo).get_user(email=email)
+
+    cached = await user_cache.get(email)
+    if cached is not None:
+        return UserInDB(**json.loads(cached), hashed_password="")
+
+    read_at = time.time()
+    user = await shared_dao(UserDAO, mongo).get_user(email=email)
+    if user is None:
+        return None
+    # A role change that raced with this read may already have been invalidated; caching the user read before it
+    # would bring the old role back until the entry expires.
+    invalidated_at = await user_cache.peek(_invalidated_key(email))
+    if invalidated_at is None or float(invalidated_at) < read_at:
+        # Only what handlers need to authorize a request; password hashes never leave the users collection.
+        await user_cache.set(email, user.model_dump_json(exclude={"hashed_password"}).encode())
+    return user.model_copy(update={"hashed_password": ""})
+
+
+async def resolve_token_principal(token: str) -> UserInDB:
+    """Resolves a bearer token outside of FastAPI dependency injection, e.g. in middleware."""
+    return await resolve_principal(token, get_db())
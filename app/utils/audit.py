@@ -0,0 +1,147 @@
+import copy
+import json
+import logging
+import queue
+from datetime import datetime, timezone
+from logging.handlers import (BufferingHandler, MemoryHandler, QueueHandler,
+                              QueueListener, RotatingFileHandler)
+
+from pymongo import MongoClient
+
+from conf.app_conf import audit_log_config
+from conf.mongodb import mongodb_config
+
+audit_logger = logging.getLogger("audit")
+
+
+def audit_document(record: logging.LogRecord) -> dict:
+    document = {
+        "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc),
+        "level": record.levelname,
+        "event": record.getMessage(),
+        **getattr(record, "audit", {}),
+    }
+    if record.exc_text:
+        document["exception"] = record.exc_text
+    return document
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        document = audit_document(record)
+        document["timestamp"] = document["timestamp"].isoformat(timespec="milliseconds")
+        return json.dumps(document, ensure_ascii=False)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Enqueues records without blocking and counts the ones dropped because the queue is full."""
+
+    def __init__(self, queue: queue.Queue):
+        super().__init__(queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BatchingQueueListener(QueueListener):
+    """Flushes buffering handlers whenever the queue drains, so writes are grouped under load."""
+
+    def dequeue(self, block: bool) -> logging.LogRecord:
+        if self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+        return self.queue.get(block)
+
+
+class MongoAuditHandler(BufferingHandler):
+    def __init__(self, capacity: int, collection_name: str):
+        super().__init__(capacity)
+        self._client = MongoClient(mongodb_config.host, int(mongodb_config.port), maxPoolSize=1)
+        self._collection = self._client[mongodb_config.database][collection_name]
+
+    def flush(self):
+        self.acquire()
+        try:
+            records, self.buffer = self.buffer, []
+            if records:
+                try:
+                    self._collection.insert_many([audit_document(record) for record in records], ordered=False)
+                except Exception:
+                    self.handleError(records[-1])
+        finally:
+            self.release()
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._client.close()
+
+
+_queue_handler: DroppingQueueHandler | None = None
+_listener: BatchingQueueListener | None = None
+
+
+def setup_audit_logging():
+    global _queue_handler, _listener
+    if _listener is not None:
+        return
+
+    file_handler = RotatingFileHandler(
+        audit_log_config.file,
+        maxBytes=audit_log_config.max_bytes,
+        backupCount=audit_log_config.backup_count,
+        encoding="utf-8",
+    )
+    file_handler.setFormatter(JsonFormatter())
+    handlers = [MemoryHandler(
+        capacity=audit_log_config.batch_size,
+        flushLevel=logging.CRITICAL + 1,
+        target=file_handler,
+    )]
+    if audit_log_config.mongo_enabled:
+        handlers.append(MongoAuditHandler(audit_log_config.batch_size, audit_log_config.mongo_collection))
+
+    _queue_handler = DroppingQueueHandler(queue.Queue(maxsize=audit_log_config.queue_size))
+    _listener = BatchingQueueListener(_queue_handler.queue, *handlers)
+
+    audit_logger.setLevel(logging.INFO)
+    audit_logger.propagate = False
+    audit_logger.addHandler(_queue_handler)
+    _listener.start()
+
+
+def shutdown_audit_logging():
+    global _queue_handler, _listener
+    if _listener is None:
+        return
+
+    audit_logger.removeHandler(_queue_handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        target = handler.target if isinstance(handler, MemoryHandler) else None
+        handler.close()
+        if target is not None:
+            target.close()
+    _queue_handler = None
+    _listener = None
+
+
+def audit_stats() -> dict:
+    return {
+        "queued": _queue_handler.queue.qsize() if _queue_handler else 0,
+        "dropped": _queue_handler.dropped if _queue_handler else 0,
+    }
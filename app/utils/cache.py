@@ -0,0 +1,138 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+
+def _entry_size(key: str, value: bytes) -> int:
+    return len(key) + len(value)
+
+
+class CacheBackend(ABC):
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None:
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float):
+        pass
+
+    @abstractmethod
+    async def delete(self, key: str):
+        pass
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """Process-local LRU cache with per-entry expiry, bounded by entry count and optionally by bytes."""
+
+    def __init__(self, max_entries: int, max_bytes: int | None = None):
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self.size_bytes = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> bytes | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        self._remove(key)
+        if self._max_bytes is not None and _entry_size(key, value) > self._max_bytes:
+            return
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self.size_bytes += _entry_size(key, value)
+        while len(self._entries) > self._max_entries or (
+                self._max_bytes is not None and self.size_bytes > self._max_bytes):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    async def delete(self, key: str):
+        self._remove(key)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= _entry_size(key, entry[1])
+
+
+class RedisCacheBackend(CacheBackend):
+    """Shared cache for multi-worker deployments, works with any Redis-compatible server."""
+
+    def __init__(self, url: str):
+        try:
+            from redis import asyncio as redis
+        except ImportError:
+            raise RuntimeError("The redis package is required for a redis:// cache backend")
+        self._redis = redis.from_url(url)
+
+    async def get(self, key: str) -> bytes | None:
+        return await self._redis.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self._redis.set(key, value, px=int(ttl * 1000))
+
+    async def delete(self, key: str):
+        await self._redis.delete(key)
+
+
+def is_process_local(url: str) -> bool:
+    """Whether the backend lives in each process, so an invalidation never reaches the other workers."""
+    return urlparse(url).scheme == "memory"
+
+
+def create_cache_backend(url: str, max_entries: int, max_bytes: int | None = None) -> CacheBackend:
+    scheme = urlparse(url).scheme
+    if scheme == "memory":
+        return InMemoryCacheBackend(max_entries=max_entries, max_bytes=max_bytes)
+    if scheme in ("redis", "rediss", "unix"):
+        return RedisCacheBackend(url)
+    raise ValueError(f"Unsupported cache backend: {url}")
+
+
+class Cache():
+    """Namespaced cache over a backend that counts hits and misses."""
+
+    def __init__(self, backend: CacheBackend, namespace: str, ttl: float):
+        self.backend = backend
+        self._namespace = namespace
+        self._ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key: str) -> str:
+        return f"{self._namespace}:{key}"
+
+    async def get(self, key: str) -> bytes | None:
+        value = await self.backend.get(self._key(key))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def peek(self, key: str) -> bytes | None:
+        """Reads an entry without counting a hit or miss, e.g. to compare it before overwriting."""
+        return await self.backend.get(self._key(key))
+
+    async def set(self, key: str, value: bytes, ttl: float = None):
+        await self.backend.set(self._key(key), value, self._ttl if ttl is None else ttl)
+
+    async def invalidate(self, key: str):
+        await self.backend.delete(self._key(key))
+
+    def stats(self) -> dict:
+        stats = {"hits": self.hits, "misses": self.misses}
+        if isinstance(self.backend, InMemoryCacheBackend):
+            stats.update(entries=len(self.backend), bytes=self.backend.size_bytes, evictions=self.backend.evictions)
+        return stats
@@ -0,0 +1,177 @@
+import zlib
+from typing import Callable, Iterator
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Event streams must reach the client event by event, so they are never compressed.
+_UNCOMPRESSED_MEDIA_TYPES = ("text/event-stream",)
+
+Compressor = tuple[Callable[[bytes], bytes], Callable[[], bytes]]
+
+# Largest piece of request body a gzip decompressor returns at once.
+DECOMPRESSED_PIECE_SIZE = 64 * 1024
+# A zstd block of at most 128 KiB can be encoded in a few bytes, so 128 input bytes expand to at most ~4 MiB.
+ZSTD_INPUT_SLICE = 128
+
+
+def available_encoders(gzip_level: int = 6, brotli_quality: int = 4, zstd_level: int = 3) -> dict:
+    """Maps content codings to compressor factories, in order of server preference."""
+    encoders = {}
+    if zstandard is not None:
+        def zstd() -> Compressor:
+            compressor = zstandard.ZstdCompressor(level=zstd_level).compressobj()
+            return compressor.compress, compressor.flush
+        encoders["zstd"] = zstd
+    if brotli is not None:
+        def br() -> Compressor:
+            compressor = brotli.Compressor(quality=brotli_quality)
+            return compressor.process, compressor.finish
+        encoders["br"] = br
+
+    def gzip() -> Compressor:
+        compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress, compressor.flush
+    encoders["gzip"] = gzip
+    return encoders
+
+
+def create_decompressor(encoding: str, piece_size: int = DECOMPRESSED_PIECE_SIZE) -> Callable[[bytes], Iterator[bytes]]:
+    """Incremental decompressor for a request Content-Encoding; raises ValueError for unsupported codings or bad data.
+
+    Each chunk is decompressed lazily into pieces, so the caller can stop a decompression bomb after any piece
+    instead of holding everything a small chunk expands to.
+    """
+    encoding = encoding.strip().lower()
+    if encoding in ("", "identity"):
+        return lambda chunk: iter((chunk,))
+    if encoding == "gzip":
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+        def pieces(chunk: bytes) -> Iterator[bytes]:
+            while True:
+                piece = decompressor.decompress(chunk, piece_size)
+                chunk = decompressor.unconsumed_tail
+                if piece:
+                    yield piece
+                if not chunk and len(piece) < piece_size:
+                    return
+        errors = zlib.error
+    elif encoding == "zstd" and zstandard is not None:
+        decompressor = zstandard.ZstdDecompressor().decompressobj()
+
+        def pieces(chunk: bytes) -> Iterator[bytes]:
+            # zstd decompressobj has no output limit; small input slices bound what a single call can expand to.
+            for offset in range(0, len(chunk), ZSTD_INPUT_SLICE):
+                piece = decompressor.decompress(chunk[offset:offset + ZSTD_INPUT_SLICE])
+                if piece:
+                    yield piece
+        errors = zstandard.ZstdError
+    else:
+        raise ValueError(f"Unsupported content encoding: {encoding}")
+
+    def checked_pieces(chunk: bytes) -> Iterator[bytes]:
+        try:
+            yield from pieces(chunk)
+        except errors:
+            raise ValueError(f"Invalid {encoding} data")
+    return checked_pieces
+
+
+def negotiate_encoding(accept_encoding: str, encodings) -> str | None:
+    """Picks the coding with the highest q-value; ties go to the server's preference order."""
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding.strip().lower()] = q
+
+    best, best_q = None, 0.0
+    for coding in encodings:
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class CompressionMiddleware():
+    """Compresses responses of at least minimum_size bytes with gzip, or brotli/zstd when they are installed."""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, encoders: dict | None = None):
+        self.app = app
+        self._minimum_size = minimum_size
+        self._encoders = encoders or available_encoders()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""), self._encoders)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message | None = None
+        compress = flush = None
+        passthrough = False
+
+        async def send_wrapper(message: Message):
+            nonlocal start_message, compress, flush, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body, more_body = message.get("body", b""), message.get("more_body", False)
+            if compress is None:
+                headers = Headers(raw=start_message["headers"])
+                if ("content-encoding" in headers
+                        or headers.get("content-type", "").startswith(_UNCOMPRESSED_MEDIA_TYPES)
+                        or (not more_body and len(body) < self._minimum_size)):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                compress, flush = self._encoders[encoding]()
+                headers = MutableHeaders(raw=start_message["headers"])
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    body = compress(body) + flush()
+                    headers["Content-Length"] = str(len(body))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send(start_message)
+
+            chunk = compress(body)
+            if not more_body:
+                chunk += flush()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+        # Responses without a body (e.g. 304) still need their start message.
+        if start_message is not None and compress is None and not passthrough:
+            await send(start_message)
@@ -0,0 +1,47 @@
+import hashlib
+
+from fastapi import Request, Response, status
+
+
+def note_etag(note: dict) -> str:
+    return f'"{note["uuid"]}-{note.get("version", 0)}"'
+
+
+def notes_etag(notes: list[dict], next_page_token: str | None) -> str:
+    digest = hashlib.sha1()
+    for note in notes:
+        digest.update(f'{note["uuid"]}:{note.get("version", 0)};'.encode())
+    digest.update((next_page_token or "").encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison against If-None-Match as required for conditional GETs."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (candidate.strip().removeprefix("W/") for candidate in if_none_match.split(","))
+    return etag in candidates
+
+
+def if_match_version(if_match: str, note_uuid: str) -> int | None:
+    """Version required by an If-Match header; None for "*". Raises ValueError if no ETag names this note.
+
+    If-Match uses the strong comparison, so weak ETags never match.
+    """
+    if if_match.strip() == "*":
+        return None
+    prefix = f'"{note_uuid}-'
+    for candidate in if_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith(prefix) and candidate.endswith('"'):
+            version = candidate[len(prefix):-1]
+            if version.isdigit():
+                return int(version)
+    raise ValueError(f"If-Match does not match note {note_uuid}")
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
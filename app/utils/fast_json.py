@@ -0,0 +1,22 @@
+from typing import Any, Dict, List
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_DOCUMENTS_ADAPTER = TypeAdapter(List[Dict[str, Any]])
+
+
+def dump_documents(documents: list[dict]) -> bytes:
+    """Encodes documents as a JSON array without validating them against a response model."""
+    if orjson is not None:
+        return orjson.dumps(documents)
+    return _DOCUMENTS_ADAPTER.dump_json(documents)
+
+
+def documents_response(documents: list[dict], headers: dict | None = None) -> Response:
+    return Response(content=dump_documents(documents), media_type="application/json", headers=headers)
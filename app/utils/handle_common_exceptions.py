@@ -1,23 +1,74 @@
+import inspect
 from functools import wraps
 from typing import Callable
 
 from fastapi import HTTPException, status
 
-from app.crud.exceptions import CreredentialsException, NoteNotFoundException
+from app.crud.exceptions import (CreredentialsException,
+                                 InvalidFieldsException,
+                                 InvalidPageTokenException,
+                                 NoteEventsUnavailableException,
+                                 NoteNotFoundException,
+                                 NoteVersionConflictException,
+                                 PasswordHasherOverloadedException)
+from app.utils.etag import note_etag
+from conf.app_conf import password_hasher_config
+
+
+def version_conflict(exc: NoteVersionConflictException, status_code: int) -> HTTPException:
+    # The current ETag lets the client merge and retry without reading the note again.
+    return HTTPException(
+        status_code=status_code,
+        detail=f"Note was modified, current version is {exc.current_version}",
+        headers={"ETag": note_etag({"uuid": exc.note_uuid, "version": exc.current_version})}
+    )
+
+
+def _to_http_exception(exc: Exception) -> HTTPException:
+    if isinstance(exc, (HTTPException, CreredentialsException)):
+        return exc
+    if isinstance(exc, NoteNotFoundException):
+        return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Note not found")
+    if isinstance(exc, NoteVersionConflictException):
+        return version_conflict(exc, status.HTTP_409_CONFLICT)
+    if isinstance(exc, InvalidPageTokenException):
+        return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid page token")
+    if isinstance(exc, InvalidFieldsException):
+        return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown fields: {exc}")
+    if isinstance(exc, PasswordHasherOverloadedException):
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy. Try again later",
+            headers={"Retry-After": str(password_hasher_config.retry_after_seconds)}
+        )
+    if isinstance(exc, NoteEventsUnavailableException):
+        return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Note events are unavailable")
+    return HTTPException(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        detail="Server error. Try again later"
+    )
 
 
 def handle_common_exceptions(func: Callable):
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                http_exc = _to_http_exception(e)
+                if http_exc is e:
+                    raise
+                raise http_exc
+        return async_wrapper
+
     @wraps(func)
     def wrapper(*args, **kwargs):
         try:
             return func(*args, **kwargs)
-        except (HTTPException, CreredentialsException):
-            raise
-        except NoteNotFoundException:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Note not found")
         except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Server error. Try again later"
-            )
+            http_exc = _to_http_exception(e)
+            if http_exc is e:
+                raise
+            raise http_exc
     return wrapper
@@ -0,0 +1,70 @@
+from typing import AsyncIterator
+
+from fastapi import HTTPException, Request, status
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+def payload_too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Payload exceeds {max_bytes} bytes"
+    )
+
+
+class PayloadLimitMiddleware():
+    """Answers 413 for request bodies over the limit of their route before the route reads them.
+
+    FastAPI buffers and parses a JSON body before it runs route dependencies, so the limit has to apply here.
+    Limits are keyed by "METHOD /path"; the accepted body is held and replayed, the route would buffer it anyway.
+    """
+
+    def __init__(self, app: ASGIApp, route_limits: dict[str, int]):
+        self.app = app
+        self._route_limits = route_limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        max_bytes = self._route_limits.get(f"{scope['method']} {scope['path']}") if scope["type"] == "http" else None
+        if max_bytes is None:
+            await self.app(scope, receive, send)
+            return
+
+        too_large = JSONResponse({"detail": f"Payload exceeds {max_bytes} bytes"},
+                                 status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+            await too_large(scope, receive, send)
+            return
+
+        messages = []
+        received = 0
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                break
+            received += len(message.get("body", b""))
+            if received > max_bytes:
+                await too_large(scope, receive, send)
+                return
+            if not message.get("more_body", False):
+                break
+
+        async def replay() -> Message:
+            return messages.pop(0) if messages else await receive()
+        await self.app(scope, replay, send)
+
+
+async def limited_stream(request: Request, max_bytes: int) -> AsyncIterator[bytes]:
+    """Streams the request body without buffering it; 413 once it exceeds max_bytes, with or without Content-Length."""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise payload_too_large(max_bytes)
+
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > max_bytes:
+            raise payload_too_large(max_bytes)
+        yield chunk
@@ -1,36 +1,50 @@
+import inspect
 import logging
 from functools import wraps
 from typing import Callable
 
+from app.utils.audit import audit_logger
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s.%(msecs)03d - %(name)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S',
-    filename='user_actions.log',
-    filemode='a'
-)
 
-logger = logging.getLogger(__name__)
+def log_user_activity(log_note_uuid: bool = False, log_username: bool = False):
+    def activity(func: Callable, kwargs: dict) -> dict:
+        current_user = kwargs.get('current_user', None)
+        note_uuid = kwargs.get('note_uuid', None)
+        username = kwargs.get('username', None)
 
+        activity = {"user": current_user.username, "role": current_user.role, "action": func.__name__}
+        if log_note_uuid and note_uuid:
+            activity["note_uuid"] = note_uuid
+        if log_username and username:
+            activity["username"] = username
+        return activity
+
+    def log_call(func: Callable, kwargs: dict):
+        if audit_logger.isEnabledFor(logging.INFO):
+            audit_logger.info("user_activity", extra={"audit": activity(func, kwargs)})
+
+    def log_error(func: Callable, kwargs: dict, e: Exception):
+        audit_logger.error("user_activity_error", exc_info=True, extra={"audit": {**activity(func, kwargs), "error": str(e)}})
 
-def log_user_activity(log_note_uuid: bool = False, log_username: bool = False):
     def decorator(func: Callable):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                log_call(func, kwargs)
+                try:
+                    return await func(*args, **kwargs)
+                except Exception as e:
+                    log_error(func, kwargs, e)
+                    raise
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            current_user = kwargs.get('current_user', None)
-            note_uuid = kwargs.get('note_uuid', None)
-            username = kwargs.get('username', None)
-
-            logger.info(f"User - {current_user.username} used - {func.__name__} - with role: {current_user.role}")
-            if log_note_uuid and note_uuid:
-                logger.info(f"Note UUID: {note_uuid}")
-            if log_username and username:
-                logger.info(f"Get note username: {username}")
+            log_call(func, kwargs)
             try:
                 result = func(*args, **kwargs)
             except Exception as e:
-                logger.error(f"User - {current_user.username} - with role: {current_user.role} - encountered an error in {func.__name__}: {str(e)}", exc_info=True)
+                log_error(func, kwargs, e)
                 raise 
             else:
                 return result
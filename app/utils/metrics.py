@@ -0,0 +1,242 @@
+"""Minimal Prometheus-style metrics.
+
+Values are plain Python numbers updated without locks: handlers and DAO calls run on the
+event loop thread, and the few updates coming from other threads (pymongo monitoring,
+password hasher callbacks) are single increments that tolerate the GIL's granularity.
+"""
+import inspect
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from functools import wraps
+from typing import Callable, Iterable
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_metrics: list = []
+
+
+def _format_labels(labelnames: tuple, labelvalues: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Metric(ABC):
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _metrics.append(self)
+
+    @abstractmethod
+    def _samples(self) -> Iterable[str]:
+        pass
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class _LabelledMetric(_Metric):
+    """Metric holding one value per combination of label values."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._children = {}
+
+    def labels(self, *labelvalues):
+        child = self._children.get(labelvalues)
+        if child is None:
+            child = self._children[labelvalues] = self._new_child()
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        pass
+
+
+class _Value():
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(_LabelledMetric):
+    type = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def _samples(self):
+        for labelvalues, child in self._children.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labelvalues)} {child.value}"
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+
+class GaugeFunction(_Metric):
+    """Gauge whose labelled values are read from a callback at scrape time."""
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str], collect: Callable[[], dict]):
+        super().__init__(name, documentation, labelnames)
+        self._collect = collect
+
+    def _samples(self):
+        for labelvalues, value in self._collect().items():
+            yield f"{self.name}{_format_labels(self.labelnames, labelvalues)} {value}"
+
+
+class CounterFunction(GaugeFunction):
+    type = "counter"
+
+
+class _HistogramValue():
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_LabelledMetric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _samples(self):
+        for labelvalues, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labelvalues, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labelvalues)} {child.sum}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labelvalues)} {child.count}"
+
+
+def render_metrics() -> str:
+    return "\n".join(metric.render() for metric in _metrics) + "\n"
+
+
+DAO_METHOD_SECONDS = Histogram(
+    "dao_method_duration_seconds", "Duration of DAO method calls.", ("dao", "method")
+)
+
+
+def instrument_dao(cls):
+    """Class decorator that times every public coroutine method of a DAO.
+
+    Public find_* methods build cursors without touching the database, so for them the time spent consuming
+    the returned cursor is observed instead.
+    """
+    for name, method in list(vars(cls).items()):
+        if name.startswith("_") or not inspect.isfunction(method):
+            continue
+        histogram = DAO_METHOD_SECONDS.labels(cls.__name__, name)
+        if inspect.iscoroutinefunction(method):
+            setattr(cls, name, _timed_method(method, histogram))
+        elif name.startswith("find_"):
+            setattr(cls, name, _timed_cursor_method(method, histogram))
+    return cls
+
+
+def _timed_method(method: Callable, histogram: _HistogramValue):
+    @wraps(method)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - started)
+    return wrapper
+
+
+def _timed_cursor_method(method: Callable, histogram: _HistogramValue):
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        return TimedCursor(method(*args, **kwargs), histogram)
+    return wrapper
+
+
+class TimedCursor():
+    """Wraps an async cursor and observes the time spent fetching its documents, not the time between them."""
+
+    def __init__(self, cursor, histogram: _HistogramValue):
+        self._cursor = cursor
+        self._histogram = histogram
+
+    def __getattr__(self, name: str):
+        return getattr(self._cursor, name)
+
+    async def to_list(self, *args, **kwargs) -> list:
+        started = time.perf_counter()
+        try:
+            return await self._cursor.to_list(*args, **kwargs)
+        finally:
+            self._histogram.observe(time.perf_counter() - started)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        iterator = aiter(self._cursor)
+        elapsed = 0.0
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    document = await anext(iterator)
+                except StopAsyncIteration:
+                    return
+                finally:
+                    elapsed += time.perf_counter() - started
+                yield document
+        finally:
+            self._histogram.observe(elapsed)
@@ -0,0 +1,50 @@
+import base64
+import json
+from datetime import datetime
+
+from app.crud.exceptions import InvalidPageTokenException
+
+NEXT_PAGE_TOKEN_HEADER = "X-Next-Page-Token"
+
+
+def _encode_sort_value(value):
+    # JSON has no date type, so datetimes are tagged to come back as datetimes rather than strings.
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return value
+
+
+def _decode_sort_value(value):
+    if isinstance(value, dict):
+        return datetime.fromisoformat(value["$date"])
+    return value
+
+
+def encode_page_token(note: dict) -> str:
+    payload = json.dumps([_encode_sort_value(note["created_at"]), note["uuid"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_page_token(token: str) -> tuple:
+    try:
+        created_at, note_uuid = json.loads(base64.urlsafe_b64decode(token.encode()))
+        created_at = _decode_sort_value(created_at)
+    except (ValueError, TypeError, KeyError):
+        raise InvalidPageTokenException
+    return created_at, note_uuid
+
+
+def keyset_filter(filter: dict, page_token: str | None) -> dict:
+    """Narrows the filter to notes after the token in (created_at, uuid) descending order."""
+    if page_token is None:
+        return filter
+
+    created_at, note_uuid = decode_page_token(page_token)
+    after_token = [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "uuid": {"$lt": note_uuid}},
+    ]
+    if isinstance(created_at, datetime):
+        # Legacy string dates sort below every datetime until migrate_created_at.py has run.
+        after_token.append({"created_at": {"$type": "string"}})
+    return {**filter, "$or": after_token}
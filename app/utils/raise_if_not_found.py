@@ -1,3 +1,4 @@
+import inspect
 from functools import wraps
 from typing import Callable
 
@@ -5,6 +6,15 @@ from app.crud.exceptions import NoteNotFoundException
 
 
 def raise_if_not_found(func: Callable):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                note = await func(*args, **kwargs)
+                if not note:
+                    raise NoteNotFoundException
+                return note
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
             note = func(*args, **kwargs)
@@ -0,0 +1,162 @@
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.routing import compile_path
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.utils.metrics import Counter
+
+# Request state key under which the resolved (token, principal) pair is left for the route dependencies.
+PRINCIPAL_STATE = "principal"
+
+RATE_LIMITED = Counter("rate_limited_requests_total", "Requests rejected by the rate limiter.", ("route", "key"))
+
+
+class BucketStore(ABC):
+    @abstractmethod
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        """Takes one token from the bucket; returns 0 if allowed, otherwise seconds until a token is available."""
+
+
+class InMemoryBucketStore(BucketStore):
+    """Process-local token buckets; the least recently used bucket is dropped beyond max_keys."""
+
+    def __init__(self, max_keys: int):
+        self._max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.pop(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated_at) * rate)
+
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self._max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+# Refill and take in one round trip so concurrent workers cannot overdraw a bucket.
+_TAKE_SCRIPT = """
+local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or burst
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated_at) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return tostring(wait)
+"""
+
+
+class RedisBucketStore(BucketStore):
+    """Token buckets shared by all workers, works with any Redis-compatible server."""
+
+    def __init__(self, url: str):
+        try:
+            from redis import asyncio as redis
+        except ImportError:
+            raise RuntimeError("The redis package is required for a redis:// rate limit backend")
+        self._redis = redis.from_url(url)
+        self._take = self._redis.register_script(_TAKE_SCRIPT)
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        return float(await self._take(keys=[f"ratelimit:{key}"], args=[rate, burst, time.time()]))
+
+
+def create_bucket_store(url: str, max_keys: int) -> BucketStore:
+    scheme = urlparse(url).scheme
+    if scheme == "memory":
+        return InMemoryBucketStore(max_keys=max_keys)
+    if scheme in ("redis", "rediss", "unix"):
+        return RedisBucketStore(url)
+    raise ValueError(f"Unsupported rate limit backend: {url}")
+
+
+def _compile_rules(route_limits: dict) -> list[tuple]:
+    rules = []
+    for route, limit in route_limits.items():
+        if route == "*":
+            continue
+        method, path = route.split(" ", 1)
+        rules.append((method, compile_path(path)[0], route, limit))
+    return rules
+
+
+class RateLimitMiddleware():
+    """Token-bucket limits per route, keyed by the authenticated principal or by the client IP."""
+
+    def __init__(self, app: ASGIApp, store: BucketStore, route_limits: dict, resolve_principal=None):
+        self.app = app
+        self._store = store
+        self._rules = _compile_rules(route_limits)
+        self._default = route_limits.get("*")
+        # Async callable turning a bearer token into a principal with a username; invalid tokens fall back
+        # to the client IP.
+        self._resolve_principal = resolve_principal
+
+    def _match(self, scope: Scope) -> tuple[str, dict] | tuple[None, None]:
+        for method, path_regex, route, limit in self._rules:
+            if scope["method"] == method and path_regex.match(scope["path"]):
+                return route, limit
+        return ("*", self._default) if self._default else (None, None)
+
+    async def _key(self, scope: Scope, key_type: str) -> str:
+        if key_type == "principal" and self._resolve_principal is not None:
+            authorization = Headers(scope=scope).get("authorization", "")
+            scheme, _, token = authorization.partition(" ")
+            if scheme.lower() == "bearer" and token:
+                try:
+                    principal = await self._resolve_principal(token)
+                except Exception:
+                    # Invalid tokens are rejected by the route itself; limit them like anonymous requests.
+                    pass
+                else:
+                    scope.setdefault("state", {})[PRINCIPAL_STATE] = (token, principal)
+                    return f"user:{principal.username}"
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route, limit = self._match(scope)
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = await self._key(scope, limit["key"])
+        wait = await self._store.take(f"{route}:{key}", limit["rate"], limit["burst"])
+        if wait > 0:
+            RATE_LIMITED.labels(route, key.split(":", 1)[0]).inc()
+            response = JSONResponse(
+                {"detail": "Too many requests"},
+                status_code=429,
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
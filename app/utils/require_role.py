@@ -1,21 +1,37 @@
+import inspect
 from functools import wraps
 from typing import Callable, List
 
-from fastapi import Depends, HTTPException, status
+from fastapi import HTTPException, status
 
-from app.crud.users import get_current_user_from_token
 from database.schemas import UserInDB
 
 
+def _check_role(current_user: UserInDB, allowed_roles: List[str]):
+    if current_user.role not in allowed_roles:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You do not have permission to perform this action"
+        )
+
+
 def require_role(allowed_roles: List[str]):
+    """Checks the role of the current_user the handler already depends on.
+
+    FastAPI reads the signature of the wrapped handler, so the user is resolved once by the handler's
+    own dependency and passed through; the wrapper declares no dependency of its own.
+    """
     def decorator(func: Callable):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, current_user: UserInDB, **kwargs):
+                _check_role(current_user, allowed_roles)
+                return await func(*args, current_user=current_user, **kwargs)
+            return async_wrapper
+
         @wraps(func)
-        def wrapper(*args, current_user: UserInDB = Depends(get_current_user_from_token), **kwargs):
-            if current_user.role not in allowed_roles:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="You do not have permission to perform this action"
-                )
+        def wrapper(*args, current_user: UserInDB, **kwargs):
+            _check_role(current_user, allowed_roles)
             return func(*args, current_user=current_user, **kwargs)
         return wrapper
     return decorator
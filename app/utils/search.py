@@ -0,0 +1,38 @@
+import html
+import re
+
+SNIPPET_LENGTH = 160
+_TERM_PATTERN = re.compile(r'"([^"]+)"|(\S+)')
+
+
+def search_terms(query: str) -> list[str]:
+    """Splits a $text search string into terms and phrases, skipping negated ones."""
+    terms = []
+    for phrase, word in _TERM_PATTERN.findall(query):
+        term = phrase or word
+        if term and not term.startswith("-"):
+            terms.append(term)
+    return terms
+
+
+def highlight_snippet(text: str, terms: list[str], length: int = SNIPPET_LENGTH) -> str:
+    """Returns an HTML-escaped fragment of text around the first match with matches wrapped in <mark>."""
+    if not terms:
+        return html.escape(text[:length])
+
+    pattern = re.compile("|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+    first_match = pattern.search(text)
+    start = max(first_match.start() - length // 4, 0) if first_match else 0
+    fragment = text[start:start + length]
+
+    parts = []
+    position = 0
+    for match in pattern.finditer(fragment):
+        parts.append(html.escape(fragment[position:match.start()]))
+        parts.append(f"<mark>{html.escape(match.group())}</mark>")
+        position = match.end()
+    parts.append(html.escape(fragment[position:]))
+
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if start + length < len(text) else ""
+    return prefix + "".join(parts) + suffix
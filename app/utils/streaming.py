@@ -0,0 +1,19 @@
+import json
+from typing import AsyncIterator
+
+from fastapi.encoders import jsonable_encoder
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+async def ndjson_stream(documents: AsyncIterator[dict]) -> AsyncIterator[str]:
+    async for document in documents:
+        yield json.dumps(jsonable_encoder(document), ensure_ascii=False) + "\n"
+
+
+SSE_MEDIA_TYPE = "text/event-stream"
+
+
+def sse_message(event: str, data: dict, event_id: str | None = None) -> str:
+    message = f"id: {event_id}\n" if event_id is not None else ""
+    return message + f"event: {event}\ndata: {json.dumps(jsonable_encoder(data), ensure_ascii=False)}\n\n"
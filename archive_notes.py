@@ -0,0 +1,25 @@
+import argparse
+import asyncio
+
+from app.crud.note_archive import archive_deleted_notes
+from conf.app_conf import note_archive_config
+from database.mongo import close_mongo_client, get_db
+
+
+async def archive_notes(retention_days: int, batch_size: int, pause: float) -> int:
+    try:
+        return await archive_deleted_notes(get_db(), retention_days, batch_size=batch_size, pause=pause)
+    finally:
+        await close_mongo_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move soft-deleted notes past the retention period to notes_archive.")
+    parser.add_argument("--retention-days", type=int, default=note_archive_config.retention_days)
+    parser.add_argument("--batch-size", type=int, default=note_archive_config.batch_size)
+    parser.add_argument("--pause", type=float, default=note_archive_config.pause,
+                        help="seconds to sleep between batches")
+    args = parser.parse_args()
+
+    archived = asyncio.run(archive_notes(args.retention_days, args.batch_size, args.pause))
+    print(f"Archived {archived} deleted notes.")
@@ -0,0 +1,89 @@
+"""Compares sync (threadpool) and async throughput of note listing against a local mongod.
+
+Run from the project root:
+
+    MONGO_DATABASE=bench python -m benchmarks.bench_async_vs_sync --requests 5000 --concurrency 500
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from pymongo import DESCENDING
+
+from app.crud.notes import NoteDAO
+from benchmarks.common import SEEDED_AT
+from conf.mongodb import mongodb_config
+from database.mongo import close_mongo_client, get_db, get_mongo_client
+
+AUTHOR = "bench@example.com"
+# Default size of the threadpool FastAPI runs sync handlers in.
+THREADPOOL_SIZE = 40
+
+
+def seed(notes: int):
+    with get_mongo_client() as client:
+        collection = client[mongodb_config.database].notes
+        collection.delete_many({"author": AUTHOR})
+        collection.insert_many([
+            {
+                "title": f"Note {i}",
+                "body": "x" * 256,
+                "author": AUTHOR,
+                "uuid": str(uuid.uuid4()),
+                "created_at": SEEDED_AT,
+                "is_active": True,
+            }
+            for i in range(notes)
+        ])
+
+
+def run_sync(requests: int) -> float:
+    with get_mongo_client() as client:
+        collection = client[mongodb_config.database].notes
+
+        def list_notes(_):
+            return list(collection.find(
+                {"author": AUTHOR, "is_active": True},
+                {"is_active": 0, "author": 0, "_id": 0}
+            ).sort("created_at", DESCENDING))
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=THREADPOOL_SIZE) as pool:
+            list(pool.map(list_notes, range(requests)))
+        return time.perf_counter() - started
+
+
+async def run_async(requests: int, concurrency: int) -> float:
+    dao = NoteDAO(mongo=get_db())
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def list_notes():
+        async with semaphore:
+            return await dao.get_notes_by_author(AUTHOR)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(list_notes() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    await close_mongo_client()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--notes", type=int, default=20)
+    args = parser.parse_args()
+
+    seed(args.notes)
+    sync_elapsed = run_sync(args.requests)
+    async_elapsed = asyncio.run(run_async(args.requests, args.concurrency))
+
+    print(f"sync  ({THREADPOOL_SIZE} threads): {args.requests / sync_elapsed:10.1f} req/s")
+    print(f"async ({args.concurrency} in flight): {args.requests / async_elapsed:10.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Measures per-request dependency overhead on GET /notes/{note_uuid}: token resolutions, DAO objects and latency.
+
+Compares the shared providers with the previous per-request behaviour (a new Database and DAO objects on every
+request, and the principal resolved again by the route after the rate limiter resolved it). No database is
+needed: the DAO reads are replaced with in-memory results and the rate limiter never rejects.
+Run from the project root:
+
+    MONGO_DATABASE=bench python -m benchmarks.bench_dependencies --requests 5000
+"""
+import argparse
+import asyncio
+import json
+import time
+from contextlib import ExitStack
+from unittest.mock import AsyncMock, patch
+
+import httpx
+
+from app.crud.notes import NoteDAO
+from app.crud.sessions import SessionDAO
+from app.crud.users import JWT_DECODES, UserDAO, create_access_token
+from app.utils.rate_limit import InMemoryBucketStore
+from benchmarks.common import SEEDED_AT, percentiles
+from conf.mongodb import mongodb_config
+from database.mongo import get_db, open_mongo_client
+from database.schemas import UserInDB
+from main import app
+
+USER = UserInDB(username="bench@example.com", hashed_password="", role="User")
+NOTE = {"title": "Note", "body": "Buy spam", "uuid": "bench-uuid", "created_at": SEEDED_AT, "version": 1}
+DAO_CLASSES = (NoteDAO, UserDAO, SessionDAO)
+
+
+def count_instances(stack: ExitStack) -> dict:
+    counts = {cls.__name__: 0 for cls in DAO_CLASSES}
+    for cls in DAO_CLASSES:
+        original = cls.__init__
+
+        def counting_init(self, *args, _original=original, _name=cls.__name__, **kwargs):
+            counts[_name] += 1
+            _original(self, *args, **kwargs)
+        stack.enter_context(patch.object(cls, "__init__", counting_init))
+    return counts
+
+
+def per_request_providers(stack: ExitStack):
+    """Restores the previous behaviour: fresh objects on every call and no reuse of the resolved principal."""
+    def fresh_dao(dao_class, mongo):
+        return dao_class(mongo=mongo)
+    for module in ("app.crud.cached_notes", "app.crud.users", "app.api.notes_handlers", "app.api.user_handlers"):
+        stack.enter_context(patch(f"{module}.shared_dao", fresh_dao))
+    stack.enter_context(patch("app.crud.users._resolved_principal", return_value=None))
+    app.dependency_overrides[get_db] = lambda: open_mongo_client()[mongodb_config.database]
+
+
+async def measure(client: httpx.AsyncClient, headers: dict, requests: int, per_request: bool) -> dict:
+    with ExitStack() as stack:
+        if per_request:
+            per_request_providers(stack)
+        stack.callback(app.dependency_overrides.clear)
+        counts = count_instances(stack)
+        decodes_before = JWT_DECODES.labels().value
+
+        samples = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            response = await client.get(f"/notes/{NOTE['uuid']}", headers=headers)
+            samples.append(time.perf_counter() - started)
+            response.raise_for_status()
+
+    return {
+        **percentiles(samples),
+        "token_decodes_per_request": round((JWT_DECODES.labels().value - decodes_before) / requests, 2),
+        "dao_objects_per_request": round(sum(counts.values()) / requests, 2),
+    }
+
+
+async def main(args):
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': USER.username})}"}
+    report = {}
+    with patch.object(UserDAO, "get_user", AsyncMock(return_value=USER)), \
+            patch.object(NoteDAO, "get_note_by_uuid", AsyncMock(return_value=NOTE)), \
+            patch.object(InMemoryBucketStore, "take", AsyncMock(return_value=0.0)):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await measure(client, headers, args.warmup, per_request=False)
+            report["per_request"] = await measure(client, headers, args.requests, per_request=True)
+            report["shared"] = await measure(client, headers, args.requests, per_request=False)
+
+    report["p50_reduction_ms"] = round(report["per_request"]["p50_ms"] - report["shared"]["p50_ms"], 3)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
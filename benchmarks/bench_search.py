@@ -0,0 +1,81 @@
+"""Measures NoteDAO.search_notes latency on a large notes collection in a local mongod.
+
+Seeding replaces the notes in the database named by MONGO_DATABASE, which must be named bench* unless --reset
+is given. Run from the project root:
+
+    MONGO_DATABASE=bench python -m benchmarks.bench_search --notes 1000000 --queries 500
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from app.crud.notes import NoteDAO
+from benchmarks.common import (SEEDED_AT, WORDS, check_bench_database,
+                               percentiles, random_text)
+from conf.mongodb import mongodb_config
+from database.indexes import ensure_indexes
+from database.mongo import close_mongo_client, get_db
+
+SEED_BATCH_SIZE = 10000
+
+
+async def seed(notes: int, authors: int, rng: random.Random, reset: bool = False):
+    check_bench_database(mongodb_config.database, "all notes", reset)
+    collection = get_db().notes
+    await collection.delete_many({})
+    for offset in range(0, notes, SEED_BATCH_SIZE):
+        await collection.insert_many([
+            {
+                "title": random_text(4, rng),
+                "body": random_text(80, rng),
+                "author": f"user{rng.randrange(authors)}@example.com",
+                "uuid": str(uuid.uuid4()),
+                "created_at": SEEDED_AT,
+                "is_active": rng.random() > 0.1,
+            }
+            for _ in range(min(SEED_BATCH_SIZE, notes - offset))
+        ], ordered=False)
+    await ensure_indexes(get_db())
+
+
+async def run(queries: int, authors: int, rng: random.Random) -> dict:
+    dao = NoteDAO(mongo=get_db())
+    user_samples, staff_samples = [], []
+
+    for _ in range(queries):
+        query = " ".join(rng.sample(WORDS, 2))
+
+        started = time.perf_counter()
+        await dao.search_notes(query, author=f"user{rng.randrange(authors)}@example.com", limit=20)
+        user_samples.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await dao.search_notes(query, limit=20, for_staff=True)
+        staff_samples.append(time.perf_counter() - started)
+
+    return {"user": percentiles(user_samples), "staff": percentiles(staff_samples)}
+
+
+async def main(args):
+    rng = random.Random(args.seed)
+    try:
+        if not args.skip_seed:
+            await seed(args.notes, args.authors, rng, reset=args.reset)
+        report = await run(args.queries, args.authors, rng)
+    finally:
+        await close_mongo_client()
+    print(json.dumps({"notes": args.notes, **report}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--notes", type=int, default=1_000_000)
+    parser.add_argument("--authors", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-seed", action="store_true", help="reuse notes seeded by a previous run")
+    parser.add_argument("--reset", action="store_true", help="allow wiping notes in a database not named bench*")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,83 @@
+"""Compares response_model validation with the fast serialization path on /notes/staff/get_notes.
+
+No database is needed: the DAO cursor is replaced with an in-memory page of notes.
+Run from the project root:
+
+    MONGO_DATABASE=bench python -m benchmarks.bench_serialization --sizes 1000 10000 100000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import httpx
+
+from app.crud.notes import NoteDAO
+from app.crud.users import get_current_user_from_token
+from benchmarks.common import percentiles, random_text
+from conf.app_conf import notes_config
+from database.schemas import UserInDB
+from main import app
+
+STAFF_USER = UserInDB(username="bench@example.com", hashed_password="", role="Admin")
+
+
+def make_notes(count: int, rng: random.Random) -> list[dict]:
+    started = datetime(2024, 1, 1)
+    return [
+        {
+            "title": random_text(4, rng),
+            "body": random_text(80, rng),
+            "author": f"user{rng.randrange(100)}@example.com",
+            "uuid": str(uuid.uuid4()),
+            "created_at": started + timedelta(seconds=i),
+            "updated_at": started + timedelta(seconds=i),
+            "version": 1,
+            "is_active": True,
+        }
+        for i in range(count)
+    ]
+
+
+async def measure(client: httpx.AsyncClient, fast: bool, repeat: int) -> dict:
+    samples = []
+    with patch.object(notes_config, "fast_serialization", fast):
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = await client.get("/notes/staff/get_notes")
+            samples.append(time.perf_counter() - started)
+            response.raise_for_status()
+    return {**percentiles(samples), "bytes": len(response.content)}
+
+
+async def main(args):
+    rng = random.Random(args.seed)
+    app.dependency_overrides[get_current_user_from_token] = lambda: STAFF_USER
+    report = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for size in args.sizes:
+            notes = make_notes(size, rng)
+            with patch.object(NoteDAO, "find_notes_for_staff") as find_notes:
+                find_notes.return_value.to_list = AsyncMock(return_value=notes)
+                validated = await measure(client, fast=False, repeat=args.repeat)
+                fast = await measure(client, fast=True, repeat=args.repeat)
+            report.append({
+                "notes": size,
+                "response_model": validated,
+                "fast": fast,
+                "speedup": round(validated["p50_ms"] / fast["p50_ms"], 2),
+            })
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(main(parser.parse_args()))
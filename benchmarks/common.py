@@ -0,0 +1,44 @@
+import random
+import statistics
+from datetime import datetime, timezone
+
+WORDS = (
+    "spam cola tea coffee milk bread apple meeting project deadline report budget invoice "
+    "travel ticket hotel doctor dentist birthday gift garden book movie music recipe dinner "
+    "lunch gym running yoga car repair bank tax insurance school lesson homework idea plan"
+).split()
+
+SEEDED_AT = datetime(2024, 1, 1, tzinfo=timezone.utc)
+# Databases the seeding may wipe without --reset.
+BENCH_DATABASE_PREFIX = "bench"
+
+
+def check_bench_database(database: str, wiped: str, reset: bool):
+    """Refuses to seed a database whose name does not start with "bench" unless reset is set."""
+    if not reset and not database.startswith(BENCH_DATABASE_PREFIX):
+        raise SystemExit(
+            f"Seeding deletes {wiped} in {database!r}; use a database named {BENCH_DATABASE_PREFIX}* or pass --reset"
+        )
+
+
+def random_text(words: int, rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def percentiles(samples: list[float]) -> dict:
+    """Returns latency percentiles in milliseconds for samples given in seconds."""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        return ordered[min(int(len(ordered) * p), len(ordered) - 1)] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(percentile(0.50), 3),
+        "p95_ms": round(percentile(0.95), 3),
+        "p99_ms": round(percentile(0.99), 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
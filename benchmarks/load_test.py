@@ -0,0 +1,299 @@
+"""Drives a mixed workload against the notes API and reports throughput and latency percentiles as JSON.
+
+Seeds users and notes into the database named by MONGO_DATABASE, which must be named bench* unless --reset
+is given, and runs the workload either in-process through httpx.ASGITransport or against real uvicorn workers. With --in-memory a throwaway mongod is
+started through pymongo_inmemory (downloaded on first use) when no local mongod is available. The rate
+limiter is disabled unless --rate-limit is given: every virtual user logs in from the same address and the
+staff requests share one principal, so the limits would measure 429 responses instead of the API.
+Run from the project root:
+
+    MONGO_DATABASE=bench python -m benchmarks.load_test --users 50 --notes 20000 --duration 30 --output run.json
+    MONGO_DATABASE=bench python -m benchmarks.load_test --transport uvicorn --workers 4 --baseline run.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from urllib.parse import urlparse
+
+import httpx
+
+from benchmarks.common import (SEEDED_AT, check_bench_database, percentiles,
+                               random_text)
+
+PASSWORD = "bench-password"
+STAFF_USER = "bench-staff@example.com"
+SEED_BATCH_SIZE = 10000
+# Relative weights of the operations a virtual user picks from.
+WORKLOAD = {
+    "login": 2,
+    "create": 15,
+    "list": 30,
+    "get": 25,
+    "update": 12,
+    "delete": 6,
+    "staff_list": 10,
+}
+# Latency percentiles compared against the baseline.
+COMPARED_PERCENTILES = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def user_name(index: int) -> str:
+    return f"bench-user{index}@example.com"
+
+
+def seed(users: int, notes: int, rng: random.Random, reset: bool = False) -> dict[str, list[str]]:
+    """Replaces the users and notes collections with generated data; returns note uuids per user.
+
+    Refuses to wipe a database whose name does not start with "bench" unless reset is set.
+    """
+    # Imported here so --in-memory can point MONGO_HOST at the stand-in before the config is read.
+    from app.crud.passwords import PWD_CONTEXT
+    from conf.mongodb import mongodb_config
+    from database.mongo import get_mongo_client
+
+    check_bench_database(mongodb_config.database, "all users and notes", reset)
+
+    hashed_password = PWD_CONTEXT.hash(PASSWORD)
+    uuids = defaultdict(list)
+    with get_mongo_client() as client:
+        db = client[mongodb_config.database]
+        db.users.delete_many({})
+        db.notes.delete_many({})
+        db.users.insert_many(
+            [{"username": user_name(i), "hashed_password": hashed_password, "role": "User"} for i in range(users)]
+            + [{"username": STAFF_USER, "hashed_password": hashed_password, "role": "Admin"}]
+        )
+        for offset in range(0, notes, SEED_BATCH_SIZE):
+            documents = []
+            for i in range(offset, min(offset + SEED_BATCH_SIZE, notes)):
+                author = user_name(rng.randrange(users))
+                created_at = SEEDED_AT + timedelta(seconds=i)
+                documents.append({
+                    "title": random_text(4, rng),
+                    "body": random_text(60, rng),
+                    "author": author,
+                    "uuid": str(uuid.uuid4()),
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                    "version": 1,
+                    "is_active": True,
+                })
+                uuids[author].append(documents[-1]["uuid"])
+            db.notes.insert_many(documents, ordered=False)
+    return uuids
+
+
+class VirtualUser():
+    def __init__(self, client: httpx.AsyncClient, username: str, uuids: list[str], rng: random.Random):
+        self._client = client
+        self._username = username
+        self._uuids = uuids
+        self._rng = rng
+        self._headers = {}
+
+    async def login(self) -> httpx.Response:
+        response = await self._client.post("/users/token", data={"username": self._username, "password": PASSWORD})
+        if response.status_code == 200:
+            self._headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return response
+
+    async def create(self) -> httpx.Response:
+        return await self._client.post(
+            "/notes/create", headers=self._headers,
+            json={"title": random_text(4, self._rng), "body": random_text(60, self._rng)}
+        )
+
+    async def list(self) -> httpx.Response:
+        return await self._client.get("/notes/my-notes", headers=self._headers, params={"limit": 20})
+
+    async def get(self) -> httpx.Response:
+        return await self._client.get(f"/notes/{self._pick()}", headers=self._headers)
+
+    async def update(self) -> httpx.Response:
+        return await self._client.patch(
+            "/notes/update_note", headers=self._headers,
+            params={"note_uuid": self._pick(), "title": random_text(4, self._rng)}
+        )
+
+    async def delete(self) -> httpx.Response:
+        note_uuid = self._pick()
+        response = await self._client.delete(f"/notes/{note_uuid}", headers=self._headers)
+        if response.status_code == 200 and note_uuid in self._uuids:
+            self._uuids.remove(note_uuid)
+        return response
+
+    async def staff_list(self) -> httpx.Response:
+        return await self._client.get("/notes/staff/get_notes", headers=self._headers, params={"limit": 50})
+
+    def _pick(self) -> str:
+        # Unknown uuids exercise the 404 path instead of failing the run once a user has no notes left.
+        return self._rng.choice(self._uuids) if self._uuids else str(uuid.uuid4())
+
+
+async def run_workload(client: httpx.AsyncClient, uuids: dict[str, list[str]], users: int,
+                       concurrency: int, duration: float, rng: random.Random) -> dict:
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    operations, weights = zip(*WORKLOAD.items())
+    deadline = time.perf_counter() + duration
+
+    async def virtual_user(index: int):
+        user_rng = random.Random(rng.random())
+        username = user_name(index % users)
+        user = VirtualUser(client, username, uuids.setdefault(username, []), user_rng)
+        staff = VirtualUser(client, STAFF_USER, [], user_rng)
+        await user.login()
+        await staff.login()
+
+        while time.perf_counter() < deadline:
+            operation = user_rng.choices(operations, weights)[0]
+            actor = staff if operation == "staff_list" else user
+            started = time.perf_counter()
+            response = await getattr(actor, operation)()
+            samples[operation].append(time.perf_counter() - started)
+            if response.status_code >= 500 or response.status_code in (401, 403, 429):
+                errors[operation] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(virtual_user(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    total = sum(len(operation_samples) for operation_samples in samples.values())
+    return {
+        "duration_s": round(elapsed, 3),
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 1),
+        "errors": sum(errors.values()),
+        "operations": {
+            operation: {**percentiles(samples[operation]), "errors": errors[operation]}
+            for operation in operations
+        },
+    }
+
+
+async def run_asgi(args, uuids: dict[str, list[str]], rng: random.Random) -> dict:
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await run_workload(client, uuids, args.users, args.concurrency, args.duration, rng)
+
+
+async def run_uvicorn(args, uuids: dict[str, list[str]], rng: random.Random) -> dict:
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port),
+        "--workers", str(args.workers), "--log-level", "warning",
+    ])
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+            await wait_until_up(client, server)
+            return await run_workload(client, uuids, args.users, args.concurrency, args.duration, rng)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+async def wait_until_up(client: httpx.AsyncClient, server: subprocess.Popen, timeout: float = 30):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+        try:
+            await client.get("/service/pool-stats")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("uvicorn did not start in time")
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Lists operations whose latency or overall throughput regressed by more than the tolerance."""
+    regressions = []
+    if report["throughput_rps"] < baseline["throughput_rps"] * (1 - tolerance):
+        regressions.append(f"throughput_rps: {report['throughput_rps']} < {baseline['throughput_rps']}")
+    for operation, stats in report["operations"].items():
+        expected = baseline["operations"].get(operation)
+        if not expected or not stats.get("count"):
+            continue
+        for name in COMPARED_PERCENTILES:
+            if stats[name] > expected[name] * (1 + tolerance):
+                regressions.append(f"{operation}.{name}: {stats[name]} > {expected[name]}")
+    return regressions
+
+
+def start_in_memory_mongod():
+    from pymongo_inmemory import Mongod
+
+    mongod = Mongod(None)
+    mongod.start()
+    os.environ["MONGO_HOST"] = mongod.connection_string
+    os.environ["MONGO_PORT"] = str(urlparse(mongod.connection_string).port)
+    return mongod
+
+
+def main(args) -> int:
+    if args.concurrency < 1 or args.users < 1:
+        raise SystemExit("--users and --concurrency must be positive")
+
+    # Set before the app configuration is imported; the uvicorn workers inherit the environment.
+    os.environ["RATE_LIMIT_ENABLED"] = "true" if args.rate_limit else "false"
+    mongod = start_in_memory_mongod() if args.in_memory else None
+    try:
+        rng = random.Random(args.seed)
+        uuids = seed(args.users, args.notes, rng, reset=args.reset or args.in_memory)
+        run = run_uvicorn if args.transport == "uvicorn" else run_asgi
+        report = asyncio.run(run(args, uuids, rng))
+    finally:
+        if mongod is not None:
+            mongod.stop()
+
+    report = {
+        "config": {
+            "transport": args.transport, "workers": args.workers if args.transport == "uvicorn" else 1,
+            "users": args.users, "notes": args.notes, "concurrency": args.concurrency, "duration_s": args.duration,
+            "rate_limit": args.rate_limit,
+        },
+        **report,
+    }
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(report, json.load(baseline_file), args.tolerance)
+        report["regressions"] = regressions
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output + "\n")
+    print(output)
+    return 1 if report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transport", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--workers", type=int, default=2, help="uvicorn worker processes")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--notes", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=50, help="virtual users running the workload")
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--in-memory", action="store_true", help="start a throwaway mongod via pymongo_inmemory")
+    parser.add_argument("--reset", action="store_true",
+                        help="allow wiping users and notes in a database not named bench*")
+    parser.add_argument("--rate-limit", action="store_true", help="keep the rate limiter enabled")
+    parser.add_argument("--output", help="write the JSON report to this file, e.g. to keep it as a baseline")
+    parser.add_argument("--baseline", help="JSON report of a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    raise SystemExit(main(parser.parse_args()))
@@ -1,3 +1,5 @@
+import os
+
 import environ
 from dotenv import load_dotenv
 
@@ -9,6 +11,112 @@ class AccessTokenConfig:
     secret_key: str = environ.var(default="secret_key")
     algorithm: str = environ.var(default="HS256")
     access_token_expire_minutes: int = environ.var(default=240, converter=int)
+    # "jwt" issues signed tokens; "session" issues opaque session ids backed by the sessions collection.
+    mode: str = environ.var(default="jwt")
+    refresh_token_expire_minutes: int = environ.var(default=30 * 24 * 60, converter=int)
+    session_cache_ttl_seconds: int = environ.var(default=60, converter=int)
 
 
 access_token_config: AccessTokenConfig = AccessTokenConfig.from_environ()
+
+
+@environ.config(prefix="NOTES")
+class NotesConfig:
+    page_size: int = environ.var(default=100, converter=int)
+    max_page_size: int = environ.var(default=1000, converter=int)
+    stream_batch_size: int = environ.var(default=500, converter=int)
+    batch_max_items: int = environ.var(default=500, converter=int)
+    batch_max_bytes: int = environ.var(default=4 * 1024 * 1024, converter=int)
+    # Skip response_model validation on list pages and encode the DAO projection directly.
+    fast_serialization: bool = environ.bool_var(default=False)
+    # Notes per unordered insert batch when importing NDJSON.
+    import_batch_size: int = environ.var(default=1000, converter=int)
+    # Largest import, checked for the request body and again for the decompressed NDJSON.
+    import_max_bytes: int = environ.var(default=1024 * 1024 * 1024, converter=int)
+
+
+notes_config: NotesConfig = NotesConfig.from_environ()
+
+
+@environ.config(prefix="USER_CACHE")
+class UserCacheConfig:
+    enabled: bool = environ.bool_var(default=True)
+    backend_url: str = environ.var(default="memory://")
+    max_entries: int = environ.var(default=10000, converter=int)
+    ttl_seconds: int = environ.var(default=60, converter=int)
+
+
+user_cache_config: UserCacheConfig = UserCacheConfig.from_environ()
+
+
+@environ.config(prefix="PASSWORD_HASHER")
+class PasswordHasherConfig:
+    workers: int = environ.var(default=min(os.cpu_count() or 1, 4), converter=int)
+    max_pending: int = environ.var(default=32, converter=int)
+    retry_after_seconds: int = environ.var(default=1, converter=int)
+
+
+password_hasher_config: PasswordHasherConfig = PasswordHasherConfig.from_environ()
+
+
+@environ.config(prefix="AUDIT_LOG")
+class AuditLogConfig:
+    file: str = environ.var(default="user_actions.log")
+    max_bytes: int = environ.var(default=10 * 1024 * 1024, converter=int)
+    backup_count: int = environ.var(default=5, converter=int)
+    queue_size: int = environ.var(default=10000, converter=int)
+    batch_size: int = environ.var(default=100, converter=int)
+    mongo_enabled: bool = environ.bool_var(default=False)
+    mongo_collection: str = environ.var(default="audit")
+
+
+audit_log_config: AuditLogConfig = AuditLogConfig.from_environ()
+
+
+@environ.config(prefix="NOTE_CACHE")
+class NoteCacheConfig:
+    enabled: bool = environ.bool_var(default=False)
+    backend_url: str = environ.var(default="memory://")
+    max_bytes: int = environ.var(default=64 * 1024 * 1024, converter=int)
+    max_entries: int = environ.var(default=100000, converter=int)
+    ttl_seconds: int = environ.var(default=300, converter=int)
+
+
+note_cache_config: NoteCacheConfig = NoteCacheConfig.from_environ()
+
+
+@environ.config(prefix="NOTE_STREAM")
+class NoteStreamConfig:
+    # Recent events kept per worker so reconnecting clients can resume from Last-Event-ID.
+    buffer_size: int = environ.var(default=1000, converter=int)
+    queue_size: int = environ.var(default=100, converter=int)
+    heartbeat_seconds: int = environ.var(default=15, converter=int)
+    retry_seconds: int = environ.var(default=1, converter=int)
+
+
+note_stream_config: NoteStreamConfig = NoteStreamConfig.from_environ()
+
+
+@environ.config(prefix="COMPRESSION")
+class CompressionConfig:
+    enabled: bool = environ.bool_var(default=True)
+    minimum_size: int = environ.var(default=1024, converter=int)
+    gzip_level: int = environ.var(default=6, converter=int)
+    brotli_quality: int = environ.var(default=4, converter=int)
+    zstd_level: int = environ.var(default=3, converter=int)
+
+
+compression_config: CompressionConfig = CompressionConfig.from_environ()
+
+
+@environ.config(prefix="NOTES_ARCHIVE")
+class NoteArchiveConfig:
+    # Runs the archiver inside every application process; enable it on one instance or use archive_notes.py instead.
+    enabled: bool = environ.bool_var(default=False)
+    retention_days: int = environ.var(default=30, converter=int)
+    batch_size: int = environ.var(default=500, converter=int)
+    pause: float = environ.var(default=0.1, converter=float)
+    interval_seconds: int = environ.var(default=3600, converter=int)
+
+
+note_archive_config: NoteArchiveConfig = NoteArchiveConfig.from_environ()
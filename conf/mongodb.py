@@ -9,6 +9,11 @@ class MongoDBConfig:
     host: str = environ.var(default='localhost')
     port: str = environ.var(default='27017')
     database: str = environ.var()
+    max_pool_size: int = environ.var(default=100, converter=int)
+    min_pool_size: int = environ.var(default=0, converter=int)
+    max_idle_time_ms: int = environ.var(default=60000, converter=int)
+    wait_queue_timeout_ms: int = environ.var(default=5000, converter=int)
+    ensure_indexes: bool = environ.bool_var(default=True)
 
 
 mongodb_config: MongoDBConfig = MongoDBConfig.from_environ()
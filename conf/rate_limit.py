@@ -0,0 +1,31 @@
+import json
+
+import environ
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Token buckets per route: "rate" tokens per second refill up to "burst"; "key" is "principal" (falls back
+# to the client IP for anonymous requests) or "ip". "*" applies to every route without its own entry.
+ROUTE_LIMITS = {
+    "POST /users/token": {"rate": 0.2, "burst": 10, "key": "ip"},
+    "POST /users/sign-up": {"rate": 0.1, "burst": 5, "key": "ip"},
+    "POST /users/token/refresh": {"rate": 0.5, "burst": 10, "key": "ip"},
+    "GET /notes/staff/get_notes": {"rate": 1, "burst": 5, "key": "principal"},
+    "GET /notes/staff/get_notes_users/{username}": {"rate": 2, "burst": 10, "key": "principal"},
+    "GET /notes/staff/search": {"rate": 2, "burst": 10, "key": "principal"},
+    "*": {"rate": 50, "burst": 200, "key": "principal"},
+}
+
+
+@environ.config(prefix="RATE_LIMIT")
+class RateLimitConfig:
+    enabled: bool = environ.bool_var(default=True)
+    backend_url: str = environ.var(default="memory://")
+    max_keys: int = environ.var(default=100000, converter=int)
+    # JSON object merged over ROUTE_LIMITS, e.g. {"POST /users/token": {"rate": 1, "burst": 5, "key": "ip"}}.
+    routes: dict = environ.var(default="{}", converter=json.loads)
+
+
+rate_limit_config: RateLimitConfig = RateLimitConfig.from_environ()
+route_limits: dict = {**ROUTE_LIMITS, **rate_limit_config.routes}
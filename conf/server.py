@@ -0,0 +1,23 @@
+import os
+
+import environ
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+@environ.config(prefix="SERVER")
+class ServerConfig:
+    host: str = environ.var(default="0.0.0.0")
+    port: int = environ.var(default=8000, converter=int)
+    workers: int = environ.var(default=os.cpu_count() or 1, converter=int)
+    # "auto" picks uvloop and httptools when they are installed.
+    loop: str = environ.var(default="auto")
+    http: str = environ.var(default="auto")
+    timeout_keep_alive: int = environ.var(default=5, converter=int)
+    backlog: int = environ.var(default=2048, converter=int)
+    timeout_graceful_shutdown: int = environ.var(default=30, converter=int)
+    readiness_timeout_ms: int = environ.var(default=500, converter=int)
+
+
+server_config: ServerConfig = ServerConfig.from_environ()
@@ -0,0 +1,31 @@
+from pymongo import monitoring
+
+from app.utils.metrics import Histogram
+
+MONGO_COMMAND_SECONDS = Histogram(
+    "mongo_command_duration_seconds", "Duration of MongoDB commands.", ("collection", "command", "outcome")
+)
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """Times MongoDB commands by collection and command name."""
+
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            # getMore names the collection in a separate field.
+            collection = event.command.get("collection", "")
+        self._collections[(event.connection_id, event.request_id)] = collection
+
+    def succeeded(self, event):
+        self._observe(event, "success")
+
+    def failed(self, event):
+        self._observe(event, "failure")
+
+    def _observe(self, event, outcome: str):
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        MONGO_COMMAND_SECONDS.labels(collection, event.command_name, outcome).observe(event.duration_micros / 1e6)
@@ -0,0 +1,109 @@
+import logging
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.errors import CollectionInvalid
+
+logger = logging.getLogger(__name__)
+
+INDEXES = {
+    "users": [
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+    ],
+    "notes": [
+        IndexModel([("uuid", ASCENDING)], name="uuid_unique", unique=True),
+        IndexModel(
+            [("author", ASCENDING), ("is_active", ASCENDING), ("created_at", DESCENDING), ("uuid", DESCENDING)],
+            name="author_is_active_created_at",
+        ),
+        IndexModel([("created_at", DESCENDING), ("uuid", DESCENDING)], name="created_at"),
+        # Only soft-deleted notes are indexed, for the archiver.
+        IndexModel([("updated_at", ASCENDING)], name="deleted_updated_at", partialFilterExpression={"is_active": False}),
+        IndexModel(
+            [("title", TEXT), ("body", TEXT)],
+            name="title_body_text",
+            weights={"title": 10, "body": 1},
+            default_language="none",
+        ),
+    ],
+    "sessions": [
+        IndexModel([("refresh_hash", ASCENDING)], name="refresh_hash_unique", unique=True),
+        IndexModel([("username", ASCENDING)], name="username"),
+        IndexModel([("refresh_expires_at", ASCENDING)], name="refresh_expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "notes_archive": [
+        IndexModel([("uuid", ASCENDING)], name="uuid_unique", unique=True),
+    ],
+    "note_stats": [
+        IndexModel([("kind", ASCENDING), ("active", DESCENDING), ("author", ASCENDING)], name="kind_active"),
+        IndexModel([("kind", ASCENDING), ("deleted", DESCENDING), ("author", ASCENDING)], name="kind_deleted"),
+        IndexModel([("kind", ASCENDING), ("day", ASCENDING)], name="kind_day"),
+    ],
+}
+
+# Options for collections that must be created explicitly, before indexes implicitly create them with defaults.
+COLLECTION_OPTIONS = {
+    # Archived notes are rarely read, so trade some CPU for a smaller footprint on disk.
+    "notes_archive": {"storageEngine": {"wiredTiger": {"configString": "block_compressor=zstd"}}},
+}
+
+# Options that are compared with the server state when looking for drift.
+_COMPARED_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression", "weights",
+                     "default_language")
+# The server reports text indexes by their internal key instead of the indexed fields.
+_TEXT_INDEX_KEY = [("_fts", TEXT), ("_ftsx", 1)]
+
+
+def _describe(index: dict) -> dict:
+    key = index["key"]
+    key = list(key.items()) if isinstance(key, dict) else list(key)
+    if any(direction == TEXT for _, direction in key):
+        key = _TEXT_INDEX_KEY
+    description = {"key": key}
+    description.update({option: index[option] for option in _COMPARED_OPTIONS if option in index})
+    return description
+
+
+def find_index_drift(collection_name: str, declared: list[IndexModel], existing: dict) -> list[str]:
+    drift = []
+    declared_by_name = {model.document["name"]: model.document for model in declared}
+
+    for name, document in declared_by_name.items():
+        if name in existing and _describe(document) != _describe(existing[name]):
+            drift.append(f"{collection_name}: index '{name}' differs from its declaration")
+
+    for name in existing:
+        if name != "_id_" and name not in declared_by_name:
+            drift.append(f"{collection_name}: undeclared index '{name}'")
+
+    return drift
+
+
+async def ensure_indexes(db: AsyncDatabase, create: bool = True) -> list[str]:
+    """Creates missing declared indexes and returns a list of drift messages.
+
+    Existing indexes are never dropped or rebuilt; differences are only reported.
+    """
+    drift = []
+    for collection_name, declared in INDEXES.items():
+        if create and collection_name in COLLECTION_OPTIONS:
+            try:
+                await db.create_collection(collection_name, **COLLECTION_OPTIONS[collection_name])
+            except CollectionInvalid:
+                pass
+        collection = db[collection_name]
+        existing = await collection.index_information()
+
+        missing = [model for model in declared if model.document["name"] not in existing]
+        if missing and create:
+            await collection.create_indexes(missing)
+            logger.info(f"Created indexes on {collection_name}: {[model.document['name'] for model in missing]}")
+        elif missing:
+            drift.extend(f"{collection_name}: missing index '{model.document['name']}'" for model in missing)
+
+        drift.extend(find_index_drift(collection_name, declared, existing))
+
+    for message in drift:
+        logger.warning(message)
+
+    return drift
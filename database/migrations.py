@@ -0,0 +1,70 @@
+import asyncio
+from datetime import datetime, timezone
+
+from pymongo import ASCENDING, UpdateOne
+from pymongo.asynchronous.database import AsyncDatabase
+
+CREATED_AT_MIGRATION = "notes_created_at_datetime"
+LEGACY_CREATED_AT_FORMAT = "%Y-%m-%d %H:%M"
+
+
+def parse_legacy_created_at(value: str) -> datetime | None:
+    try:
+        return datetime.strptime(value, LEGACY_CREATED_AT_FORMAT).replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+async def migrate_created_at(db: AsyncDatabase, batch_size: int = 1000, pause: float = 0.0) -> dict:
+    """Rewrites string created_at values as UTC datetimes in _id order.
+
+    Each batch is a separate unordered bulk write, so the collection is never locked as a whole,
+    and progress is checkpointed in the migrations collection so an interrupted run resumes
+    after the last processed _id.
+    """
+    state = await db.migrations.find_one({"_id": CREATED_AT_MIGRATION}) or {}
+    if state.get("done"):
+        return state
+
+    last_id = state.get("last_id")
+    migrated, skipped = state.get("migrated", 0), state.get("skipped", 0)
+    while True:
+        filter = {"created_at": {"$type": "string"}}
+        if last_id is not None:
+            filter["_id"] = {"$gt": last_id}
+        batch = await db.notes.find(filter, {"created_at": 1}).sort("_id", ASCENDING).limit(batch_size).to_list()
+        if not batch:
+            break
+
+        updates = []
+        for note in batch:
+            created_at = parse_legacy_created_at(note["created_at"])
+            if created_at is None:
+                skipped += 1
+                continue
+            # Matching on the old value leaves notes rewritten concurrently untouched.
+            updates.append(UpdateOne(
+                {"_id": note["_id"], "created_at": note["created_at"]},
+                {"$set": {"created_at": created_at}}
+            ))
+        if updates:
+            result = await db.notes.bulk_write(updates, ordered=False)
+            migrated += result.modified_count
+
+        last_id = batch[-1]["_id"]
+        await db.migrations.update_one(
+            {"_id": CREATED_AT_MIGRATION},
+            {"$set": {"last_id": last_id, "migrated": migrated, "skipped": skipped,
+                      "updated_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+        if pause:
+            await asyncio.sleep(pause)
+
+    state = {"last_id": last_id, "migrated": migrated, "skipped": skipped, "done": True}
+    await db.migrations.update_one(
+        {"_id": CREATED_AT_MIGRATION},
+        {"$set": {**state, "updated_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    return state
@@ -1,8 +1,55 @@
+import os
 from contextlib import contextmanager
 
-from pymongo import MongoClient
+from pymongo import AsyncMongoClient, MongoClient
+from pymongo.asynchronous.database import AsyncDatabase
 
 from conf.mongodb import mongodb_config
+from database.command_stats import CommandMetricsListener
+from database.pool_stats import PoolStatsListener
+
+pool_stats = PoolStatsListener()
+command_metrics = CommandMetricsListener()
+
+_client: AsyncMongoClient | None = None
+_db: AsyncDatabase | None = None
+
+
+def _client_options() -> dict:
+    return dict(
+        maxPoolSize=mongodb_config.max_pool_size,
+        minPoolSize=mongodb_config.min_pool_size,
+        maxIdleTimeMS=mongodb_config.max_idle_time_ms,
+        waitQueueTimeoutMS=mongodb_config.wait_queue_timeout_ms,
+        event_listeners=[pool_stats, command_metrics],
+    )
+
+
+def _forget_client_after_fork():
+    # A client inherited through fork (e.g. gunicorn --preload) is not fork-safe; the child opens its own.
+    global _client, _db
+    _client = _db = None
+
+
+os.register_at_fork(after_in_child=_forget_client_after_fork)
+
+
+def create_mongo_client() -> AsyncMongoClient:
+    return AsyncMongoClient(mongodb_config.host, int(mongodb_config.port), **_client_options())
+
+
+def open_mongo_client() -> AsyncMongoClient:
+    global _client
+    if _client is None:
+        _client = create_mongo_client()
+    return _client
+
+
+async def close_mongo_client():
+    global _client, _db
+    if _client is not None:
+        await _client.close()
+        _client = _db = None
 
 
 @contextmanager
@@ -13,6 +60,11 @@ def get_mongo_client():
     finally:
         client.close()
 
-def get_db():
-    with get_mongo_client() as client:
-        yield client[mongodb_config.database]
+
+def get_db() -> AsyncDatabase:
+    # One Database object per client; building it on every call showed up in per-request overhead.
+    global _db
+    client = open_mongo_client()
+    if _db is None or _db.client is not client:
+        _db = client[mongodb_config.database]
+    return _db
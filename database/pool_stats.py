@@ -0,0 +1,62 @@
+from pymongo import monitoring
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Collects connection pool counters of the application MongoClient."""
+
+    def __init__(self):
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.checkout_wait_seconds = 0.0
+        self.pools_cleared = 0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self.pools_cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.connections_created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.connections_closed += 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        self.checked_out += 1
+        self.checkouts += 1
+        if event.duration is not None:
+            self.checkout_wait_seconds += event.duration
+
+    def connection_checked_in(self, event):
+        self.checked_out -= 1
+
+    def snapshot(self) -> dict:
+        return {
+            "open_connections": self.connections_created - self.connections_closed,
+            "in_use": self.checked_out,
+            "connections_created": self.connections_created,
+            "connections_closed": self.connections_closed,
+            "checkouts": self.checkouts,
+            "checkout_failures": self.checkout_failures,
+            "checkout_wait_seconds": round(self.checkout_wait_seconds, 6),
+            "pools_cleared": self.pools_cleared,
+        }
@@ -1,6 +1,9 @@
 from datetime import datetime
+from typing import List
 
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, model_validator
+
+from conf.app_conf import notes_config
 
 
 class User(BaseModel):
@@ -22,6 +25,8 @@ class NoteCreate(BaseModel):
 class NoteInDBForUser(NoteCreate):
     uuid: str
     created_at: datetime
+    version: int = 0
+    updated_at: datetime | None = None
 
   
 class NoteInDB(NoteInDBForUser):  
@@ -29,6 +34,77 @@ class NoteInDB(NoteInDBForUser):
     is_active: bool
 
 
+class NoteSearchResult(NoteInDBForUser):
+    score: float
+    snippet: str
+
+
+class NoteSearchResultForStaff(NoteInDB):
+    score: float
+    snippet: str
+
+
+class NoteBatchCreate(BaseModel):
+    notes: List[NoteCreate] = Field(..., min_length=1, max_length=notes_config.batch_max_items)
+
+
+class NoteBatchUpdateItem(BaseModel):
+    uuid: str
+    title: str | None = Field(None, max_length=256)
+    body: str | None = Field(None, max_length=65536)
+
+    @model_validator(mode="after")
+    def check_fields_to_update(self):
+        if self.title is None and self.body is None:
+            raise ValueError("No fields to update")
+        return self
+
+
+class NoteBatchUpdate(BaseModel):
+    notes: List[NoteBatchUpdateItem] = Field(..., min_length=1, max_length=notes_config.batch_max_items)
+
+
+class NoteBatchDelete(BaseModel):
+    uuids: List[str] = Field(..., min_length=1, max_length=notes_config.batch_max_items)
+
+
+class BatchItemResult(BaseModel):
+    uuid: str
+    status: str # created, updated, deleted, not_found, failed
+
+
+class BatchResponse(BaseModel):
+    results: List[BatchItemResult]
+
+
+class NoteStatsSummary(BaseModel):
+    active: int
+    deleted: int
+    deleted_ratio: float
+    authors: int
+
+
+class AuthorNoteStats(BaseModel):
+    author: str
+    active: int
+    deleted: int
+    deleted_ratio: float
+
+
+class DailyNoteStats(BaseModel):
+    day: str # YYYY-MM-DD, UTC
+    created: int
+
+
+class NoteImportReport(BaseModel):
+    imported: int
+    replaced: int
+    failed: int
+    errors: List[str]
+    seconds: float
+    notes_per_second: float
+
+
 class StatusResponse(BaseModel):
     status_code: int
     detail: str
@@ -37,6 +113,11 @@ class StatusResponse(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: str | None = None
+
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 
 class RoleUpdateRequest(BaseModel):
@@ -0,0 +1,29 @@
+import argparse
+import asyncio
+
+from database.indexes import ensure_indexes
+from database.mongo import close_mongo_client, get_db
+
+
+async def init_indexes(check_only: bool = False):
+    try:
+        drift = await ensure_indexes(get_db(), create=not check_only)
+    finally:
+        await close_mongo_client()
+
+    if drift:
+        print("Index drift detected:")
+        for message in drift:
+            print(f"  - {message}")
+    else:
+        print("Indexes are up to date.")
+    return drift
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create declared MongoDB indexes and report drift.")
+    parser.add_argument("--check", action="store_true", help="only report missing or drifted indexes")
+    args = parser.parse_args()
+
+    drift = asyncio.run(init_indexes(check_only=args.check))
+    raise SystemExit(1 if drift else 0)
@@ -1,13 +1,117 @@
+import logging
+import os
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI
 
-from app.api.notes_handlers import note_routers
+from app.api.notes_handlers import BATCH_PAYLOAD_ROUTES, note_routers
+from app.api.service_handlers import (health_routers, metrics_routers,
+                                      service_routers)
 from app.api.user_handlers import user_routers
+from app.crud.note_archive import note_archiver
+from app.crud.note_events import note_events
+from app.crud.users import password_hasher, resolve_token_principal
+from app.utils.audit import setup_audit_logging, shutdown_audit_logging
+from app.utils.cache import is_process_local
+from app.utils.compression import CompressionMiddleware, available_encoders
+from app.utils.limit_payload_size import PayloadLimitMiddleware
+from app.utils.metrics_middleware import MetricsMiddleware
+from app.utils.rate_limit import RateLimitMiddleware, create_bucket_store
+from conf.app_conf import (access_token_config, compression_config,
+                           note_archive_config, note_cache_config,
+                           notes_config, user_cache_config)
+from conf.mongodb import mongodb_config
+from conf.rate_limit import rate_limit_config, route_limits
+from conf.server import server_config
+from database.indexes import ensure_indexes
+from database.mongo import close_mongo_client, get_db, open_mongo_client
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_audit_logging()
+    open_mongo_client()
+    password_hasher.start()
+    if mongodb_config.ensure_indexes:
+        await ensure_indexes(get_db())
+    if note_archive_config.enabled:
+        note_archiver.start(get_db())
+    yield
+    await note_archiver.stop()
+    await note_events.stop()
+    password_hasher.shutdown()
+    await close_mongo_client()
+    shutdown_audit_logging()
+
+
+def check_shared_caches(workers: int):
+    """Keeps several workers from serving stale principals out of process-local caches.
+
+    An invalidation only reaches the worker that made it, so a role change or a logout would keep being
+    ignored by the others until the entry expires, and the same goes for an updated or deleted note. The user
+    cache is an optimization and is switched off for the workers (which inherit the environment); sessions are
+    always cached, so session mode needs Redis, and the note cache, being opt-in, has to be shared as well.
+    """
+    if workers < 2:
+        return
+    if note_cache_config.enabled and is_process_local(note_cache_config.backend_url):
+        raise SystemExit(
+            f"SERVER_WORKERS={workers} with NOTE_CACHE_ENABLED=true needs a shared NOTE_CACHE_BACKEND_URL (redis://...)"
+        )
+    if not is_process_local(user_cache_config.backend_url):
+        return
+    if access_token_config.mode == "session":
+        raise SystemExit(
+            f"SERVER_WORKERS={workers} with TOKEN_MODE=session needs a shared USER_CACHE_BACKEND_URL (redis://...)"
+        )
+    if user_cache_config.enabled:
+        logger.warning(f"USER_CACHE_BACKEND_URL is process-local, disabling the user cache for {workers} workers")
+        os.environ["USER_CACHE_ENABLED"] = "false"
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+if compression_config.enabled:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=compression_config.minimum_size,
+        encoders=available_encoders(
+            compression_config.gzip_level, compression_config.brotli_quality, compression_config.zstd_level
+        ),
+    )
+app.add_middleware(
+    PayloadLimitMiddleware,
+    route_limits={route: notes_config.batch_max_bytes for route in BATCH_PAYLOAD_ROUTES},
+)
+if rate_limit_config.enabled:
+    app.add_middleware(
+        RateLimitMiddleware,
+        store=create_bucket_store(rate_limit_config.backend_url, rate_limit_config.max_keys),
+        route_limits=route_limits,
+        resolve_principal=resolve_token_principal,
+    )
+# Added last so it wraps the rate limiter and also records rejected requests.
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(user_routers, prefix="/users", tags=["users"])
 app.include_router(note_routers, prefix="/notes", tags=["notes"])
+app.include_router(service_routers, prefix="/service", tags=["service"])
+app.include_router(metrics_routers)
+app.include_router(health_routers, prefix="/health", tags=["health"])
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    check_shared_caches(server_config.workers)
+    # Workers are separate processes that each run the lifespan, so every worker opens its own Mongo pool.
+    uvicorn.run(
+        "main:app",
+        host=server_config.host,
+        port=server_config.port,
+        workers=server_config.workers,
+        loop=server_config.loop,
+        http=server_config.http,
+        timeout_keep_alive=server_config.timeout_keep_alive,
+        backlog=server_config.backlog,
+        timeout_graceful_shutdown=server_config.timeout_graceful_shutdown,
+    )
@@ -0,0 +1,22 @@
+import argparse
+import asyncio
+
+from database.migrations import migrate_created_at
+from database.mongo import close_mongo_client, get_db
+
+
+async def run_migration(batch_size: int, pause: float) -> dict:
+    try:
+        return await migrate_created_at(get_db(), batch_size=batch_size, pause=pause)
+    finally:
+        await close_mongo_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert string created_at values of notes to UTC datetimes.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    args = parser.parse_args()
+
+    state = asyncio.run(run_migration(args.batch_size, args.pause))
+    print(f"Migrated {state['migrated']} notes, skipped {state['skipped']} unparsable values.")
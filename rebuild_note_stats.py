@@ -0,0 +1,21 @@
+import argparse
+import asyncio
+
+from app.crud.note_stats import NoteStatsDAO
+from database.mongo import close_mongo_client, get_db
+
+
+async def rebuild_note_stats() -> dict:
+    try:
+        return await NoteStatsDAO(get_db()).rebuild()
+    finally:
+        await close_mongo_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute the note statistics rollups from the notes collection.")
+    parser.parse_args()
+
+    summary = asyncio.run(rebuild_note_stats())
+    print(f"Rebuilt note stats: {summary['active']} active, {summary['deleted']} deleted, "
+          f"{summary['authors']} authors.")
@@ -0,0 +1,55 @@
+import json
+import os
+import queue
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from app.utils import audit
+from app.utils.audit import (DroppingQueueHandler, audit_logger,
+                             setup_audit_logging, shutdown_audit_logging)
+from app.utils.log_user_activity import log_user_activity
+
+
+class TestAuditLogging(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.log_dir = tempfile.TemporaryDirectory()
+        self.log_file = os.path.join(self.log_dir.name, "audit.log")
+        config = SimpleNamespace(
+            file=self.log_file, max_bytes=1024 * 1024, backup_count=1,
+            queue_size=100, batch_size=10, mongo_enabled=False, mongo_collection="audit",
+        )
+        patcher = patch.object(audit, "audit_log_config", config)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.log_dir.cleanup)
+
+    async def test_log_user_activity_writes_json(self):
+        @log_user_activity(log_note_uuid=True)
+        async def get_note(note_uuid: str, current_user):
+            return note_uuid
+
+        setup_audit_logging()
+        await get_note(note_uuid="test-uuid", current_user=SimpleNamespace(username="user@example.com", role="User"))
+        shutdown_audit_logging()
+
+        with open(self.log_file) as log_file:
+            records = [json.loads(line) for line in log_file]
+
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["event"], "user_activity")
+        self.assertEqual(records[0]["user"], "user@example.com")
+        self.assertEqual(records[0]["action"], "get_note")
+        self.assertEqual(records[0]["note_uuid"], "test-uuid")
+
+    def test_full_queue_drops_records(self):
+        handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+        audit_logger.addHandler(handler)
+        self.addCleanup(audit_logger.removeHandler, handler)
+
+        audit_logger.warning("first")
+        audit_logger.warning("second")
+
+        self.assertEqual(handler.queue.qsize(), 1)
+        self.assertEqual(handler.dropped, 1)
@@ -0,0 +1,90 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from app.utils.cache import Cache, InMemoryCacheBackend
+from main import check_shared_caches
+
+
+class TestInMemoryCacheBackend(unittest.IsolatedAsyncioTestCase):
+    async def test_evicts_least_recently_used(self):
+        backend = InMemoryCacheBackend(max_entries=2)
+
+        await backend.set("a", b"1", ttl=60)
+        await backend.set("b", b"2", ttl=60)
+        await backend.get("a")
+        await backend.set("c", b"3", ttl=60)
+
+        self.assertEqual(await backend.get("a"), b"1")
+        self.assertIsNone(await backend.get("b"))
+        self.assertEqual(backend.evictions, 1)
+
+    async def test_evicts_over_byte_budget(self):
+        backend = InMemoryCacheBackend(max_entries=100, max_bytes=20)
+
+        await backend.set("a", b"x" * 9, ttl=60)
+        await backend.set("b", b"x" * 9, ttl=60)
+        await backend.set("c", b"x" * 30, ttl=60)
+
+        self.assertEqual(backend.size_bytes, 20)
+        self.assertIsNone(await backend.get("c"))
+        await backend.set("a", b"x" * 4, ttl=60)
+        await backend.set("c", b"x" * 9, ttl=60)
+
+        self.assertIsNone(await backend.get("b"))
+        self.assertEqual(backend.size_bytes, 15)
+        self.assertEqual(backend.evictions, 1)
+
+    async def test_expired_entry(self):
+        backend = InMemoryCacheBackend(max_entries=2)
+
+        with patch("app.utils.cache.time.monotonic", return_value=100.0):
+            await backend.set("a", b"1", ttl=10)
+        with patch("app.utils.cache.time.monotonic", return_value=111.0):
+            self.assertIsNone(await backend.get("a"))
+
+        self.assertEqual(len(backend), 0)
+
+
+class TestCache(unittest.IsolatedAsyncioTestCase):
+    async def test_counts_hits_and_misses(self):
+        cache = Cache(InMemoryCacheBackend(max_entries=10), namespace="user", ttl=60)
+
+        await cache.get("user@example.com")
+        await cache.set("user@example.com", b"{}")
+        await cache.get("user@example.com")
+        await cache.invalidate("user@example.com")
+        await cache.get("user@example.com")
+
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 2, "entries": 0, "bytes": 0, "evictions": 0})
+
+
+class TestCheckSharedCaches(unittest.TestCase):
+    def test_several_workers_disable_process_local_user_cache(self):
+        with patch("main.user_cache_config.backend_url", "memory://"), patch.dict("os.environ"):
+            check_shared_caches(workers=1)
+            self.assertNotIn("USER_CACHE_ENABLED", os.environ)
+
+            check_shared_caches(workers=4)
+            self.assertEqual(os.environ["USER_CACHE_ENABLED"], "false")
+
+    def test_shared_user_cache_stays_enabled(self):
+        with patch("main.user_cache_config.backend_url", "redis://localhost:6379/0"), patch.dict("os.environ"):
+            check_shared_caches(workers=4)
+            self.assertNotIn("USER_CACHE_ENABLED", os.environ)
+
+    def test_session_mode_needs_shared_cache_without_user_cache(self):
+        with patch("main.user_cache_config.backend_url", "memory://"), \
+                patch("main.user_cache_config.enabled", False), patch("main.access_token_config.mode", "session"):
+            with self.assertRaises(SystemExit):
+                check_shared_caches(workers=4)
+
+    def test_note_cache_needs_shared_backend(self):
+        with patch("main.user_cache_config.backend_url", "redis://localhost:6379/0"), \
+                patch("main.note_cache_config.enabled", True), patch("main.note_cache_config.backend_url", "memory://"):
+            check_shared_caches(workers=1)
+            with self.assertRaises(SystemExit):
+                check_shared_caches(workers=4)
+
+            with patch("main.note_cache_config.backend_url", "redis://localhost:6379/0"):
+                check_shared_caches(workers=4)
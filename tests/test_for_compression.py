@@ -0,0 +1,120 @@
+import gzip
+import unittest
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.utils.compression import (CompressionMiddleware, available_encoders,
+                                   create_decompressor, negotiate_encoding)
+
+BODY = "spam " * 1000
+
+
+def create_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/large")
+    async def large():
+        return PlainTextResponse(BODY)
+
+    @app.get("/small")
+    async def small():
+        return PlainTextResponse("spam")
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(3):
+                yield BODY
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    @app.get("/events")
+    async def events():
+        async def chunks():
+            yield "data: {}\n\n" * 500
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+    return app
+
+
+class TestNegotiateEncoding(unittest.TestCase):
+    def test_prefers_highest_q(self):
+        self.assertEqual(negotiate_encoding("gzip;q=0.5, br;q=1.0", ["br", "gzip"]), "br")
+
+    def test_server_order_breaks_ties(self):
+        self.assertEqual(negotiate_encoding("gzip, br", ["zstd", "br", "gzip"]), "br")
+
+    def test_refused_encoding(self):
+        self.assertIsNone(negotiate_encoding("gzip;q=0, identity", ["gzip"]))
+        self.assertEqual(negotiate_encoding("*", ["gzip"]), "gzip")
+
+
+class TestCreateDecompressor(unittest.TestCase):
+    def test_gzip_in_chunks(self):
+        data = gzip.compress(BODY.encode())
+        decompress = create_decompressor("gzip")
+
+        self.assertEqual(b"".join([*decompress(data[:10]), *decompress(data[10:])]), BODY.encode())
+
+    def test_gzip_output_is_split_into_pieces(self):
+        data = gzip.compress(b"0" * 10000)
+
+        pieces = list(create_decompressor("gzip", piece_size=1024)(data))
+
+        self.assertTrue(all(len(piece) <= 1024 for piece in pieces))
+        self.assertEqual(b"".join(pieces), b"0" * 10000)
+
+    def test_invalid_data(self):
+        with self.assertRaises(ValueError):
+            list(create_decompressor("gzip")(b"not gzip"))
+
+    def test_unsupported_encoding(self):
+        with self.assertRaises(ValueError):
+            create_decompressor("compress")
+
+
+class TestCompressionMiddleware(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(create_app())
+
+    def get(self, path: str, encoding: str = "gzip"):
+        # The test client decodes gzip itself, so the raw stream is read to check what was sent.
+        with self.client.stream("GET", path, headers={"Accept-Encoding": encoding}) as response:
+            return response, b"".join(response.iter_raw())
+
+    def test_compresses_large_response(self):
+        response, body = self.get("/large")
+
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(response.headers["vary"], "Accept-Encoding")
+        self.assertEqual(int(response.headers["content-length"]), len(body))
+        self.assertEqual(gzip.decompress(body).decode(), BODY)
+
+    def test_skips_small_response(self):
+        response, body = self.get("/small")
+
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertEqual(body, b"spam")
+
+    def test_compresses_stream(self):
+        response, body = self.get("/stream")
+
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertNotIn("content-length", response.headers)
+        self.assertEqual(gzip.decompress(body).decode(), BODY * 3)
+
+    def test_skips_event_stream(self):
+        response, _ = self.get("/events")
+
+        self.assertNotIn("content-encoding", response.headers)
+
+    def test_without_accept_encoding(self):
+        response, body = self.get("/large", encoding="identity")
+
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertEqual(body.decode(), BODY)
+
+    def test_gzip_always_available(self):
+        self.assertIn("gzip", available_encoders())
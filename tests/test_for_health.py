@@ -0,0 +1,39 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from fastapi import status
+from fastapi.testclient import TestClient
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.errors import ServerSelectionTimeoutError
+
+from database.mongo import get_db
+from main import app
+
+
+class TestHealthEndpoints(unittest.TestCase):
+    def setUp(self):
+        self.mock_db = MagicMock(spec=AsyncDatabase)
+        app.dependency_overrides[get_db] = lambda: self.mock_db
+        self.addCleanup(app.dependency_overrides.clear)
+        self.client = TestClient(app)
+
+    def test_liveness(self):
+        response = self.client.get("/health/live")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.mock_db.command.assert_not_called()
+
+    def test_readiness_pings_mongo(self):
+        self.mock_db.command = AsyncMock(return_value={"ok": 1})
+
+        response = self.client.get("/health/ready")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.mock_db.command.assert_awaited_once_with("ping")
+
+    def test_readiness_unavailable(self):
+        self.mock_db.command = AsyncMock(side_effect=ServerSelectionTimeoutError("no servers"))
+
+        response = self.client.get("/health/ready")
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
@@ -0,0 +1,51 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from database.indexes import (COLLECTION_OPTIONS, INDEXES, ensure_indexes,
+                              find_index_drift)
+
+
+class TestIndexes(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.collections = {name: MagicMock() for name in INDEXES}
+        self.mock_db = MagicMock()
+        self.mock_db.__getitem__.side_effect = self.collections.__getitem__
+        self.mock_db.create_collection = AsyncMock()
+
+    async def test_ensure_indexes_creates_missing(self):
+        for collection in self.collections.values():
+            collection.index_information = AsyncMock(return_value={"_id_": {"key": [("_id", 1)]}})
+            collection.create_indexes = AsyncMock()
+
+        drift = await ensure_indexes(self.mock_db)
+
+        self.assertEqual(drift, [])
+        for name, collection in self.collections.items():
+            collection.create_indexes.assert_awaited_once_with(INDEXES[name])
+        self.mock_db.create_collection.assert_awaited_once_with("notes_archive", **COLLECTION_OPTIONS["notes_archive"])
+
+    async def test_ensure_indexes_check_only(self):
+        for collection in self.collections.values():
+            collection.index_information = AsyncMock(return_value={"_id_": {"key": [("_id", 1)]}})
+            collection.create_indexes = AsyncMock()
+
+        drift = await ensure_indexes(self.mock_db, create=False)
+
+        self.assertIn("users: missing index 'username_unique'", drift)
+        for collection in self.collections.values():
+            collection.create_indexes.assert_not_called()
+        self.mock_db.create_collection.assert_not_called()
+
+    def test_find_index_drift(self):
+        existing = {
+            "_id_": {"key": [("_id", 1)]},
+            "username_unique": {"key": [("username", 1)], "v": 2},
+            "role_1": {"key": [("role", 1)], "v": 2},
+        }
+
+        drift = find_index_drift("users", INDEXES["users"], existing)
+
+        self.assertEqual(drift, [
+            "users: index 'username_unique' differs from its declaration",
+            "users: undeclared index 'role_1'",
+        ])
@@ -0,0 +1,66 @@
+import unittest
+
+from app.utils.metrics import (DAO_METHOD_SECONDS, Counter, Histogram,
+                               instrument_dao)
+
+
+class TestMetrics(unittest.IsolatedAsyncioTestCase):
+    def test_histogram_render(self):
+        histogram = Histogram("test_latency_seconds", "Test latency.", ("route",), buckets=(0.1, 1.0))
+
+        histogram.labels("/notes").observe(0.05)
+        histogram.labels("/notes").observe(0.5)
+        histogram.labels("/notes").observe(5)
+
+        self.assertEqual(histogram.render().splitlines()[2:], [
+            'test_latency_seconds_bucket{route="/notes",le="0.1"} 1',
+            'test_latency_seconds_bucket{route="/notes",le="1.0"} 2',
+            'test_latency_seconds_bucket{route="/notes",le="+Inf"} 3',
+            'test_latency_seconds_sum{route="/notes"} 5.55',
+            'test_latency_seconds_count{route="/notes"} 3',
+        ])
+
+    def test_counter_escapes_labels(self):
+        counter = Counter("test_total", "Test counter.", ("path",))
+
+        counter.labels('/a"b').inc(2)
+
+        self.assertIn('test_total{path="/a\\"b"} 2.0', counter.render())
+
+    async def test_instrument_dao(self):
+        @instrument_dao
+        class TestDAO():
+            async def get_item(self):
+                return "item"
+
+            def _helper(self):
+                return "helper"
+
+        self.assertEqual(await TestDAO().get_item(), "item")
+        self.assertEqual(DAO_METHOD_SECONDS.labels("TestDAO", "get_item").count, 1)
+        self.assertNotIn(("TestDAO", "_helper"), DAO_METHOD_SECONDS._children)
+
+    async def test_instrument_dao_times_cursor_consumption(self):
+        class Cursor():
+            def __init__(self):
+                self.documents = iter(["a", "b"])
+
+            def __aiter__(self):
+                return self
+
+            async def __anext__(self):
+                try:
+                    return next(self.documents)
+                except StopIteration:
+                    raise StopAsyncIteration
+
+        @instrument_dao
+        class CursorDAO():
+            def find_items(self):
+                return Cursor()
+
+        cursor = CursorDAO().find_items()
+        self.assertEqual(DAO_METHOD_SECONDS.labels("CursorDAO", "find_items").count, 0)
+
+        self.assertEqual([item async for item in cursor], ["a", "b"])
+        self.assertEqual(DAO_METHOD_SECONDS.labels("CursorDAO", "find_items").count, 1)
@@ -0,0 +1,61 @@
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+from pymongo import UpdateOne
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.database import AsyncDatabase
+
+from database.migrations import CREATED_AT_MIGRATION, migrate_created_at
+
+
+class TestCreatedAtMigration(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.mock_db = MagicMock(spec=AsyncDatabase)
+        self.mock_db.notes = MagicMock(spec=AsyncCollection)
+        self.mock_db.migrations = MagicMock(spec=AsyncCollection)
+        self.mock_db.notes.bulk_write = AsyncMock(return_value=MagicMock(modified_count=1))
+
+    def _batches(self, *batches):
+        self.mock_db.notes.find.return_value.sort.return_value.limit.return_value.to_list = AsyncMock(
+            side_effect=list(batches) + [[]]
+        )
+
+    async def test_migrates_in_batches_with_checkpoints(self):
+        self.mock_db.migrations.find_one = AsyncMock(return_value=None)
+        self._batches(
+            [{"_id": 1, "created_at": "2024-02-20 12:00"}],
+            [{"_id": 2, "created_at": "broken"}],
+        )
+
+        state = await migrate_created_at(self.mock_db, batch_size=1)
+
+        self.assertEqual(state, {"last_id": 2, "migrated": 1, "skipped": 1, "done": True})
+        self.mock_db.notes.bulk_write.assert_awaited_once_with([
+            UpdateOne(
+                {"_id": 1, "created_at": "2024-02-20 12:00"},
+                {"$set": {"created_at": datetime(2024, 2, 20, 12, 0, tzinfo=timezone.utc)}}
+            )
+        ], ordered=False)
+        self.assertEqual(self.mock_db.migrations.update_one.await_count, 3)
+
+    async def test_resumes_after_checkpoint(self):
+        self.mock_db.migrations.find_one = AsyncMock(
+            return_value={"_id": CREATED_AT_MIGRATION, "last_id": 5, "migrated": 5, "skipped": 0}
+        )
+        self._batches()
+
+        state = await migrate_created_at(self.mock_db)
+
+        self.mock_db.notes.find.assert_called_once_with(
+            {"created_at": {"$type": "string"}, "_id": {"$gt": 5}}, {"created_at": 1}
+        )
+        self.assertEqual(state["migrated"], 5)
+        self.assertTrue(state["done"])
+
+    async def test_finished_migration_is_noop(self):
+        self.mock_db.migrations.find_one = AsyncMock(return_value={"_id": CREATED_AT_MIGRATION, "done": True})
+
+        await migrate_created_at(self.mock_db)
+
+        self.mock_db.notes.find.assert_not_called()
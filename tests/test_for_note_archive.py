@@ -0,0 +1,82 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import ANY, AsyncMock, MagicMock
+
+from pymongo import DeleteOne, ReplaceOne
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.database import AsyncDatabase
+
+from app.crud.note_archive import archive_deleted_notes, archive_filter
+
+
+class AsyncIterator():
+    def __init__(self, items):
+        self._items = iter(items)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._items)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class TestNoteArchive(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.mock_db = MagicMock(spec=AsyncDatabase)
+        self.mock_db.notes = MagicMock(spec=AsyncCollection)
+        self.mock_db.notes_archive = MagicMock(spec=AsyncCollection)
+        self.notes = [
+            {"_id": 1, "uuid": "a", "is_active": False, "version": 2},
+            {"_id": 2, "uuid": "b", "is_active": False, "version": 5},
+        ]
+
+    def test_archive_filter_uses_retention(self):
+        filter = archive_filter(30)
+
+        cutoff = filter["$or"][0]["updated_at"]["$lt"]
+        self.assertFalse(filter["is_active"])
+        self.assertAlmostEqual(cutoff, datetime.now(timezone.utc) - timedelta(days=30), delta=timedelta(seconds=5))
+        self.assertIn({"updated_at": None}, filter["$or"])
+
+    async def test_archive_moves_batches(self):
+        self.mock_db.notes.find.return_value.limit.return_value.to_list = AsyncMock(side_effect=[self.notes, []])
+        self.mock_db.notes.bulk_write.return_value = MagicMock(deleted_count=2)
+
+        archived = await archive_deleted_notes(self.mock_db, retention_days=30, batch_size=2)
+
+        self.assertEqual(archived, 2)
+        self.mock_db.notes.find.return_value.limit.assert_called_with(2)
+        self.mock_db.notes_archive.bulk_write.assert_called_once_with([
+            ReplaceOne({"uuid": "a"}, {**self.notes[0], "archived_at": ANY}, upsert=True),
+            ReplaceOne({"uuid": "b"}, {**self.notes[1], "archived_at": ANY}, upsert=True),
+        ], ordered=False)
+        self.mock_db.notes.bulk_write.assert_called_once_with([
+            DeleteOne({"_id": 1, "is_active": False, "version": 2}),
+            DeleteOne({"_id": 2, "is_active": False, "version": 5}),
+        ], ordered=False)
+        self.mock_db.notes_archive.delete_many.assert_not_called()
+
+    async def test_archive_drops_copies_of_notes_restored_meanwhile(self):
+        self.mock_db.notes.find.return_value.limit.return_value.to_list = AsyncMock(side_effect=[self.notes, []])
+        self.mock_db.notes.find.side_effect = [
+            self.mock_db.notes.find.return_value, AsyncIterator([{"uuid": "b"}]), self.mock_db.notes.find.return_value,
+        ]
+        self.mock_db.notes.bulk_write.return_value = MagicMock(deleted_count=1)
+
+        archived = await archive_deleted_notes(self.mock_db, retention_days=30)
+
+        self.assertEqual(archived, 1)
+        self.mock_db.notes_archive.delete_many.assert_called_once_with({"uuid": {"$in": ["b"]}})
+
+    async def test_archive_stops_when_nothing_moves(self):
+        self.mock_db.notes.find.return_value.limit.return_value.to_list = AsyncMock(return_value=self.notes)
+        self.mock_db.notes.find.side_effect = [self.mock_db.notes.find.return_value, AsyncIterator(self.notes)]
+        self.mock_db.notes.bulk_write.return_value = MagicMock(deleted_count=0)
+
+        archived = await archive_deleted_notes(self.mock_db, retention_days=30)
+
+        self.assertEqual(archived, 0)
+        self.mock_db.notes.bulk_write.assert_called_once()
@@ -0,0 +1,173 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi import status
+from fastapi.testclient import TestClient
+from pymongo.errors import OperationFailure
+
+from app.crud.exceptions import NoteEventsUnavailableException
+from app.crud.note_events import NoteEventHub, note_event, note_events
+from app.crud.users import get_current_user_from_stream_token
+from app.utils.streaming import sse_message
+from database.schemas import UserInDB
+from main import app
+
+
+def change(event_id: str, operation: str = "insert", author: str = "alice", updated_fields: dict = None,
+           is_active: bool = True) -> dict:
+    document = {
+        "_id": {"_data": event_id},
+        "operationType": operation,
+        "fullDocument": {
+            "_id": "object-id", "uuid": f"uuid-{event_id}", "title": "Note", "body": "Buy spam",
+            "author": author, "is_active": is_active, "version": 2,
+        },
+    }
+    if updated_fields is not None:
+        document["updateDescription"] = {"updatedFields": updated_fields}
+    return document
+
+
+class TestNoteEvent(unittest.TestCase):
+    def test_create(self):
+        author, event = note_event(change("1"))
+
+        self.assertEqual(author, "alice")
+        self.assertEqual(event["event"], "create")
+        self.assertNotIn("author", event["data"])
+        self.assertNotIn("_id", event["data"])
+
+    def test_delete_and_restore(self):
+        _, deleted = note_event(change("1", "update", updated_fields={"is_active": False}, is_active=False))
+        _, restored = note_event(change("2", "update", updated_fields={"is_active": True}))
+
+        self.assertEqual(deleted, {"event": "delete", "data": {"uuid": "uuid-1", "version": 2}})
+        self.assertEqual(restored["event"], "restore")
+
+    def test_update_of_deleted_note_is_skipped(self):
+        self.assertIsNone(note_event(change("1", "update", updated_fields={"title": "New"}, is_active=False)))
+
+
+class TestNoteEventHub(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.hub = NoteEventHub(buffer_size=3, queue_size=2)
+
+    async def test_fans_out_by_author(self):
+        alice = self.hub.subscribe("alice")
+        bob = self.hub.subscribe("bob")
+
+        self.hub.publish(change("1", author="alice"))
+
+        self.assertEqual(alice.queue.qsize(), 1)
+        self.assertEqual(bob.queue.qsize(), 0)
+
+    async def test_resume_from_last_event_id(self):
+        for event_id, author in (("1", "alice"), ("2", "bob"), ("3", "alice")):
+            self.hub.publish(change(event_id, author=author))
+
+        subscription = self.hub.subscribe("alice", last_event_id="1")
+
+        self.assertEqual([event_id for event_id, _ in subscription.backlog], ["3"])
+        self.assertFalse(subscription.reset)
+
+    def watch_returning(self, *changes):
+        stream = MagicMock()
+        stream.__aenter__ = AsyncMock(return_value=stream)
+        stream.__aexit__ = AsyncMock(return_value=False)
+        stream.try_next = AsyncMock(side_effect=[*changes, None])
+        collection = MagicMock()
+        collection.watch = AsyncMock(return_value=stream)
+        self.hub._collection = collection
+        return collection
+
+    async def replay(self, subscription) -> list[str]:
+        return [event_id async for event_id, _ in self.hub.replay(subscription)]
+
+    async def test_replays_events_no_longer_buffered(self):
+        for event_id in ("1", "2", "3", "4"):
+            self.hub.publish(change(event_id))
+        collection = self.watch_returning(change("2"), change("3"), change("4"), change("5"))
+
+        subscription = self.hub.subscribe("alice", last_event_id="1")
+
+        self.assertEqual(await self.replay(subscription), ["2", "3", "4"])
+        self.assertFalse(subscription.reset)
+        self.assertEqual(collection.watch.call_args.kwargs["resume_after"], {"_data": "1"})
+
+    async def test_reset_when_replay_fails(self):
+        for event_id in ("1", "2", "3", "4"):
+            self.hub.publish(change(event_id))
+        collection = self.watch_returning()
+        collection.watch.side_effect = OperationFailure("history lost", code=286)
+
+        subscription = self.hub.subscribe("alice", last_event_id="1")
+
+        self.assertEqual(await self.replay(subscription), [])
+        self.assertTrue(subscription.reset)
+        self.assertEqual(subscription.backlog, [])
+
+    async def test_history_lost_restarts_from_now(self):
+        self.hub._resume_token = {"_data": "1"}
+        self.hub.publish(change("1"))
+        collection = MagicMock()
+        collection.watch = AsyncMock(side_effect=[OperationFailure("history lost", code=286), asyncio.CancelledError])
+
+        with patch("app.crud.note_events.note_stream_config.retry_seconds", 0), \
+                self.assertRaises(asyncio.CancelledError):
+            await self.hub._watch(collection)
+
+        self.assertIsNone(collection.watch.call_args.kwargs["resume_after"])
+        # Buffered events lie before the gap, so resuming from them goes through the oplog again.
+        self.assertEqual(self.hub.subscribe("alice", last_event_id="1").resume_after, "1")
+
+    async def test_unsupported_deployment_stops_the_hub(self):
+        subscription = self.hub.subscribe("alice")
+        collection = MagicMock()
+        collection.watch = AsyncMock(
+            side_effect=OperationFailure("The $changeStream stage is only supported on replica sets", code=40573)
+        )
+
+        with self.assertLogs("app.crud.note_events", level="ERROR") as logs:
+            await self.hub._watch(collection)
+
+        self.assertEqual(len(logs.records), 1)
+        self.assertTrue(self.hub.failed)
+        self.assertTrue(subscription.closed)
+        self.assertEqual(self.hub.subscribers, 0)
+        with self.assertRaises(NoteEventsUnavailableException):
+            self.hub.subscribe("alice")
+        self.hub.start(collection)
+        self.assertEqual(collection.watch.call_count, 1)
+
+    async def test_slow_subscriber_is_closed(self):
+        subscription = self.hub.subscribe("alice")
+
+        for event_id in ("1", "2", "3"):
+            self.hub.publish(change(event_id))
+
+        self.assertTrue(subscription.closed)
+        self.assertEqual(self.hub.subscribers, 0)
+
+
+class TestNoteStreamEndpoint(unittest.TestCase):
+    def setUp(self):
+        app.dependency_overrides[get_current_user_from_stream_token] = lambda: UserInDB(
+            username="alice", hashed_password="", role="User"
+        )
+        self.addCleanup(app.dependency_overrides.clear)
+        self.client = TestClient(app)
+
+    @patch.object(note_events, "failed", True)
+    def test_unavailable_when_hub_failed(self):
+        response = self.client.get("/notes/stream")
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+class TestSseMessage(unittest.TestCase):
+    def test_format(self):
+        self.assertEqual(
+            sse_message("create", {"uuid": "uuid-1"}, "token"),
+            'id: token\nevent: create\ndata: {"uuid": "uuid-1"}\n\n'
+        )
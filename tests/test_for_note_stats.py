@@ -0,0 +1,151 @@
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi import status
+from fastapi.testclient import TestClient
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.database import AsyncDatabase
+
+from app.crud.note_stats import NoteStatsDAO
+from app.crud.users import get_current_user_from_token
+from database.schemas import UserInDB
+from main import app
+
+
+class TestNoteStatsDAO(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.mock_mongo = MagicMock(spec=AsyncDatabase)
+        self.mock_collection = MagicMock(spec=AsyncCollection)
+        self.mock_notes = MagicMock(spec=AsyncCollection)
+        self.mock_mongo.note_stats = self.mock_collection
+        self.mock_mongo.notes = self.mock_notes
+
+        self.stats_dao = NoteStatsDAO(mongo=self.mock_mongo)
+
+    async def test_record_created_increments_rollups(self):
+        self.mock_collection.bulk_write.return_value = MagicMock(upserted_ids={})
+
+        await self.stats_dao.record_created("user", datetime(2024, 2, 20, 12, tzinfo=timezone.utc), count=2)
+
+        self.mock_collection.bulk_write.assert_called_once_with([
+            UpdateOne({"_id": "total"}, {"$inc": {"active": 2, "deleted": 0}}, upsert=True),
+            UpdateOne(
+                {"_id": "author:user"},
+                {"$inc": {"active": 2, "deleted": 0}, "$setOnInsert": {"kind": "author", "author": "user"}},
+                upsert=True
+            ),
+            UpdateOne(
+                {"_id": "day:2024-02-20"},
+                {"$inc": {"created": 2}, "$setOnInsert": {"kind": "day", "day": "2024-02-20"}},
+                upsert=True
+            ),
+        ], ordered=False)
+        self.mock_collection.update_one.assert_not_called()
+
+    async def test_first_note_of_author_counts_author(self):
+        self.mock_collection.bulk_write.return_value = MagicMock(upserted_ids={1: "author:user"})
+
+        await self.stats_dao.record_created("user", datetime(2024, 2, 20, tzinfo=timezone.utc))
+
+        self.mock_collection.update_one.assert_called_once_with({"_id": "total"}, {"$inc": {"authors": 1}})
+
+    async def test_record_deleted_moves_notes_to_deleted(self):
+        self.mock_collection.bulk_write.return_value = MagicMock(upserted_ids={})
+
+        await self.stats_dao.record_deleted("user", count=3)
+
+        requests = self.mock_collection.bulk_write.call_args[0][0]
+        self.assertEqual(len(requests), 2)
+        self.assertEqual(requests[0], UpdateOne({"_id": "total"}, {"$inc": {"active": -3, "deleted": 3}}, upsert=True))
+
+    async def test_summary_from_rollup(self):
+        self.mock_collection.find_one.return_value = {"_id": "total", "active": 3, "deleted": 1, "authors": 2}
+
+        summary = await self.stats_dao.summary()
+
+        self.assertEqual(summary, {"active": 3, "deleted": 1, "deleted_ratio": 0.25, "authors": 2})
+
+    async def test_summary_without_rollup(self):
+        self.mock_collection.find_one.return_value = None
+
+        summary = await self.stats_dao.summary()
+
+        self.assertEqual(summary, {"active": 0, "deleted": 0, "deleted_ratio": 0.0, "authors": 0})
+
+    async def test_daily_pipeline_groups_by_utc_day(self):
+        pipeline = self.stats_dao._daily_pipeline(created_from=datetime(2024, 2, 1, tzinfo=timezone.utc))
+
+        match = {"$match": {"created_at": {"$type": "date", "$gte": datetime(2024, 2, 1, tzinfo=timezone.utc)}}}
+        self.assertEqual(pipeline[0], match)
+        self.assertEqual(pipeline[1], {"$unionWith": {"coll": "notes_archive", "pipeline": [match]}})
+        self.assertEqual(pipeline[2]["$group"]["_id"], {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}})
+
+    async def test_authors_pipeline_counts_archived_notes(self):
+        pipeline = self.stats_dao._authors_pipeline()
+
+        self.assertEqual(pipeline[0], {"$unionWith": {"coll": "notes_archive", "pipeline": []}})
+
+    async def test_rebuild_replaces_rollups(self):
+        authors_cursor, days_cursor = MagicMock(), MagicMock()
+        authors_cursor.to_list = AsyncMock(return_value=[
+            {"author": "a", "active": 2, "deleted": 1}, {"author": "b", "active": 1, "deleted": 0},
+        ])
+        days_cursor.to_list = AsyncMock(return_value=[{"day": "2024-02-20", "created": 4}])
+        self.mock_notes.aggregate.side_effect = [authors_cursor, days_cursor]
+
+        summary = await self.stats_dao.rebuild()
+
+        self.assertEqual(summary, {"active": 3, "deleted": 1, "deleted_ratio": 0.25, "authors": 2})
+        requests = self.mock_collection.bulk_write.call_args[0][0]
+        self.assertEqual(requests[0], ReplaceOne(
+            {"_id": "total"}, {"_id": "total", "active": 3, "deleted": 1, "authors": 2}, upsert=True
+        ))
+        day = {"_id": "day:2024-02-20", "kind": "day", "day": "2024-02-20", "created": 4}
+        self.assertIn(ReplaceOne({"_id": day["_id"]}, day, upsert=True), requests)
+        self.mock_collection.delete_many.assert_called_once_with(
+            {"_id": {"$nin": ["total", "author:a", "author:b", "day:2024-02-20"]}}
+        )
+        self.mock_collection.insert_many.assert_not_called()
+
+
+class TestNoteStatsEndpoints(unittest.TestCase):
+    def setUp(self):
+        app.dependency_overrides[get_current_user_from_token] = lambda: UserInDB(
+            username="admin", hashed_password="hashed_password", role="Admin"
+        )
+        self.addCleanup(app.dependency_overrides.clear)
+        self.client = TestClient(app)
+
+    @patch.object(NoteStatsDAO, "summary")
+    def test_get_stats(self, mock_summary):
+        mock_summary.return_value = {"active": 3, "deleted": 1, "deleted_ratio": 0.25, "authors": 2}
+
+        response = self.client.get("/notes/staff/stats")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["deleted_ratio"], 0.25)
+
+    @patch.object(NoteStatsDAO, "live_authors")
+    def test_get_live_author_stats(self, mock_live_authors):
+        mock_live_authors.return_value = [{"author": "a", "active": 2, "deleted": 1, "deleted_ratio": 0.3333}]
+
+        response = self.client.get("/notes/staff/stats/authors", params={"live": True, "sort": "deleted", "limit": 5})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_live_authors.assert_called_once_with(5, sort="deleted")
+
+    def test_author_stats_reject_unknown_sort(self):
+        response = self.client.get("/notes/staff/stats/authors", params={"sort": "title"})
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_stats_require_staff_role(self):
+        app.dependency_overrides[get_current_user_from_token] = lambda: UserInDB(
+            username="user", hashed_password="hashed_password", role="User"
+        )
+
+        response = self.client.get("/notes/staff/stats/daily")
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,128 @@
+import gzip
+import unittest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from bson import json_util
+from fastapi import status
+from fastapi.testclient import TestClient
+from pymongo import ReplaceOne
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.errors import BulkWriteError
+
+from app.crud.note_transfer import (EXPORT_JSON_OPTIONS, NoteImporter,
+                                    export_notes, ndjson_lines)
+from app.crud.users import get_current_user_from_token
+from database.schemas import UserInDB
+from main import app
+
+
+async def async_iter(items):
+    for item in items:
+        yield item
+
+
+def note_line(uuid: str, title: str = "Note") -> bytes:
+    note = {"title": title, "body": "Buy spam", "uuid": uuid, "author": "user", "is_active": True,
+            "version": 1, "created_at": datetime(2024, 2, 20, 12)}
+    return json_util.dumps(note, json_options=EXPORT_JSON_OPTIONS).encode()
+
+
+class TestNoteTransfer(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.mock_db = MagicMock(spec=AsyncDatabase)
+        self.mock_db.notes = MagicMock(spec=AsyncCollection)
+
+    async def test_ndjson_lines_joins_chunks(self):
+        lines = [line async for line in ndjson_lines(async_iter([b'{"a"', b': 1}\n{"b": 2}\n{"c"', b": 3}"]))]
+
+        self.assertEqual(lines, [b'{"a": 1}', b'{"b": 2}', b'{"c": 3}'])
+
+    async def test_export_round_trips_dates(self):
+        note = json_util.loads(note_line("a"), json_options=EXPORT_JSON_OPTIONS)
+        notes_cursor = self.mock_db.notes.find.return_value.sort.return_value.batch_size.return_value
+        notes_cursor.__aiter__.return_value = [note]
+
+        lines = [line async for line in export_notes(self.mock_db, author="user", batch_size=100)]
+
+        self.mock_db.notes.find.assert_called_once_with({"author": "user"}, {"_id": 0})
+        self.mock_db.notes.find.return_value.sort.return_value.batch_size.assert_called_once_with(100)
+        self.assertEqual(len(lines), 1)
+        self.assertIn('"created_at": {"$date": "2024-02-20T12:00:00Z"}', lines[0])
+
+    async def test_import_batches_and_reports_invalid_lines(self):
+        lines = [note_line("a"), b"", b"not json", note_line("b"), note_line("c")]
+
+        report = await NoteImporter(self.mock_db, batch_size=2).run(async_iter(lines))
+
+        self.assertEqual(self.mock_db.notes.insert_many.call_count, 2)
+        self.assertEqual(self.mock_db.notes.insert_many.call_args_list[0][1], {"ordered": False})
+        self.assertEqual((report["imported"], report["replaced"], report["failed"]), (3, 0, 1))
+        self.assertTrue(report["errors"][0].startswith("line 3:"))
+
+    async def test_import_replaces_existing_uuids(self):
+        self.mock_db.notes.insert_many.side_effect = BulkWriteError({
+            "writeErrors": [{"index": 1, "code": 11000, "errmsg": "duplicate key"}]
+        })
+        self.mock_db.notes.bulk_write.return_value = MagicMock(matched_count=1, upserted_count=0)
+
+        report = await NoteImporter(self.mock_db).run(async_iter([note_line("a"), note_line("b", "Changed")]))
+
+        self.assertEqual((report["imported"], report["replaced"], report["failed"]), (1, 1, 0))
+        replacement = self.mock_db.notes.bulk_write.call_args[0][0][0]
+        self.assertEqual(replacement, ReplaceOne(
+            {"uuid": "b"}, json_util.loads(note_line("b", "Changed"), json_options=EXPORT_JSON_OPTIONS), upsert=True
+        ))
+
+
+class TestNoteTransferEndpoints(unittest.TestCase):
+    def setUp(self):
+        app.dependency_overrides[get_current_user_from_token] = lambda: UserInDB(
+            username="admin", hashed_password="hashed_password", role="Admin"
+        )
+        self.addCleanup(app.dependency_overrides.clear)
+        self.client = TestClient(app)
+
+    @patch("app.api.notes_handlers.import_notes", new_callable=AsyncMock)
+    def test_import_decompresses_gzip_body(self, mock_import_notes):
+        received = []
+
+        async def consume(db, lines, batch_size):
+            received.extend([line async for line in lines])
+            return {"imported": 2, "replaced": 0, "failed": 0, "errors": [], "seconds": 0.1, "notes_per_second": 20}
+        mock_import_notes.side_effect = consume
+
+        response = self.client.post(
+            "/notes/staff/import",
+            content=gzip.compress(note_line("a") + b"\n" + note_line("b") + b"\n"),
+            headers={"Content-Encoding": "gzip", "Content-Type": "application/x-ndjson"},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["imported"], 2)
+        self.assertEqual(received, [note_line("a"), note_line("b")])
+
+    @patch("app.api.notes_handlers.notes_config.import_max_bytes", 1000)
+    @patch("app.api.notes_handlers.import_notes", new_callable=AsyncMock)
+    def test_import_rejects_decompression_bomb(self, mock_import_notes):
+        async def consume(db, lines, batch_size):
+            return [line async for line in lines]
+        mock_import_notes.side_effect = consume
+
+        response = self.client.post(
+            "/notes/staff/import", content=gzip.compress(b"0" * 100000), headers={"Content-Encoding": "gzip"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    @patch("app.api.notes_handlers.notes_config.import_max_bytes", 1000)
+    def test_import_rejects_large_body(self):
+        response = self.client.post("/notes/staff/import", content=b"0" * 2000)
+
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    def test_import_rejects_unknown_encoding(self):
+        response = self.client.post("/notes/staff/import", content=b"{}", headers={"Content-Encoding": "compress"})
+
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
@@ -1,27 +1,43 @@
 import unittest
-from unittest.mock import MagicMock
+from datetime import datetime, timezone
+from unittest.mock import ANY, AsyncMock, MagicMock, patch
 
+from bson import json_util
+from fastapi import status
+from fastapi.testclient import TestClient
 from pymongo import ReturnDocument
-from pymongo.collection import Collection
-from pymongo.database import Database
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.errors import BulkWriteError, PyMongoError
 
-from app.crud.notes import NoteDAO
-from database.schemas import NoteCreate
+from app.crud.cached_notes import CachedNoteDAO
+from app.crud.exceptions import (InvalidPageTokenException,
+                                 NoteNotFoundException,
+                                 NoteVersionConflictException)
+from app.crud.notes import NOTES_ORDER, VERSION_PROJECTION, NoteDAO
+from app.crud.users import get_current_user_from_token
+from app.utils.cache import Cache, InMemoryCacheBackend
+from app.utils.pagination import decode_page_token, encode_page_token
+from app.utils.search import highlight_snippet, search_terms
+from conf.app_conf import notes_config
+from database.schemas import NoteCreate, UserInDB
+from main import app
 
 
-class TestNoteDAO(unittest.TestCase):
+class TestNoteDAO(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
-        self.mock_mongo = MagicMock(spec=Database)
-        self.mock_collection = MagicMock(spec=Collection)
+        self.mock_mongo = MagicMock(spec=AsyncDatabase)
+        self.mock_collection = MagicMock(spec=AsyncCollection)
         self.mock_mongo.notes = self.mock_collection
+        self.mock_mongo.note_stats = MagicMock(spec=AsyncCollection)
 
         self.note_dao = NoteDAO(mongo=self.mock_mongo)
 
-    def test_create_new_note(self):
+    async def test_create_new_note(self):
         new_note = NoteCreate(title="Test Note", body="I love you, bro")
         author = "test_user"
         
-        self.note_dao.create_new_note(new_note, author)
+        await self.note_dao.create_new_note(new_note, author)
         
         self.mock_collection.insert_one.assert_called_once()
         inserted_data = self.mock_collection.insert_one.call_args[0][0]
@@ -29,17 +45,29 @@ class TestNoteDAO(unittest.TestCase):
         self.assertEqual(inserted_data["body"], "I love you, bro")
         self.assertEqual(inserted_data["author"], "test_user")
         self.assertIn("uuid", inserted_data)
-        self.assertIn("created_at", inserted_data)
+        self.assertIsInstance(inserted_data["created_at"], datetime)
+        self.assertEqual(inserted_data["created_at"].microsecond, 0)
         self.assertTrue(inserted_data["is_active"])
+        self.assertEqual(inserted_data["version"], 1)
+        self.assertIn("updated_at", inserted_data)
 
-    def test_get_notes_by_author(self):
+    async def test_create_new_note_survives_note_stats_failure(self):
+        self.mock_mongo.note_stats.bulk_write.side_effect = PyMongoError("note_stats unavailable")
+
+        with self.assertLogs("app.crud.notes", level="ERROR"):
+            note = await self.note_dao.create_new_note(NoteCreate(title="Test Note", body="Buy spam"), "test_user")
+
+        self.mock_collection.insert_one.assert_called_once()
+        self.assertEqual(note["title"], "Test Note")
+
+    async def test_get_notes_by_author(self):
         test_notes = [
             {"title": "Note 1", "body": "Buy spam", "created_at": "2024-02-20 12:00"},
             {"title": "Note 2", "body": "Buy spam and baikal", "created_at": "2024-02-19 10:00"},
         ]
-        self.mock_collection.find.return_value.sort.return_value = test_notes
+        self.mock_collection.find.return_value.sort.return_value.to_list = AsyncMock(return_value=test_notes)
 
-        result = self.note_dao.get_notes_by_author("test_user")
+        result = await self.note_dao.get_notes_by_author("test_user")
 
         self.assertEqual(result, test_notes)
         self.mock_collection.find.assert_called_once_with(
@@ -47,11 +75,11 @@ class TestNoteDAO(unittest.TestCase):
             {"is_active": 0, "author": 0, "_id": 0}
         )
 
-    def test_get_note_by_uuid(self):
+    async def test_get_note_by_uuid(self):
         test_note = {"title": "Test Note", "content": "Buy spam"}
         self.mock_collection.find_one.return_value = test_note
 
-        result = self.note_dao.get_note_by_uuid("test-uuid", "test_user")
+        result = await self.note_dao.get_note_by_uuid("test-uuid", "test_user")
         
         self.assertEqual(result, test_note)
         self.mock_collection.find_one.assert_called_once_with(
@@ -59,50 +87,108 @@ class TestNoteDAO(unittest.TestCase):
             {"is_active": 0, "author": 0, "_id": 0}
         )
 
-    def test_update_note_by_uuid(self):
+    async def test_update_note_by_uuid(self):
         updated_data = {"title": "Updated Title"}
         updated_note = {"title": "Updated Title", "content": "Buy spam"}
         self.mock_collection.find_one_and_update.return_value = updated_note
 
-        result = self.note_dao.update_note_by_uuid("test-uuid", updated_data, "test_user")
+        result = await self.note_dao.update_note_by_uuid("test-uuid", updated_data, "test_user")
         
         self.assertEqual(result, updated_note)
         self.mock_collection.find_one_and_update.assert_called_once_with(
             {"uuid": "test-uuid", "author": "test_user", "is_active": True},
-            {"$set": updated_data},
+            {"$set": {**updated_data, "updated_at": ANY}, "$inc": {"version": 1}},
             projection={'is_active': 0, 'author': 0, '_id': 0},
             return_document=ReturnDocument.AFTER
         )
 
-    def test_delete_note_by_uuid(self):
+    async def test_delete_note_by_uuid(self):
         self.mock_collection.find_one_and_update.return_value = {"title": "Deleted Note"}
         
-        result = self.note_dao.delete_note_by_uuid("test-uuid", "test_user")
+        result = await self.note_dao.delete_note_by_uuid("test-uuid", "test_user")
         
         self.assertEqual(result, {"title": "Deleted Note"})
         self.mock_collection.find_one_and_update.assert_called_once_with(
             {"uuid": "test-uuid", "author": "test_user", "is_active": True},
-            {"$set": {"is_active": False}}
+            {"$set": {"is_active": False, "updated_at": ANY}, "$inc": {"version": 1}}
+        )
+
+    async def test_update_note_with_expected_version(self):
+        self.mock_collection.find_one_and_update.return_value = {"title": "Updated Title", "version": 4}
+
+        await self.note_dao.update_note_by_uuid(
+            "test-uuid", {"title": "Updated Title"}, "test_user", expected_version=3
+        )
+
+        self.assertEqual(
+            self.mock_collection.find_one_and_update.call_args[0][0],
+            {"uuid": "test-uuid", "author": "test_user", "is_active": True, "version": 3}
         )
+        self.mock_collection.find_one.assert_not_called()
 
-    def test_restore_note_by_uuid(self):
-        restored_note = {"title": "Restored Note", "is_active": True}
+    async def test_update_note_version_conflict(self):
+        self.mock_collection.find_one_and_update.return_value = None
+        self.mock_collection.find_one.return_value = {"version": 5}
+
+        with self.assertRaises(NoteVersionConflictException) as context:
+            await self.note_dao.update_note_by_uuid("test-uuid", {"title": "Title"}, "test_user", expected_version=3)
+
+        self.assertEqual(context.exception.current_version, 5)
+
+    async def test_delete_note_with_stale_version_of_missing_note(self):
+        self.mock_collection.find_one_and_update.return_value = None
+        self.mock_collection.find_one.return_value = None
+
+        with self.assertRaises(NoteNotFoundException):
+            await self.note_dao.delete_note_by_uuid("test-uuid", "test_user", expected_version=0)
+
+        self.assertEqual(
+            self.mock_collection.find_one_and_update.call_args[0][0],
+            {"uuid": "test-uuid", "author": "test_user", "is_active": True, "version": {"$in": [0, None]}}
+        )
+
+    async def test_restore_note_by_uuid(self):
+        restored_note = {"title": "Restored Note", "author": "test_user", "is_active": True}
         self.mock_collection.find_one_and_update.return_value = restored_note
 
-        result = self.note_dao.restore_note_by_uuid("test-uuid")
+        result = await self.note_dao.restore_note_by_uuid("test-uuid")
         
         self.assertEqual(result, restored_note)
         self.mock_collection.find_one_and_update.assert_called_once_with(
             {"uuid": "test-uuid", "is_active": False},
-            {"$set": {"is_active": True}},
+            {"$set": {"is_active": True, "updated_at": ANY}, "$inc": {"version": 1}},
             return_document=ReturnDocument.AFTER
         )
 
-    def test_get_note_by_uuid_for_staff(self):
+    async def test_restore_note_from_archive(self):
+        self.mock_collection.find_one_and_update.return_value = None
+        self.mock_mongo.notes_archive = MagicMock(spec=AsyncCollection)
+        self.mock_mongo.notes_archive.find_one.return_value = {
+            "_id": "object-id", "uuid": "test-uuid", "author": "test_user", "is_active": False, "version": 3,
+            "archived_at": datetime(2024, 3, 1, tzinfo=timezone.utc),
+        }
+
+        result = await self.note_dao.restore_note_by_uuid("test-uuid")
+
+        self.assertTrue(result["is_active"])
+        self.assertEqual(result["version"], 4)
+        self.assertNotIn("archived_at", result)
+        self.mock_collection.insert_one.assert_called_once_with(result)
+        self.mock_mongo.notes_archive.delete_one.assert_called_once_with({"_id": "object-id"})
+
+    async def test_restore_note_not_archived(self):
+        self.mock_collection.find_one_and_update.return_value = None
+        self.mock_mongo.notes_archive = MagicMock(spec=AsyncCollection)
+        self.mock_mongo.notes_archive.find_one.return_value = None
+
+        with self.assertRaises(NoteNotFoundException):
+            await self.note_dao.restore_note_by_uuid("test-uuid")
+
+    async def test_get_note_by_uuid_for_staff(self):
         test_note = {"title": "Staff Note", "content": "Confidential"}
         self.mock_collection.find_one.return_value = test_note
 
-        result = self.note_dao.get_note_by_uuid_for_staff("test-uuid")
+        result = await self.note_dao.get_note_by_uuid_for_staff("test-uuid")
         
         self.assertEqual(result, test_note)
         self.mock_collection.find_one.assert_called_once_with(
@@ -110,14 +196,385 @@ class TestNoteDAO(unittest.TestCase):
             {"_id": 0}
         )
 
-    def test_get_notes_list_for_staff(self):
+    async def test_get_notes_list_for_staff(self):
         test_notes = [
             {"title": "Note 1", "body": "Buy spam"},
             {"title": "Note 2", "body": "Buy spam and cola"},
         ]
-        self.mock_collection.find.return_value.sort.return_value = test_notes
+        self.mock_collection.find.return_value.sort.return_value.to_list = AsyncMock(return_value=test_notes)
 
-        result = self.note_dao.get_notes_list_for_staff()
+        result = await self.note_dao.get_notes_list_for_staff()
         
         self.assertEqual(result, test_notes)
         self.mock_collection.find.assert_called_once_with({}, {"_id": 0})
+
+    async def test_get_notes_by_author_next_page(self):
+        created_at = datetime(2024, 2, 20, 12, 0, 5)
+        page_token = encode_page_token({"created_at": created_at, "uuid": "uuid-2"})
+        notes_cursor = self.mock_collection.find.return_value.sort.return_value
+        notes_cursor.limit.return_value.to_list = AsyncMock(return_value=[])
+
+        await self.note_dao.get_notes_by_author("test_user", limit=10, page_token=page_token)
+
+        self.mock_collection.find.assert_called_once_with(
+            {
+                "author": "test_user",
+                "is_active": True,
+                "$or": [
+                    {"created_at": {"$lt": created_at}},
+                    {"created_at": created_at, "uuid": {"$lt": "uuid-2"}},
+                    {"created_at": {"$type": "string"}},
+                ]
+            },
+            {"is_active": 0, "author": 0, "_id": 0}
+        )
+        self.mock_collection.find.return_value.sort.assert_called_once_with(NOTES_ORDER)
+        notes_cursor.limit.assert_called_once_with(10)
+
+    async def test_get_notes_for_staff_created_range(self):
+        self.mock_collection.find.return_value.sort.return_value.to_list = AsyncMock(return_value=[])
+        created_from = datetime(2024, 2, 1, tzinfo=timezone.utc)
+
+        await self.note_dao.find_notes_for_staff("test_user", created_from=created_from).to_list()
+
+        self.mock_collection.find.assert_called_once_with(
+            {"author": "test_user", "created_at": {"$gte": created_from}}, {"_id": 0}
+        )
+
+    async def test_create_new_notes(self):
+        self.mock_collection.insert_many.side_effect = BulkWriteError(
+            {"writeErrors": [{"index": 1, "code": 11000, "errmsg": "duplicate key"}]}
+        )
+        new_notes = [NoteCreate(title="Note 1", body="Buy spam"), NoteCreate(title="Note 2", body="Buy cola")]
+
+        results = await self.note_dao.create_new_notes(new_notes, "test_user")
+
+        self.assertEqual([result["status"] for result in results], ["created", "failed"])
+        inserted_data = self.mock_collection.insert_many.call_args[0][0]
+        self.assertEqual([note["uuid"] for note in inserted_data], [result["uuid"] for result in results])
+        self.assertEqual(self.mock_collection.insert_many.call_args[1], {"ordered": False})
+
+    async def test_create_new_notes_across_midnight_share_created_at(self):
+        before_midnight = datetime(2024, 2, 20, 23, 59, 59, tzinfo=timezone.utc)
+        new_notes = [NoteCreate(title="Note 1", body="Buy spam"), NoteCreate(title="Note 2", body="Buy cola")]
+
+        with patch("app.crud.notes.datetime") as mock_datetime:
+            mock_datetime.now.side_effect = [before_midnight, datetime(2024, 2, 21, tzinfo=timezone.utc)]
+            await self.note_dao.create_new_notes(new_notes, "test_user")
+
+        inserted_data = self.mock_collection.insert_many.call_args[0][0]
+        self.assertEqual([note["created_at"] for note in inserted_data], [before_midnight, before_midnight])
+        day_update = self.mock_mongo.note_stats.bulk_write.call_args[0][0][2]
+        self.assertEqual(day_update._filter, {"_id": "day:2024-02-20"})
+
+    async def test_update_notes_by_uuid(self):
+        self.mock_collection.find_one_and_update.side_effect = [{"_id": 1}, None]
+        updates = [
+            {"uuid": "uuid-1", "updated_data": {"title": "Updated Title"}},
+            {"uuid": "uuid-2", "updated_data": {"body": "Updated body"}},
+            {"uuid": "uuid-1", "updated_data": {"body": "Updated body"}},
+        ]
+
+        results = await self.note_dao.update_notes_by_uuid(updates, "test_user")
+
+        self.assertEqual(results, [
+            {"uuid": "uuid-1", "status": "updated"},
+            {"uuid": "uuid-2", "status": "not_found"},
+        ])
+        self.mock_collection.find_one_and_update.assert_any_call(
+            {"uuid": "uuid-1", "author": "test_user", "is_active": True},
+            {"$set": {"title": "Updated Title", "body": "Updated body", "updated_at": ANY}, "$inc": {"version": 1}},
+            projection={"_id": 1}
+        )
+        self.assertEqual(self.mock_collection.find_one_and_update.call_count, 2)
+
+    async def test_update_notes_reports_failed_writes(self):
+        self.mock_collection.find_one_and_update.side_effect = PyMongoError("write failed")
+
+        results = await self.note_dao.update_notes_by_uuid(
+            [{"uuid": "uuid-1", "updated_data": {"title": "Updated Title"}}], "test_user"
+        )
+
+        self.assertEqual(results, [{"uuid": "uuid-1", "status": "failed"}])
+
+    async def test_delete_notes_by_uuid(self):
+        # uuid-1 exists; uuid-2 was deleted by another request before this write.
+        self.mock_collection.find_one_and_update.side_effect = [{"_id": 1}, None]
+
+        results = await self.note_dao.delete_notes_by_uuid(["uuid-1", "uuid-2", "uuid-1"], "test_user")
+
+        self.assertEqual(results, [
+            {"uuid": "uuid-1", "status": "deleted"},
+            {"uuid": "uuid-2", "status": "not_found"},
+        ])
+        self.mock_collection.find_one_and_update.assert_any_call(
+            {"uuid": "uuid-1", "author": "test_user", "is_active": True},
+            {"$set": {"is_active": False, "updated_at": ANY}, "$inc": {"version": 1}},
+            projection={"_id": 1}
+        )
+        self.assertEqual(self.mock_collection.find_one_and_update.call_count, 2)
+
+    async def test_search_notes(self):
+        found_notes = [{"title": "Spam", "body": "Buy spam", "score": 10.5}]
+        notes_cursor = self.mock_collection.find.return_value.sort.return_value.skip.return_value
+        notes_cursor.limit.return_value.to_list = AsyncMock(return_value=found_notes)
+
+        result = await self.note_dao.search_notes("spam", author="test_user", limit=20, offset=40)
+
+        self.assertEqual(result, found_notes)
+        self.mock_collection.find.assert_called_once_with(
+            {"$text": {"$search": "spam"}, "is_active": True, "author": "test_user"},
+            {"_id": 0, "score": {"$meta": "textScore"}, "is_active": 0, "author": 0}
+        )
+        self.mock_collection.find.return_value.sort.return_value.skip.assert_called_once_with(40)
+        notes_cursor.limit.assert_called_once_with(20)
+
+
+class TestCachedNoteDAO(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.mock_mongo = MagicMock(spec=AsyncDatabase)
+        self.mock_collection = MagicMock(spec=AsyncCollection)
+        self.mock_mongo.notes = self.mock_collection
+        self.mock_mongo.note_stats = MagicMock(spec=AsyncCollection)
+        self.note = {"title": "Note", "body": "Buy spam", "uuid": "test-uuid", "created_at": "2024-02-20 12:00", "version": 1}
+
+        cache_patcher = patch("app.crud.cached_notes.note_cache", Cache(InMemoryCacheBackend(100), "note", 60))
+        self.cache = cache_patcher.start()
+        self.addCleanup(cache_patcher.stop)
+
+        self.note_dao = CachedNoteDAO(mongo=self.mock_mongo)
+
+    async def test_get_note_served_from_cache(self):
+        self.mock_collection.find_one = AsyncMock(return_value=self.note)
+
+        await self.note_dao.get_note_by_uuid("test-uuid", "test_user")
+        note = await self.note_dao.get_note_by_uuid("test-uuid", "test_user")
+
+        self.assertEqual(note, self.note)
+        self.mock_collection.find_one.assert_called_once()
+        self.assertEqual(self.cache.hits, 1)
+
+    async def test_update_refreshes_cached_note(self):
+        self.mock_collection.find_one = AsyncMock(return_value=self.note)
+        updated_note = {**self.note, "title": "New title", "version": 2}
+        self.mock_collection.find_one_and_update = AsyncMock(return_value=updated_note)
+
+        await self.note_dao.get_note_by_uuid("test-uuid", "test_user")
+        await self.note_dao.update_note_by_uuid("test-uuid", {"title": "New title"}, "test_user")
+        note = await self.note_dao.get_note_by_uuid("test-uuid", "test_user")
+
+        self.assertEqual(note, updated_note)
+        self.mock_collection.find_one.assert_called_once()
+
+    async def test_delete_invalidates_cached_note(self):
+        self.mock_collection.find_one = AsyncMock(return_value=self.note)
+        self.mock_collection.find_one_and_update = AsyncMock(return_value=self.note)
+
+        await self.note_dao.get_note_by_uuid("test-uuid", "test_user")
+        await self.note_dao.delete_note_by_uuid("test-uuid", "test_user")
+        await self.note_dao.get_note_by_uuid("test-uuid", "test_user")
+
+        self.assertEqual(self.mock_collection.find_one.call_count, 2)
+
+    async def test_read_racing_a_write_is_not_cached(self):
+        async def find_one(*args, **kwargs):
+            # The note is deleted while this read is in flight.
+            await self.note_dao._invalidate("test-uuid", "test_user")
+            return self.note
+        self.mock_collection.find_one = AsyncMock(side_effect=find_one)
+
+        await self.note_dao.get_note_by_uuid("test-uuid", "test_user")
+
+        self.assertIsNone(await self.cache.peek("owner:test_user:test-uuid"))
+
+    async def test_older_version_does_not_replace_cached_note(self):
+        newer_note = {**self.note, "title": "New title", "version": 2}
+        await self.cache.set("staff:test-uuid", json_util.dumps(newer_note).encode())
+
+        await self.note_dao._fill("staff:test-uuid", self.note)
+
+        self.assertEqual(json_util.loads(await self.cache.peek("staff:test-uuid")), newer_note)
+
+
+class TestPageToken(unittest.TestCase):
+    def test_round_trip(self):
+        created_at = datetime(2024, 2, 20, 12, 0, 5, tzinfo=timezone.utc)
+        token = encode_page_token({"created_at": created_at, "uuid": "uuid-1", "title": "Note"})
+
+        self.assertEqual(decode_page_token(token), (created_at, "uuid-1"))
+
+    def test_legacy_string_token(self):
+        token = encode_page_token({"created_at": "2024-02-20 12:00", "uuid": "uuid-1"})
+
+        self.assertEqual(decode_page_token(token), ("2024-02-20 12:00", "uuid-1"))
+
+    def test_invalid_token(self):
+        with self.assertRaises(InvalidPageTokenException):
+            decode_page_token("not a token")
+
+
+class TestSearchSnippet(unittest.TestCase):
+    def test_search_terms(self):
+        self.assertEqual(search_terms('buy "green tea" -coffee'), ["buy", "green tea"])
+
+    def test_highlight_snippet(self):
+        snippet = highlight_snippet("Remember to buy <spam> and Spam", ["spam"])
+
+        self.assertEqual(snippet, "Remember to buy &lt;<mark>spam</mark>&gt; and <mark>Spam</mark>")
+
+    def test_highlight_snippet_window(self):
+        text = "a" * 100 + " spam " + "b" * 100
+
+        snippet = highlight_snippet(text, ["spam"], length=40)
+
+        self.assertTrue(snippet.startswith("…"))
+        self.assertTrue(snippet.endswith("…"))
+        self.assertIn("<mark>spam</mark>", snippet)
+
+
+class TestNoteEndpoints(unittest.TestCase):
+    def setUp(self):
+        app.dependency_overrides[get_current_user_from_token] = lambda: UserInDB(
+            username="test_user", hashed_password="hashed_password", role="User"
+        )
+        self.addCleanup(app.dependency_overrides.clear)
+        self.client = TestClient(app)
+        self.note = {"title": "Note", "body": "Buy spam", "uuid": "test-uuid", "created_at": "2024-02-20 12:00", "version": 3}
+        self.update_params = {"note_uuid": "test-uuid", "title": "New"}
+
+    @patch.object(NoteDAO, "get_note_by_uuid")
+    def test_get_note_etag(self, mock_get_note):
+        mock_get_note.return_value = self.note
+
+        response = self.client.get("/notes/test-uuid")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.headers["etag"], '"test-uuid-3"')
+
+    @patch.object(NoteDAO, "update_note_by_uuid")
+    def test_update_note_if_match(self, mock_update_note):
+        mock_update_note.return_value = {**self.note, "title": "New", "version": 4}
+
+        response = self.client.patch("/notes/update_note", params=self.update_params,
+                                     headers={"If-Match": '"test-uuid-3"'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.headers["etag"], '"test-uuid-4"')
+        self.assertEqual(mock_update_note.call_args[1]["expected_version"], 3)
+
+    @patch.object(NoteDAO, "update_note_by_uuid")
+    def test_update_note_stale_if_match(self, mock_update_note):
+        mock_update_note.side_effect = NoteVersionConflictException("test-uuid", 5)
+
+        response = self.client.patch("/notes/update_note", params=self.update_params,
+                                     headers={"If-Match": '"test-uuid-3"'})
+
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(response.headers["etag"], '"test-uuid-5"')
+
+    @patch.object(NoteDAO, "update_note_by_uuid")
+    def test_update_note_if_match_of_other_note(self, mock_update_note):
+        response = self.client.patch("/notes/update_note", params=self.update_params,
+                                     headers={"If-Match": '"other-uuid-3"'})
+
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        mock_update_note.assert_not_called()
+
+    @patch.object(NoteDAO, "delete_note_by_uuid")
+    def test_delete_note_expected_version_conflict(self, mock_delete_note):
+        mock_delete_note.side_effect = NoteVersionConflictException("test-uuid", 5)
+
+        response = self.client.delete("/notes/test-uuid", params={"expected_version": 3})
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(mock_delete_note.call_args[1]["expected_version"], 3)
+
+    @patch.object(NoteDAO, "get_note_by_uuid")
+    def test_get_note_not_modified(self, mock_get_note):
+        mock_get_note.return_value = self.note
+
+        response = self.client.get("/notes/test-uuid", headers={"If-None-Match": '"test-uuid-3"'})
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+
+    @patch.object(NoteDAO, "find_notes_by_author")
+    def test_get_user_notes_not_modified(self, mock_find_notes):
+        mock_find_notes.return_value.to_list = AsyncMock(return_value=[self.note])
+        etag = self.client.get("/notes/my-notes").headers["etag"]
+        mock_find_notes.reset_mock()
+
+        response = self.client.get("/notes/my-notes", headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        mock_find_notes.assert_called_once_with(
+            "test_user", created_from=None, created_to=None, limit=ANY, page_token=None, projection=VERSION_PROJECTION
+        )
+
+    @patch.object(NoteDAO, "find_notes_by_author")
+    def test_get_user_notes_created_range(self, mock_find_notes):
+        mock_find_notes.return_value.to_list = AsyncMock(return_value=[])
+
+        response = self.client.get(
+            "/notes/my-notes", params={"created_from": "2024-02-01T00:00:00Z", "created_to": "2024-03-01T00:00:00Z"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_find_notes.assert_called_once_with(
+            "test_user",
+            created_from=datetime(2024, 2, 1, tzinfo=timezone.utc),
+            created_to=datetime(2024, 3, 1, tzinfo=timezone.utc),
+            projection=None, limit=ANY, page_token=None
+        )
+
+    @patch.object(NoteDAO, "find_notes_by_author")
+    def test_get_user_notes_trimmed(self, mock_find_notes):
+        mock_find_notes.return_value.to_list = AsyncMock(return_value=[{"title": "Note", "body": "Buy", "uuid": "test-uuid"}])
+
+        response = self.client.get("/notes/my-notes", params={"fields": "title,body", "body_preview": 3})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), [{"title": "Note", "body": "Buy", "uuid": "test-uuid"}])
+        projection = mock_find_notes.call_args.kwargs["projection"]
+        self.assertEqual(projection["body"], {"$substrCP": ["$body", 0, 3]})
+        self.assertEqual(projection["title"], 1)
+        self.assertNotIn("updated_at", projection)
+
+    def test_get_user_notes_unknown_field(self):
+        response = self.client.get("/notes/my-notes", params={"fields": "title,author"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch.object(NoteDAO, "find_notes_by_author")
+    def test_get_user_notes_fast_serialization(self, mock_find_notes):
+        note = {**self.note, "created_at": datetime(2024, 2, 20, 12, 0), "updated_at": datetime(2024, 2, 21, 8, 30, 15)}
+        mock_find_notes.return_value.to_list = AsyncMock(return_value=[note])
+        validated = self.client.get("/notes/my-notes")
+
+        with patch.object(notes_config, "fast_serialization", True):
+            response = self.client.get("/notes/my-notes")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), validated.json())
+        self.assertEqual(response.headers["etag"], validated.headers["etag"])
+
+    @patch.object(NoteDAO, "create_new_notes")
+    def test_batch_body_over_limit_without_content_length(self, mock_create_notes):
+        def chunks():
+            for _ in range(notes_config.batch_max_bytes // 65536 + 1):
+                yield b" " * 65536
+
+        response = self.client.post("/notes/batch/create", content=chunks(),
+                                    headers={"Content-Type": "application/json"})
+
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        mock_create_notes.assert_not_called()
+
+    @patch.object(NoteDAO, "create_new_notes")
+    def test_batch_body_within_limit(self, mock_create_notes):
+        mock_create_notes.return_value = [{"uuid": "uuid-1", "status": "created"}]
+
+        response = self.client.post("/notes/batch/create", json={"notes": [{"title": "Note", "body": "Buy spam"}]})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_create_notes.assert_called_once()
@@ -0,0 +1,93 @@
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from fastapi import FastAPI, Request, status
+from fastapi.testclient import TestClient
+
+from app.utils.rate_limit import (PRINCIPAL_STATE, InMemoryBucketStore,
+                                  RateLimitMiddleware)
+from database.schemas import UserInDB
+
+ROUTE_LIMITS = {
+    "POST /login": {"rate": 1, "burst": 2, "key": "ip"},
+    "GET /items/{item_id}": {"rate": 1, "burst": 1, "key": "principal"},
+}
+
+
+def create_app(resolve_principal=None) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/login")
+    async def login():
+        return {"status": "ok"}
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str, request: Request):
+        principal = request.scope.get("state", {}).get(PRINCIPAL_STATE)
+        return {"item_id": item_id, "user": principal[1].username if principal else None}
+
+    @app.get("/unlimited")
+    async def unlimited():
+        return {"status": "ok"}
+
+    app.add_middleware(
+        RateLimitMiddleware,
+        store=InMemoryBucketStore(max_keys=100),
+        route_limits=ROUTE_LIMITS,
+        resolve_principal=resolve_principal,
+    )
+    return app
+
+
+class TestInMemoryBucketStore(unittest.IsolatedAsyncioTestCase):
+    async def test_take_and_refill(self):
+        store = InMemoryBucketStore(max_keys=10)
+
+        with patch("app.utils.rate_limit.time.monotonic", return_value=100.0):
+            self.assertEqual(await store.take("key", rate=2, burst=2), 0)
+            self.assertEqual(await store.take("key", rate=2, burst=2), 0)
+            self.assertAlmostEqual(await store.take("key", rate=2, burst=2), 0.5)
+        with patch("app.utils.rate_limit.time.monotonic", return_value=100.5):
+            self.assertEqual(await store.take("key", rate=2, burst=2), 0)
+
+    async def test_evicts_least_recently_used(self):
+        store = InMemoryBucketStore(max_keys=2)
+
+        for key in ("a", "b", "c"):
+            await store.take(key, rate=1, burst=1)
+
+        self.assertEqual(len(store), 2)
+        self.assertEqual(await store.take("a", rate=1, burst=1), 0)
+
+
+class TestRateLimitMiddleware(unittest.TestCase):
+    def test_rejects_with_retry_after(self):
+        client = TestClient(create_app())
+
+        responses = [client.post("/login") for _ in range(3)]
+
+        self.assertEqual([response.status_code for response in responses[:2]], [status.HTTP_200_OK] * 2)
+        self.assertEqual(responses[2].status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(responses[2].headers["retry-after"], "1")
+
+    def test_routes_without_limit_pass(self):
+        client = TestClient(create_app())
+
+        for _ in range(5):
+            self.assertEqual(client.get("/unlimited").status_code, status.HTTP_200_OK)
+
+    def test_keys_by_principal(self):
+        resolve_principal = AsyncMock(side_effect=lambda token: UserInDB(
+            username=token.removesuffix("-token"), hashed_password="", role="User"
+        ))
+        client = TestClient(create_app(resolve_principal))
+
+        first = client.get("/items/1", headers={"Authorization": "Bearer alice-token"})
+        other_user = client.get("/items/1", headers={"Authorization": "Bearer bob-token"})
+        second = client.get("/items/1", headers={"Authorization": "Bearer alice-token"})
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(other_user.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(first.json()["user"], "alice")
+        self.assertEqual(resolve_principal.await_count, 3)
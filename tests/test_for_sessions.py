@@ -0,0 +1,109 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi import status
+from fastapi.testclient import TestClient
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.database import AsyncDatabase
+
+from app.crud.sessions import SessionDAO, _token_hash, session_cache
+from conf.app_conf import access_token_config
+from database.schemas import UserInDB
+from main import app
+
+
+class TestSessionDAO(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.mock_mongo = MagicMock(spec=AsyncDatabase)
+        self.mock_collection = MagicMock(spec=AsyncCollection)
+        self.mock_mongo.sessions = self.mock_collection
+
+        self.session_dao = SessionDAO(mongo=self.mock_mongo)
+        self.session = {
+            "_id": _token_hash("access"),
+            "username": "user@example.com",
+            "role": "User",
+            "expires_at": datetime.now() + timedelta(hours=1),
+        }
+
+    async def asyncTearDown(self):
+        await session_cache.invalidate(_token_hash("access"))
+
+    async def test_create_session_stores_token_hashes(self):
+        user = UserInDB(username="user@example.com", hashed_password="hashed_password", role="User")
+
+        tokens = await self.session_dao.create_session(user)
+
+        document = self.mock_collection.insert_one.call_args[0][0]
+        self.assertEqual(document["_id"], _token_hash(tokens["access_token"]))
+        self.assertEqual(document["refresh_hash"], _token_hash(tokens["refresh_token"]))
+        self.assertEqual(document["role"], "User")
+        self.assertNotIn("hashed_password", document)
+
+    async def test_get_principal_uses_cache(self):
+        self.mock_collection.find_one.return_value = self.session
+
+        first = await self.session_dao.get_principal("access")
+        second = await self.session_dao.get_principal("access")
+
+        self.assertEqual(first, second)
+        self.assertEqual(first.role, "User")
+        self.mock_collection.find_one.assert_called_once()
+
+    async def test_get_principal_unknown_session(self):
+        self.mock_collection.find_one.return_value = None
+
+        self.assertIsNone(await self.session_dao.get_principal("access"))
+
+    async def test_revoke_session_invalidates_cache(self):
+        self.mock_collection.find_one.return_value = self.session
+        await self.session_dao.get_principal("access")
+
+        await self.session_dao.revoke_session("access")
+        self.mock_collection.find_one.return_value = None
+
+        self.assertIsNone(await self.session_dao.get_principal("access"))
+        self.mock_collection.delete_one.assert_called_once_with({"_id": _token_hash("access")})
+
+    async def test_consume_refresh_token(self):
+        self.mock_collection.find_one_and_delete.return_value = self.session
+
+        username = await self.session_dao.consume_refresh_token("refresh")
+
+        self.assertEqual(username, "user@example.com")
+        filter = self.mock_collection.find_one_and_delete.call_args[0][0]
+        self.assertEqual(filter["refresh_hash"], _token_hash("refresh"))
+
+
+class TestSessionEndpoints(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+
+    @patch.object(SessionDAO, "create_session")
+    @patch.object(SessionDAO, "consume_refresh_token")
+    @patch("app.crud.users.UserDAO.get_user")
+    def test_refresh_rotates_session(self, mock_get_user, mock_consume, mock_create_session):
+        mock_consume.return_value = "user@example.com"
+        mock_get_user.return_value = UserInDB(username="user@example.com", hashed_password="hash", role="User")
+        mock_create_session.return_value = {"access_token": "new-access", "refresh_token": "new-refresh"}
+
+        with patch.object(access_token_config, "mode", "session"):
+            response = self.client.post("/users/token/refresh", json={"refresh_token": "refresh"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {
+            "access_token": "new-access", "token_type": "bearer", "refresh_token": "new-refresh"
+        })
+
+    @patch.object(SessionDAO, "consume_refresh_token", new_callable=AsyncMock, return_value=None)
+    def test_refresh_with_used_token(self, mock_consume):
+        with patch.object(access_token_config, "mode", "session"):
+            response = self.client.post("/users/token/refresh", json={"refresh_token": "refresh"})
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_requires_session_mode(self):
+        response = self.client.post("/users/token/refresh", json={"refresh_token": "refresh"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
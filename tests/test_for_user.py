@@ -1,27 +1,56 @@
+import os
 import re
 import unittest
+from concurrent.futures.process import BrokenProcessPool
 from unittest.mock import MagicMock, patch
 
 from fastapi import status
 from fastapi.testclient import TestClient
-from pymongo.collection import Collection
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.errors import DuplicateKeyError
 from starlette import status
 
-from app.crud.exceptions import UserAlreadeCreatedException
-from app.crud.users import PWD_CONTEXT, UserDAO
+from app.crud.exceptions import (PasswordHasherOverloadedException,
+                                 UserAlreadeCreatedException)
+from app.crud.passwords import PWD_CONTEXT, PasswordHasher
+from app.crud.providers import shared_dao
+from app.crud.users import (UserDAO, authenticate_user, create_access_token,
+                            get_current_user_from_token, get_principal,
+                            password_hasher, user_cache)
+from app.utils.rate_limit import PRINCIPAL_STATE
 from database.schemas import UserInDB
 from main import app
 
 
-class TestUserDAO(unittest.TestCase):
+def _kill_worker():
+    os._exit(1)
+
+
+class TestPasswordHasher(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.hasher = PasswordHasher(max_workers=1, max_pending=4)
+        self.addCleanup(self.hasher.shutdown)
+
+    async def test_replaces_pool_after_worker_died(self):
+        with self.assertRaises(BrokenProcessPool):
+            await self.hasher._run("hash", _kill_worker)
+
+        hashed_password = await self.hasher.hash("password")
+
+        self.assertTrue(PWD_CONTEXT.verify("password", hashed_password))
+        self.assertEqual(self.hasher.pending, 0)
+
+
+class TestUserDAO(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
         self.mock_mongo = MagicMock()
-        self.mock_collection = MagicMock(spec=Collection)
+        self.mock_collection = MagicMock(spec=AsyncCollection)
         self.mock_mongo.users = self.mock_collection
+        self.mock_mongo.sessions = MagicMock(spec=AsyncCollection)
 
         self.user_dao = UserDAO(mongo=self.mock_mongo)
 
-    def test_get_user_found(self):
+    async def test_get_user_found(self):
         test_user_data = {
             "username": "user@example.com",
             "hashed_password": "hashed_password",
@@ -29,7 +58,7 @@ class TestUserDAO(unittest.TestCase):
         }
         self.mock_collection.find_one.return_value = test_user_data
 
-        result = self.user_dao.get_user("user@example.com")
+        result = await self.user_dao.get_user("user@example.com")
 
         self.assertIsInstance(result, UserInDB)
         self.assertEqual(result.username, "user@example.com")
@@ -38,40 +67,127 @@ class TestUserDAO(unittest.TestCase):
 
         self.mock_collection.find_one.assert_called_once_with({"username": "user@example.com"})
 
-    def test_get_user_not_found(self):
+    async def test_get_user_not_found(self):
         self.mock_collection.find_one.return_value = None
 
-        result = self.user_dao.get_user("user@example.com")
+        result = await self.user_dao.get_user("user@example.com")
 
         self.assertIsNone(result)
         self.mock_collection.find_one.assert_called_once_with({"username": "user@example.com"})
 
-    def test_create_new_user_success(self):
+    async def test_create_new_user_success(self):
         self.mock_collection.find_one.return_value = None
         self.mock_collection.insert_one.return_value = None
 
-        self.user_dao.create_new_user(email="user@example.com", password="password")
+        await self.user_dao.create_new_user(email="user@example.com", password="password")
 
         self.mock_collection.insert_one.assert_called_once()
 
-    def test_create_new_user_already_exists(self):
-        test_user_data = {
+    async def test_create_new_user_already_exists(self):
+        self.mock_collection.insert_one.side_effect = DuplicateKeyError("E11000 duplicate key error")
+
+        with self.assertRaises(UserAlreadeCreatedException):
+            await self.user_dao.create_new_user(email="user@example.com", password="password")
+
+        self.mock_collection.find_one.assert_not_called()
+
+    async def test_update_user_role_invalidates_cache(self):
+        self.mock_collection.find_one.return_value = {
             "username": "user@example.com",
             "hashed_password": "hashed_password",
             "role": "User",
         }
-        self.mock_collection.find_one.return_value = test_user_data
+        await get_principal(self.mock_mongo, "user@example.com")
 
-        with self.assertRaises(UserAlreadeCreatedException):
-            self.user_dao.create_new_user(email="user@example.com", password="password")
+        await self.user_dao.update_user_role_in_db(email="user@example.com", new_role="Admin")
+        self.mock_collection.find_one.return_value["role"] = "Admin"
+        user = await get_principal(self.mock_mongo, "user@example.com")
+
+        self.assertEqual(user.role, "Admin")
+        self.mock_collection.update_one.assert_called_once_with(
+            {"username": "user@example.com"},
+            {"$set": {"role": "Admin"}})
+        await user_cache.invalidate("user@example.com")
+
+    async def test_get_principal_read_racing_with_role_change_is_not_cached(self):
+        role_changed = False
+
+        async def read_racing_with_role_change(filter):
+            nonlocal role_changed
+            if not role_changed:
+                role_changed = True
+                await self.user_dao.update_user_role_in_db(email="racing@example.com", new_role="Admin")
+            return {"username": "racing@example.com", "hashed_password": "hashed_password", "role": "User"}
+
+        self.mock_collection.find_one.side_effect = read_racing_with_role_change
+
+        user = await get_principal(self.mock_mongo, "racing@example.com")
+
+        self.assertEqual(user.role, "User")
+        self.assertIsNone(await user_cache.peek("racing@example.com"))
+        await user_cache.invalidate("racing@example.com:invalidated")
+
+    async def test_get_principal_uses_cache(self):
+        self.mock_collection.find_one.return_value = {
+            "username": "cached@example.com",
+            "hashed_password": "hashed_password",
+            "role": "User",
+        }
 
-        self.mock_collection.insert_one.assert_not_called()
+        first = await get_principal(self.mock_mongo, "cached@example.com")
+        second = await get_principal(self.mock_mongo, "cached@example.com")
 
-    def test_get_password_hash(self):
-        hashed_password = self.user_dao._get_password_hash("password")
+        self.assertEqual(first, second)
+        self.assertEqual(second.hashed_password, "")
+        self.assertNotIn(b"hashed_password", await user_cache.peek("cached@example.com"))
+        self.mock_collection.find_one.assert_called_once_with({"username": "cached@example.com"})
+        await user_cache.invalidate("cached@example.com")
+
+    async def test_get_password_hash(self):
+        hashed_password = await self.user_dao._get_password_hash("password")
 
         self.assertTrue(PWD_CONTEXT.verify("password", hashed_password))
 
+    async def test_authenticate_user_rehashes_stale_hash(self):
+        stale_hash = PWD_CONTEXT.handler("argon2").using(memory_cost=1024).hash("password")
+        self.mock_collection.find_one.return_value = {
+            "username": "user@example.com",
+            "hashed_password": stale_hash,
+            "role": "User",
+        }
+
+        user = await authenticate_user(self.mock_mongo, "user@example.com", "password")
+
+        self.assertNotEqual(user.hashed_password, stale_hash)
+        self.assertFalse(PWD_CONTEXT.needs_update(user.hashed_password))
+        self.mock_collection.update_one.assert_called_once_with(
+            {"username": "user@example.com"},
+            {"$set": {"hashed_password": user.hashed_password}})
+
+    async def test_current_user_reuses_principal_resolved_by_middleware(self):
+        user = UserInDB(username="user@example.com", hashed_password="", role="User")
+        request = MagicMock(scope={"state": {PRINCIPAL_STATE: ("token", user)}})
+
+        self.assertIs(await get_current_user_from_token(request, token="token", db=self.mock_mongo), user)
+        self.mock_collection.find_one.assert_not_called()
+
+    async def test_current_user_resolves_other_token(self):
+        user = UserInDB(username="user@example.com", hashed_password="", role="User")
+        request = MagicMock(scope={"state": {PRINCIPAL_STATE: ("other-token", user)}})
+        self.mock_collection.find_one.return_value = {
+            "username": "admin@example.com", "hashed_password": "hashed_password", "role": "Admin",
+        }
+        await user_cache.invalidate("admin@example.com")
+
+        token = create_access_token({"sub": "admin@example.com"})
+        current_user = await get_current_user_from_token(request, token=token, db=self.mock_mongo)
+
+        self.assertEqual(current_user.username, "admin@example.com")
+
+    def test_shared_dao_is_reused_per_database(self):
+        self.assertIs(shared_dao(UserDAO, self.mock_mongo), shared_dao(UserDAO, self.mock_mongo))
+        self.assertIsNot(shared_dao(UserDAO, self.mock_mongo), shared_dao(UserDAO, MagicMock()))
+
 
 class TestUserEndpoints(unittest.TestCase):
     def setUp(self):
@@ -154,3 +270,17 @@ class TestUserEndpoints(unittest.TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
         self.assertEqual(response.json(), {'detail': 'Incorrect username or password'})
+
+    @patch("app.crud.users.UserDAO.get_user")
+    def test_login_hasher_overloaded(self, mock_get_user):
+        mock_get_user.return_value = UserInDB(
+            username="user@example.com",
+            hashed_password="hashed_password",
+            role="User"
+        )
+
+        with patch.object(password_hasher, "verify_and_update", side_effect=PasswordHasherOverloadedException):
+            response = self.client.post("/users/token", data={"username": "user@example.com", "password": "password"})
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn("retry-after", response.headers)
@@ -0,0 +1,89 @@
+import argparse
+import asyncio
+import gzip
+import sys
+import time
+
+from app.crud.note_transfer import export_notes, import_notes, ndjson_lines
+from conf.app_conf import notes_config
+from database.mongo import close_mongo_client, get_db
+
+CHUNK_SIZE = 64 * 1024
+
+
+def open_file(path: str, mode: str):
+    """Opens a binary file, compressed according to its extension (.gz or .zst); "-" is stdin/stdout."""
+    if path == "-":
+        return sys.stdout.buffer if mode == "wb" else sys.stdin.buffer
+    if path.endswith(".gz"):
+        return gzip.open(path, mode)
+    if path.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError:
+            raise SystemExit("The zstandard package is required for .zst files")
+        return zstandard.open(path, mode)
+    return open(path, mode)
+
+
+async def run_export(path: str, author: str | None, batch_size: int):
+    started = time.perf_counter()
+    exported = 0
+    output = open_file(path, "wb")
+    try:
+        async for line in export_notes(get_db(), author=author, batch_size=batch_size):
+            output.write(line.encode())
+            exported += 1
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+        await close_mongo_client()
+
+    seconds = time.perf_counter() - started
+    print(f"Exported {exported} notes in {seconds:.1f}s ({exported / seconds if seconds else 0:.0f} notes/s).",
+          file=sys.stderr)
+
+
+async def run_import(path: str, batch_size: int):
+    source = open_file(path, "rb")
+
+    async def chunks():
+        # File reads block, so they run in a thread to keep the inserts of the previous batch flowing.
+        while chunk := await asyncio.to_thread(source.read, CHUNK_SIZE):
+            yield chunk
+
+    try:
+        report = await import_notes(get_db(), ndjson_lines(chunks()), batch_size=batch_size)
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        await close_mongo_client()
+
+    print(f"Imported {report['imported']} notes, replaced {report['replaced']}, failed {report['failed']} "
+          f"in {report['seconds']}s ({report['notes_per_second']} notes/s).")
+    for error in report["errors"]:
+        print(f"  - {error}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export notes to NDJSON or import them back.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="write notes as NDJSON (.gz/.zst compressed by extension)")
+    export_parser.add_argument("output", help="file path or - for stdout")
+    export_parser.add_argument("--author", help="export only the notes of this user")
+    export_parser.add_argument("--batch-size", type=int, default=notes_config.stream_batch_size,
+                               help="cursor batch size")
+
+    import_parser = commands.add_parser("import", help="load NDJSON notes, replacing notes with the same uuid")
+    import_parser.add_argument("input", help="file path or - for stdin")
+    import_parser.add_argument("--batch-size", type=int, default=notes_config.import_batch_size,
+                               help="notes per insert_many batch")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        asyncio.run(run_export(args.output, args.author, args.batch_size))
+    else:
+        report = asyncio.run(run_import(args.input, args.batch_size))
+        raise SystemExit(1 if report["failed"] else 0)